@@ -6,27 +6,49 @@ sys.path.insert(0, str(_PROJECT_ROOT))
 
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 
+from app import metrics
 from app.config import settings
-from app.database import close_pool, init_pool
+from app.database import PoolTimeout, close_pool, init_pool, pool_stats as db_pool_stats
+from app.ratelimit import RateLimitMiddleware, build_limiter, default_rules
+from app.routes.admin import check_admin_token, router as admin_router
 from app.routes.auth import router as auth_router
 from app.routes.availability import router as availability_router
 from app.routes.booking import router as booking_router
+from app.routes.cron import router as cron_router
 from app.routes.owner import router as owner_router
+from app.routes.pages import router as pages_router
+from app.routes.team import router as team_router
+from app.routes.webhooks import router as webhooks_router
+from app.services import busy_mirror, live, outbox, warmup
+from app.services.freebusy_cache import freebusy_cache
+from app.services.nylas_client import close_client, init_client, pool_stats
+from app.services.owner_cache import owner_cache
+from app.services.resilience import DeadlineMiddleware, nylas_resilience
 
 
 @asynccontextmanager
 async def lifespan(application: FastAPI):
-    await init_pool(settings.database_url)
+    # On serverless cold starts the pool and Nylas client are created by the
+    # first request that needs them; long-running servers can opt in here.
+    if settings.eager_startup:
+        await init_pool(settings.database_url)
+        await init_client()
     yield
+    await close_client()
     await close_pool()
 
 
 app = FastAPI(title="Calendar Booking API", lifespan=lifespan)
 
+rate_limiter = build_limiter()
+app.add_middleware(DeadlineMiddleware, seconds=settings.request_deadline_seconds)
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter, rules=default_rules())
+app.add_middleware(metrics.MetricsMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -34,10 +56,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.exception_handler(PoolTimeout)
+async def pool_timeout(request, exc):
+    return JSONResponse(
+        {"detail": "Database is busy, please retry"}, status_code=503, headers={"Retry-After": "1"},
+    )
+
+
+app.include_router(admin_router)
 app.include_router(auth_router)
 app.include_router(availability_router)
 app.include_router(booking_router)
+app.include_router(cron_router)
 app.include_router(owner_router)
+app.include_router(pages_router)
+app.include_router(team_router)
+app.include_router(webhooks_router)
 
 
 @app.get("/api/health")
@@ -45,57 +80,93 @@ async def health():
     return {"status": "ok"}
 
 
-from fastapi.responses import HTMLResponse
-
-_BOOKING_HTML = """<!DOCTYPE html>
-<html lang="en">
-<head>
-  <meta charset="UTF-8">
-  <meta name="viewport" content="width=device-width, initial-scale=1.0">
-  <title>Book an Appointment</title>
-  <link rel="stylesheet" href="/styles.css">
-</head>
-<body>
-  <div class="container">
-    <h1>Book an Appointment</h1>
-    <p class="subtitle" id="ownerInfo">Choose a date and time that works for you.</p>
-    <div id="errorMsg" class="status-msg error hidden"></div>
-    <div id="stepDate" class="card">
-      <h2>Select a Date</h2>
-      <div class="form-group"><input type="date" id="datePicker" /></div>
-    </div>
-    <div id="stepSlots" class="card hidden">
-      <h2>Available Times</h2>
-      <div id="slotsLoading" class="loading-text">Loading available times&hellip;</div>
-      <div id="slotsGrid" class="slots-grid"></div>
-      <p id="noSlots" class="loading-text hidden">No available slots for this date.</p>
-    </div>
-    <div id="stepForm" class="card hidden">
-      <h2>Your Details</h2>
-      <div class="form-group"><label for="customerName">Name</label>
-        <input type="text" id="customerName" placeholder="Jane Smith" required /></div>
-      <div class="form-group"><label for="customerEmail">Email</label>
-        <input type="email" id="customerEmail" placeholder="jane@example.com" required /></div>
-      <button class="btn btn-primary" id="bookBtn" disabled>Confirm Booking</button>
-    </div>
-    <div id="stepConfirm" class="card hidden">
-      <div class="confirmation">
-        <div class="check-icon">&#10003;</div>
-        <h2>Booking Confirmed</h2>
-        <p>You'll receive a calendar invite shortly.</p>
-      </div>
-      <div id="confirmDetails"></div><br/>
-      <button class="btn btn-primary" onclick="location.reload()">Book Another</button>
-    </div>
-  </div>
-  <script src="/app.js"></script>
-</body>
-</html>"""
-
-
-@app.get("/book/{slug:path}")
-async def serve_booking_page(slug: str):
-    return HTMLResponse(_BOOKING_HTML)
+@app.get("/api/stats")
+async def stats(authorization: str = Header("")):
+    # Exposes per-grant breaker state and pool internals: operators only.
+    check_admin_token(authorization)
+    return {
+        "db_pool": db_pool_stats(),
+        "nylas_pool": pool_stats(),
+        "nylas_resilience": nylas_resilience.stats(),
+        "freebusy_cache": freebusy_cache.stats(),
+        "owner_cache": owner_cache.stats(),
+        "rate_limiter": rate_limiter.stats(),
+        "busy_mirror": busy_mirror.stats,
+        "outbox": outbox.stats,
+        "warmup": warmup.stats,
+        "live": live.hub.stats(),
+    }
+
+
+def _labelled(name: str, values: dict) -> dict:
+    return {((name, key),): value for key, value in values.items() if isinstance(value, (int, float))}
+
+
+def _cache_counters() -> dict:
+    out = {}
+    for cache, stats in (("freebusy", freebusy_cache.stats()), ("owner", owner_cache.stats())):
+        for event in (
+            "hits", "stale_hits", "shared_hits", "fallback_hits", "misses", "coalesced", "evictions",
+            "invalidations",
+        ):
+            if event in stats:
+                out[(("cache", cache), ("event", event))] = stats[event]
+    return out
+
+
+def _db_pool_gauges() -> dict:
+    stats = db_pool_stats()
+    return _labelled("state", {k: stats[k] for k in ("size", "idle", "in_use", "max")})
+
+
+metrics.register(metrics.Collected(
+    "db_pool_connections", "Postgres pool connections by state.", _db_pool_gauges,
+))
+metrics.register(metrics.Collected(
+    "db_pool_waiting", "Callers currently waiting for a Postgres connection.",
+    lambda: {(): db_pool_stats()["waiting"]},
+))
+metrics.register(metrics.Collected(
+    "db_pool_acquires_total", "Postgres connection acquisitions by outcome.",
+    lambda: {(("outcome", "ok"),): db_pool_stats()["acquires"],
+             (("outcome", "timeout"),): db_pool_stats()["timeouts"]},
+    kind="counter",
+))
+metrics.register(metrics.Collected(
+    "nylas_pool_connections", "Nylas HTTP client connections by state.",
+    lambda: {(("state", "open"),): pool_stats()["open_connections"],
+             (("state", "idle"),): pool_stats()["idle_connections"]},
+))
+metrics.register(metrics.Collected(
+    "nylas_resilience_events_total", "Nylas retries, hedges and short circuits.",
+    lambda: _labelled("event", {
+        k: v for k, v in nylas_resilience.stats().items()
+        if k not in ("global_opens", "latency_p95_ms", "open_grant_breakers")
+    }),
+    kind="counter",
+))
+metrics.register(metrics.Collected(
+    "nylas_open_grant_breakers", "Per-grant Nylas circuit breakers not currently closed.",
+    lambda: {(): nylas_resilience.stats()["open_grant_breakers"]},
+))
+metrics.register(metrics.Collected(
+    "live_subscribers", "Open availability event streams on this instance.",
+    lambda: {(): live.hub.stats()["subscribers"]},
+))
+metrics.register(metrics.Collected(
+    "cache_events_total", "Cache hits, misses and evictions.", _cache_counters, kind="counter",
+))
+
+
+@app.get("/api/metrics")
+async def prometheus_metrics(authorization: str = Header("")):
+    # Same pool and breaker internals as /api/stats: without a token of its
+    # own, the admin token guards it.
+    if not settings.metrics_token:
+        check_admin_token(authorization)
+    elif authorization != f"Bearer {settings.metrics_token}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 
 # Serve static files locally (Vercel uses @vercel/static instead)
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+from fastapi import Response
+
+PUBLIC_DIR = Path(__file__).resolve().parent.parent / "public"
+
+# Assets served under content-hashed URLs.  Any change to a file changes its
+# URL, so responses can be cached forever.
+_HASHED = {
+    "app.js": "application/javascript; charset=utf-8",
+    "styles.css": "text/css; charset=utf-8",
+}
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+@dataclass(frozen=True)
+class Asset:
+    name: str
+    media_type: str
+    identity: bytes
+    gzip: bytes
+    br: bytes | None
+
+
+@lru_cache(maxsize=1)
+def _brotli():
+    """The ``brotli`` module (a requirement, imported on first use); gzip
+    alone is served if it is missing."""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def compress(body: bytes, fast: bool = False) -> tuple[bytes, bytes | None]:
+    """``(gzip, brotli)`` encodings of *body*; brotli is ``None`` if unavailable.
+
+    Static assets are compressed once at the highest levels; *fast* trades
+    a few bytes for speed on responses rendered per request.
+    """
+    br = _brotli()
+    return (
+        gzip.compress(body, compresslevel=6 if fast else 9, mtime=0),
+        br.compress(body, quality=5 if fast else 11) if br is not None else None,
+    )
+
+
+@lru_cache(maxsize=1)
+def _assets() -> dict[str, Asset]:
+    """Read and compress every hashed asset once per process, on first use."""
+    assets = {}
+    for filename, media_type in _HASHED.items():
+        body = (PUBLIC_DIR / filename).read_bytes()
+        stem, ext = filename.rsplit(".", 1)
+        name = f"{stem}.{hashlib.sha256(body).hexdigest()[:12]}.{ext}"
+        gz, br = compress(body)
+        assets[filename] = Asset(name, media_type, body, gz, br)
+    return assets
+
+
+def url(filename: str) -> str:
+    """Content-hashed URL of a public asset, e.g. ``/assets/app.3f2a9c1d0b4e.js``."""
+    return f"/assets/{_assets()[filename].name}"
+
+
+def lookup(name: str) -> Asset | None:
+    for asset in _assets().values():
+        if asset.name == name:
+            return asset
+    return None
+
+
+def encoded_response(
+    identity: bytes,
+    gz: bytes,
+    br: bytes | None,
+    media_type: str,
+    accept_encoding: str,
+    headers: dict[str, str],
+) -> Response:
+    """Pick the smallest encoding the client accepts."""
+    accepted = {part.split(";")[0].strip() for part in accept_encoding.lower().split(",")}
+    headers = {**headers, "Vary": "Accept-Encoding"}
+    if br is not None and "br" in accepted:
+        body = br
+        headers["Content-Encoding"] = "br"
+    elif "gzip" in accepted:
+        body = gz
+        headers["Content-Encoding"] = "gzip"
+    else:
+        body = identity
+    return Response(body, media_type=media_type, headers=headers)
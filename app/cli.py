@@ -0,0 +1,165 @@
+"""Operational commands.
+
+    python -m app.cli migrate      # apply pending schema migrations
+    python -m app.cli status       # show the schema version
+    python -m app.cli worker       # deliver queued bookings (ASYNC_BOOKING)
+    python -m app.cli warmup       # precompute availability for active owners
+    python -m app.cli import-owners owners.csv   # bulk-update owner settings
+    python -m app.cli export-owners -o owners.ndjson
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+
+from app.config import settings
+
+
+async def _connect():
+    import asyncpg
+
+    return await asyncpg.connect(settings.database_url)
+
+
+async def cmd_migrate(args: argparse.Namespace) -> None:
+    from app.migrations import LATEST_VERSION, migrate
+
+    conn = await _connect()
+    try:
+        applied = await migrate(conn)
+    finally:
+        await conn.close()
+    if applied:
+        print(f"Applied migrations {', '.join(map(str, applied))}; now at {LATEST_VERSION}")
+    else:
+        print(f"Already at version {LATEST_VERSION}")
+
+
+async def cmd_status(args: argparse.Namespace) -> None:
+    from app.migrations import LATEST_VERSION, MIGRATIONS, current_version
+
+    conn = await _connect()
+    try:
+        version = await current_version(conn)
+    finally:
+        await conn.close()
+    print(f"Database version {version}, code version {LATEST_VERSION}")
+    for number, name, _ in MIGRATIONS:
+        if number > version:
+            print(f"  pending: {number} {name}")
+
+
+async def cmd_worker(args: argparse.Namespace) -> None:
+    from app.database import close_pool, get_pool
+    from app.services import outbox
+    from app.services.nylas_client import close_client
+
+    await get_pool()
+    try:
+        if args.once:
+            result = await outbox.drain()
+            print(f"Processed {result['processed']} bookings in {result['seconds']}s")
+        else:
+            print(f"Draining the booking outbox every {args.poll_interval}s when idle")
+            await outbox.run_worker(args.poll_interval)
+    finally:
+        await close_client()
+        await close_pool()
+
+
+async def cmd_warmup(args: argparse.Namespace) -> None:
+    from app.database import close_pool, get_pool
+    from app.services import warmup
+    from app.services.nylas_client import close_client
+
+    await get_pool()
+    try:
+        result = await warmup.run(
+            max_seconds=args.max_seconds, max_owners=args.max_owners, days=args.days,
+        )
+        print(
+            f"Warmed {result['owners']} owners with {result['nylas_calls']} Nylas calls "
+            f"in {result['seconds']}s ({result['errors']} errors, {result['skipped']} skipped)"
+        )
+    finally:
+        await close_client()
+        await close_pool()
+
+
+async def _file_lines(path: str):
+    handle = sys.stdin if path == "-" else open(path, encoding="utf-8", newline="")
+    try:
+        for line in handle:
+            yield line.rstrip("\r\n")
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+
+def _guess_format(path: str | None, fmt: str | None) -> str:
+    if fmt:
+        return fmt
+    return "csv" if path and path.endswith(".csv") else "ndjson"
+
+
+async def cmd_import_owners(args: argparse.Namespace) -> None:
+    from app.database import close_pool, get_pool
+    from app.services import bulk
+
+    await get_pool()
+    try:
+        result = await bulk.import_settings(_file_lines(args.path), _guess_format(args.path, args.format))
+    except bulk.BulkImportError as exc:
+        raise SystemExit(f"Import rejected, nothing was changed: {exc}")
+    finally:
+        await close_pool()
+    print(f"Read {result['rows']} owners: {result['updated']} updated, {result['unknown']} unknown slugs")
+
+
+async def cmd_export_owners(args: argparse.Namespace) -> None:
+    from app.database import close_pool, get_pool
+    from app.services import bulk
+
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+
+    async def write(chunk: bytes) -> None:
+        out.write(chunk)
+
+    await get_pool()
+    try:
+        await bulk.export_settings(_guess_format(args.output, args.format), write)
+    finally:
+        await close_pool()
+        if out is not sys.stdout.buffer:
+            out.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("migrate", help="apply pending schema migrations").set_defaults(func=cmd_migrate)
+    commands.add_parser("status", help="show schema version").set_defaults(func=cmd_status)
+    worker = commands.add_parser("worker", help="deliver queued bookings to Nylas")
+    worker.add_argument("--poll-interval", type=float, default=2.0)
+    worker.add_argument("--once", action="store_true", help="drain the outbox once and exit")
+    worker.set_defaults(func=cmd_worker)
+    warm = commands.add_parser("warmup", help="precompute availability for recently active owners")
+    warm.add_argument("--days", type=int, default=None)
+    warm.add_argument("--max-owners", type=int, default=None)
+    warm.add_argument("--max-seconds", type=float, default=None)
+    warm.set_defaults(func=cmd_warmup)
+    imp = commands.add_parser("import-owners", help="bulk-update owner settings from NDJSON or CSV")
+    imp.add_argument("path", help="input file, or - for stdin")
+    imp.add_argument("--format", choices=("ndjson", "csv"), default=None)
+    imp.set_defaults(func=cmd_import_owners)
+    exp = commands.add_parser("export-owners", help="dump owner settings as NDJSON or CSV")
+    exp.add_argument("--output", "-o", default=None, help="output file (default stdout)")
+    exp.add_argument("--format", choices=("ndjson", "csv"), default=None)
+    exp.set_defaults(func=cmd_export_owners)
+    args = parser.parse_args()
+    asyncio.run(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
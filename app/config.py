@@ -3,18 +3,103 @@ from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     database_url: str
+    database_pool_min_size: int = 1
+    database_pool_max_size: int = 5
+    database_acquire_timeout: float = 5.0
+    database_max_inactive_connection_lifetime: float = 300.0
+    # None picks 0 for pooled (pgbouncer) Neon URLs and 100 otherwise.
+    database_statement_cache_size: int | None = None
 
     nylas_client_id: str
     nylas_api_key: str
     nylas_api_uri: str = "https://api.us.nylas.com"
     nylas_callback_uri: str
 
+    eager_startup: bool = False
+    auto_migrate: bool = False
+
+    nylas_max_connections: int = 20
+    nylas_max_keepalive_connections: int = 10
+    nylas_keepalive_expiry: float = 30.0
+    nylas_connect_timeout: float = 3.0
+    nylas_read_timeout: float = 10.0
+    nylas_write_timeout: float = 5.0
+    nylas_pool_timeout: float = 2.0
+    nylas_http2: bool = False
+
+    request_deadline_seconds: float = 8.0
+    nylas_retry_attempts: int = 2
+    nylas_retry_base_delay: float = 0.1
+    nylas_retry_max_delay: float = 1.0
+    nylas_hedge_enabled: bool = False
+    nylas_hedge_after_seconds: float = 0.5
+    nylas_hedge_min_seconds: float = 0.05
+    nylas_circuit_failure_threshold: int = 5
+    nylas_circuit_global_threshold: int = 20
+    nylas_circuit_reset_seconds: float = 30.0
+
     encryption_key: str
 
     business_hours_start: str = "09:00"
     business_hours_end: str = "17:00"
     slot_duration_minutes: int = 30
 
+    freebusy_cache_ttl_seconds: float = 30.0
+    freebusy_cache_stale_seconds: float = 120.0
+    freebusy_cache_max_entries: int = 2048
+    freebusy_shared_cache: bool = True
+    availability_range_chunk_days: int = 7
+    booking_page_render_timeout: float = 1.5
+    availability_cache_max_age: int = 0
+    availability_cache_s_maxage: int = 30
+    availability_cache_swr: int = 60
+
+    owner_cache_ttl_seconds: float = 60.0
+    owner_cache_max_entries: int = 4096
+
+    rate_limit_backend: str = "memory"
+    rate_limit_max_keys: int = 50_000
+    rate_limit_trust_proxy: bool = False
+    rate_limit_book: str = "10/60"
+    rate_limit_availability: str = "120/60"
+    rate_limit_auth: str = "20/60"
+
+    nylas_webhook_secret: str = ""
+    busy_mirror_enabled: bool = False
+    busy_mirror_max_age_seconds: int = 3600
+    busy_mirror_sync_days: int = 30
+
+    team_fanout_concurrency: int = 10
+
+    async_booking: bool = False
+    outbox_concurrency: int = 4
+    outbox_batch_size: int = 20
+    outbox_max_attempts: int = 6
+    outbox_inline_drain: bool = True
+    cron_secret: str = ""
+    cron_max_seconds: float = 20.0
+
+    warmup_days: int = 14
+    warmup_chunk_days: int = 14
+    warmup_concurrency: int = 4
+    warmup_max_owners: int = 200
+    warmup_max_nylas_calls: int = 200
+    warmup_active_hours: int = 72
+    warmup_snapshot_max_age_seconds: int = 360
+
+    live_listen: bool = True
+    live_database_url: str = ""
+    live_queue_size: int = 16
+    live_heartbeat_seconds: float = 15.0
+    live_stream_max_seconds: float = 55.0
+
+    idempotency_ttl_hours: int = 24
+    idempotency_wait_seconds: float = 10.0
+
+    server_timing: bool = True
+    metrics_token: str = ""
+    admin_token: str = ""
+
     model_config = {"env_file": ".env"}
 
 
@@ -1,38 +1,112 @@
-import asyncpg
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, AsyncIterator
+
+from app.config import settings
+from app.metrics import phase
+
+if TYPE_CHECKING:
+    import asyncpg
 
 _pool: asyncpg.Pool | None = None
+_pool_lock = asyncio.Lock()
+
+# Acquire bookkeeping for pool sizing: how many callers are queued for a
+# connection right now, and how often they gave up.
+_waiting = 0
+_in_use = 0
+_counters = {"acquires": 0, "timeouts": 0, "peak_in_use": 0, "peak_waiting": 0}
 
-SCHEMA_SQL = """
-CREATE TABLE IF NOT EXISTS calendar_connections (
-    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-    owner_id UUID NOT NULL,
-    slug TEXT NOT NULL,
-    nylas_grant_id TEXT NOT NULL,
-    google_email TEXT,
-    timezone TEXT DEFAULT 'UTC',
-    business_hours_start TEXT DEFAULT '09:00',
-    business_hours_end TEXT DEFAULT '17:00',
-    slot_duration_minutes INT DEFAULT 30,
-    connected_at TIMESTAMPTZ DEFAULT now(),
-    is_valid BOOLEAN DEFAULT true
-);
-CREATE UNIQUE INDEX IF NOT EXISTS idx_cc_owner ON calendar_connections(owner_id);
-CREATE UNIQUE INDEX IF NOT EXISTS idx_cc_slug ON calendar_connections(slug);
-"""
+
+class PoolTimeout(Exception):
+    """No pooled connection became free within ``database_acquire_timeout``."""
+
+
+def _statement_cache_size(dsn: str) -> int:
+    if settings.database_statement_cache_size is not None:
+        return settings.database_statement_cache_size
+    # Neon's pooled endpoints run pgbouncer in transaction mode, which cannot
+    # keep named prepared statements across transactions.
+    return 0 if "-pooler." in dsn else 100
 
 
 async def get_pool() -> asyncpg.Pool:
-    global _pool
+    """Return the pool, creating it on first use (e.g. on a cold start)."""
     if _pool is None:
-        raise RuntimeError("Database pool not initialised – call init_pool() first")
+        async with _pool_lock:
+            if _pool is None:
+                await init_pool(settings.database_url)
     return _pool
 
 
 async def init_pool(dsn: str) -> None:
     global _pool
-    _pool = await asyncpg.create_pool(dsn, min_size=1, max_size=5)
-    async with _pool.acquire() as conn:
-        await conn.execute(SCHEMA_SQL)
+    import asyncpg
+
+    from app.migrations import check_version, migrate
+
+    pool = await asyncpg.create_pool(
+        dsn,
+        min_size=settings.database_pool_min_size,
+        max_size=settings.database_pool_max_size,
+        max_inactive_connection_lifetime=settings.database_max_inactive_connection_lifetime,
+        statement_cache_size=_statement_cache_size(dsn),
+    )
+    try:
+        async with pool.acquire() as conn:
+            if settings.auto_migrate:
+                await migrate(conn)
+            else:
+                await check_version(conn)
+    except BaseException:
+        await pool.close()
+        raise
+    _pool = pool
+
+
+@asynccontextmanager
+async def acquire() -> AsyncIterator[asyncpg.Connection]:
+    """Borrow a pooled connection, timing the wait as the ``db_acquire`` phase.
+
+    Raises :class:`PoolTimeout` if none is free within
+    ``database_acquire_timeout`` seconds.
+    """
+    global _waiting, _in_use
+    pool = await get_pool()
+    _waiting += 1
+    _counters["peak_waiting"] = max(_counters["peak_waiting"], _waiting)
+    try:
+        with phase("db_acquire"):
+            conn = await pool.acquire(timeout=settings.database_acquire_timeout or None)
+    except asyncio.TimeoutError:
+        _counters["timeouts"] += 1
+        raise PoolTimeout() from None
+    finally:
+        _waiting -= 1
+    _in_use += 1
+    _counters["acquires"] += 1
+    _counters["peak_in_use"] = max(_counters["peak_in_use"], _in_use)
+    try:
+        yield conn
+    finally:
+        _in_use -= 1
+        await pool.release(conn)
+
+
+def pool_stats() -> dict:
+    """Pool gauges plus acquire counters; ``peak_*`` are since process start."""
+    if _pool is None:
+        return {"size": 0, "idle": 0, "in_use": 0, "waiting": 0, "max": 0, **_counters}
+    return {
+        "size": _pool.get_size(),
+        "idle": _pool.get_idle_size(),
+        "in_use": _in_use,
+        "waiting": _waiting,
+        "max": _pool.get_max_size(),
+        **_counters,
+    }
 
 
 async def close_pool() -> None:
@@ -1,13 +1,21 @@
-from cryptography.fernet import Fernet
+from __future__ import annotations
+
+from functools import lru_cache
 
 from app.config import settings
 
-_fernet = Fernet(settings.encryption_key.encode())
+
+@lru_cache(maxsize=1)
+def _fernet():
+    # Imported here so cold starts that never touch a grant skip cryptography.
+    from cryptography.fernet import Fernet
+
+    return Fernet(settings.encryption_key.encode())
 
 
 def encrypt(plaintext: str) -> str:
-    return _fernet.encrypt(plaintext.encode()).decode()
+    return _fernet().encrypt(plaintext.encode()).decode()
 
 
 def decrypt(ciphertext: str) -> str:
-    return _fernet.decrypt(ciphertext.encode()).decode()
+    return _fernet().decrypt(ciphertext.encode()).decode()
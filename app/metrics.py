@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from app.config import settings
+
+_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Phase timings of the current request, as {phase: [seconds, count]}.
+_phases: ContextVar[dict[str, list] | None] = ContextVar("request_phases", default=None)
+
+
+def _labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for name, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _number(value: float) -> str:
+    # Shortest repr that round-trips; ``:g`` would keep only six digits.
+    return repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str) -> None:
+        self.name = name
+        self.help = help_text
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(labels.items())
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in self._values.items():
+            lines.append(f"{self.name}{_labels(dict(key))} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    """Fixed-bucket histogram; one bisect and two additions per observation."""
+
+    def __init__(self, name: str, help_text: str, buckets: tuple[float, ...] = _BUCKETS) -> None:
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        # labels -> [count per bucket (last is +Inf)..., sum]
+        self._series: dict[tuple, list[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(labels.items())
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in self._series.items():
+            labels = dict(key)
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels({**labels, 'le': bound})} {_number(cumulative)}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(labels)} {_number(cumulative)}")
+        return lines
+
+
+class Collected:
+    """Values read at scrape time from ``collect()``, a ``{label tuple: value}`` dict.
+
+    Used to expose state that already lives elsewhere (pool sizes, cache
+    counters) without updating a metric on every change.
+    """
+
+    def __init__(self, name: str, help_text: str, collect, kind: str = "gauge") -> None:
+        self.name = name
+        self.help = help_text
+        self.collect = collect
+        self.kind = kind
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in self.collect().items():
+            lines.append(f"{self.name}{_labels(dict(key))} {_number(value)}")
+        return lines
+
+
+http_requests = Counter("http_requests_total", "HTTP responses by route, method and status.")
+http_duration = Histogram("http_request_duration_seconds", "HTTP request latency by route.")
+phase_duration = Histogram("phase_duration_seconds", "Time spent in each hot-path phase.")
+nylas_responses = Counter("nylas_responses_total", "Nylas API responses by endpoint and status code.")
+rate_limited = Counter("rate_limited_total", "Requests rejected by the rate limiter, by rule.")
+
+_registry: list = [http_requests, http_duration, phase_duration, nylas_responses, rate_limited]
+
+
+def register(metric) -> None:
+    _registry.append(metric)
+
+
+def render() -> str:
+    lines: list[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def phase(name: str):
+    """Time a block, feeding ``phase_duration_seconds`` and Server-Timing."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        phase_duration.observe(elapsed, phase=name)
+        phases = _phases.get()
+        if phases is not None:
+            entry = phases.get(name)
+            if entry is None:
+                phases[name] = [elapsed, 1]
+            else:
+                entry[0] += elapsed
+                entry[1] += 1
+
+
+def _server_timing(phases: dict[str, list], total: float) -> bytes:
+    parts = [f"{name};dur={seconds * 1000:.1f}" for name, (seconds, _) in phases.items()]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts).encode()
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request metrics and the Server-Timing header.
+
+    Phases recorded with :func:`phase` while the request runs (including
+    in tasks it gathers) are summed per name into ``Server-Timing``.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        phases: dict[str, list] = {}
+        token = _phases.set(phases)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if settings.server_timing:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", _server_timing(phases, time.perf_counter() - started)))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _phases.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            http_requests.inc(route=path, method=scope["method"], status=str(status))
+            http_duration.observe(time.perf_counter() - started, route=path, method=scope["method"])
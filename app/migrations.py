@@ -0,0 +1,231 @@
+"""Versioned schema migrations.
+
+Each entry is applied once, in order, inside its own transaction and
+recorded in ``schema_migrations``.  Add new changes as a new entry at the
+end; never edit one that has shipped.  Apply with::
+
+    python -m app.cli migrate
+"""
+from __future__ import annotations
+
+MIGRATIONS: list[tuple[int, str, str]] = [
+    (1, "calendar connections", """
+        CREATE TABLE IF NOT EXISTS calendar_connections (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            owner_id UUID NOT NULL,
+            slug TEXT NOT NULL,
+            nylas_grant_id TEXT NOT NULL,
+            google_email TEXT,
+            timezone TEXT DEFAULT 'UTC',
+            business_hours_start TEXT DEFAULT '09:00',
+            business_hours_end TEXT DEFAULT '17:00',
+            slot_duration_minutes INT DEFAULT 30,
+            connected_at TIMESTAMPTZ DEFAULT now(),
+            is_valid BOOLEAN DEFAULT true
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_cc_owner ON calendar_connections(owner_id);
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_cc_slug ON calendar_connections(slug);
+    """),
+    (2, "rate limit counters", """
+        CREATE UNLOGGED TABLE IF NOT EXISTS rate_limits (
+            key TEXT NOT NULL,
+            window_start BIGINT NOT NULL,
+            hits INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (key, window_start)
+        );
+    """),
+    (3, "bookings ledger", """
+        CREATE EXTENSION IF NOT EXISTS btree_gist;
+        CREATE TABLE IF NOT EXISTS bookings (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            connection_id UUID NOT NULL REFERENCES calendar_connections(id) ON DELETE CASCADE,
+            during TSTZRANGE NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            customer_name TEXT,
+            customer_email TEXT,
+            nylas_event_id TEXT,
+            created_at TIMESTAMPTZ DEFAULT now(),
+            CONSTRAINT bookings_no_overlap EXCLUDE USING gist (connection_id WITH =, during WITH &&)
+                WHERE (status IN ('pending', 'confirmed'))
+        );
+    """),
+    (4, "busy mirror", """
+        CREATE TABLE IF NOT EXISTS busy_mirror (
+            grant_key TEXT NOT NULL,
+            event_id TEXT NOT NULL,
+            during TSTZRANGE NOT NULL,
+            updated_at TIMESTAMPTZ DEFAULT now(),
+            PRIMARY KEY (grant_key, event_id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_busy_mirror_during ON busy_mirror USING gist (grant_key, during);
+        CREATE TABLE IF NOT EXISTS busy_mirror_state (
+            grant_key TEXT PRIMARY KEY,
+            synced_from TIMESTAMPTZ NOT NULL,
+            synced_until TIMESTAMPTZ NOT NULL,
+            synced_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            last_event_at TIMESTAMPTZ
+        );
+    """),
+    (5, "teams", """
+        CREATE TABLE IF NOT EXISTS teams (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            slug TEXT NOT NULL UNIQUE,
+            name TEXT,
+            mode TEXT NOT NULL DEFAULT 'any' CHECK (mode IN ('any', 'all')),
+            business_hours_start TEXT DEFAULT '09:00',
+            business_hours_end TEXT DEFAULT '17:00',
+            slot_duration_minutes INT DEFAULT 30,
+            created_at TIMESTAMPTZ DEFAULT now()
+        );
+        CREATE TABLE IF NOT EXISTS team_members (
+            team_id UUID NOT NULL REFERENCES teams(id) ON DELETE CASCADE,
+            connection_id UUID NOT NULL REFERENCES calendar_connections(id) ON DELETE CASCADE,
+            PRIMARY KEY (team_id, connection_id)
+        );
+    """),
+    (6, "availability_version", """
+        ALTER TABLE calendar_connections
+            ADD COLUMN IF NOT EXISTS availability_version BIGINT NOT NULL DEFAULT 0;
+    """),
+    (7, "idempotency_keys", """
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            key TEXT PRIMARY KEY,
+            request_hash TEXT NOT NULL,
+            status_code INT,
+            response JSONB,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            completed_at TIMESTAMPTZ
+        );
+        CREATE INDEX IF NOT EXISTS idempotency_keys_created_idx
+            ON idempotency_keys (created_at);
+    """),
+    (8, "booking outbox", """
+        ALTER TABLE bookings DROP CONSTRAINT IF EXISTS bookings_no_overlap;
+        ALTER TABLE bookings ADD CONSTRAINT bookings_no_overlap
+            EXCLUDE USING gist (connection_id WITH =, during WITH &&)
+            WHERE (status IN ('pending', 'queued', 'confirmed'));
+        ALTER TABLE bookings ADD COLUMN IF NOT EXISTS failure_reason TEXT;
+        CREATE TABLE IF NOT EXISTS booking_outbox (
+            booking_id UUID PRIMARY KEY REFERENCES bookings(id) ON DELETE CASCADE,
+            connection_id UUID NOT NULL,
+            extra_participants JSONB NOT NULL DEFAULT '[]',
+            attempts INT NOT NULL DEFAULT 0,
+            next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            locked_until TIMESTAMPTZ,
+            last_error TEXT,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        CREATE INDEX IF NOT EXISTS booking_outbox_connection_idx
+            ON booking_outbox (connection_id, created_at);
+    """),
+    (9, "availability snapshots", """
+        ALTER TABLE calendar_connections ADD COLUMN IF NOT EXISTS last_active_at TIMESTAMPTZ;
+        CREATE UNLOGGED TABLE IF NOT EXISTS availability_snapshots (
+            connection_id UUID NOT NULL REFERENCES calendar_connections(id) ON DELETE CASCADE,
+            day DATE NOT NULL,
+            version BIGINT NOT NULL,
+            slots JSONB NOT NULL,
+            computed_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (connection_id, day)
+        );
+    """),
+    (10, "availability rules", """
+        ALTER TABLE calendar_connections ADD COLUMN IF NOT EXISTS availability_rules JSONB;
+    """),
+    (11, "availability notifications", """
+        CREATE OR REPLACE FUNCTION notify_availability_changed() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('availability_changed', NEW.slug || ' ' || NEW.availability_version);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        DROP TRIGGER IF EXISTS calendar_connections_availability_changed ON calendar_connections;
+        CREATE TRIGGER calendar_connections_availability_changed
+            AFTER UPDATE OF availability_version ON calendar_connections
+            FOR EACH ROW
+            WHEN (NEW.availability_version IS DISTINCT FROM OLD.availability_version)
+            EXECUTE FUNCTION notify_availability_changed();
+    """),
+    (12, "shared free/busy cache", """
+        CREATE UNLOGGED TABLE IF NOT EXISTS freebusy_cache (
+            connection_id UUID NOT NULL REFERENCES calendar_connections(id) ON DELETE CASCADE,
+            grant_key TEXT NOT NULL,
+            start_time BIGINT NOT NULL,
+            end_time BIGINT NOT NULL,
+            version BIGINT NOT NULL,
+            busy JSONB NOT NULL,
+            fetched_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            expires_at TIMESTAMPTZ NOT NULL,
+            PRIMARY KEY (connection_id, start_time, end_time)
+        );
+        CREATE INDEX IF NOT EXISTS idx_freebusy_cache_grant ON freebusy_cache(grant_key);
+        CREATE INDEX IF NOT EXISTS idx_freebusy_cache_expires ON freebusy_cache(expires_at);
+    """),
+    (13, "all-day events in the busy mirror", """
+        ALTER TABLE busy_mirror ADD COLUMN IF NOT EXISTS all_day DATERANGE;
+    """),
+    (14, "collective booking holds", """
+        ALTER TABLE bookings ADD COLUMN IF NOT EXISTS parent_id UUID
+            REFERENCES bookings(id) ON DELETE CASCADE;
+        CREATE INDEX IF NOT EXISTS idx_bookings_parent ON bookings(parent_id)
+            WHERE parent_id IS NOT NULL;
+    """),
+    (15, "snapshot grant keys", """
+        ALTER TABLE availability_snapshots ADD COLUMN IF NOT EXISTS grant_key TEXT;
+        CREATE INDEX IF NOT EXISTS idx_availability_snapshots_grant
+            ON availability_snapshots(grant_key);
+    """),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# Arbitrary constant so concurrent `migrate` runs queue up instead of racing.
+_LOCK_ID = 0x63616C62
+
+
+async def current_version(conn) -> int:
+    exists = await conn.fetchval("SELECT to_regclass('schema_migrations') IS NOT NULL")
+    if not exists:
+        return 0
+    return await conn.fetchval("SELECT coalesce(max(version), 0) FROM schema_migrations")
+
+
+async def check_version(conn) -> None:
+    """Raise if the database is behind the code; a single cheap query."""
+    version = await current_version(conn)
+    if version < LATEST_VERSION:
+        raise RuntimeError(
+            f"Database schema is at version {version}, code expects {LATEST_VERSION} "
+            "– run `python -m app.cli migrate`"
+        )
+
+
+async def migrate(conn) -> list[int]:
+    """Apply every pending migration; return the versions applied."""
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMPTZ DEFAULT now()
+        )
+        """
+    )
+    applied: list[int] = []
+    await conn.execute("SELECT pg_advisory_lock($1)", _LOCK_ID)
+    try:
+        version = await current_version(conn)
+        for number, name, sql in MIGRATIONS:
+            if number <= version:
+                continue
+            async with conn.transaction():
+                await conn.execute(sql)
+                await conn.execute(
+                    "INSERT INTO schema_migrations (version, name) VALUES ($1, $2)",
+                    number,
+                    name,
+                )
+            applied.append(number)
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1)", _LOCK_ID)
+    return applied
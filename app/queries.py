@@ -0,0 +1,91 @@
+"""Named SQL for the ``calendar_connections`` hot paths.
+
+Every statement is a fixed module-level string, so asyncpg's per-connection
+statement cache prepares it on first use and reuses the plan for the life of
+the connection.  With ``DATABASE_STATEMENT_CACHE_SIZE=0`` (needed behind
+pgbouncer in transaction mode) the same calls run as unnamed statements.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import asyncpg
+
+OWNER_BY_SLUG = """
+    SELECT id, owner_id, slug, nylas_grant_id, google_email, timezone,
+           business_hours_start, business_hours_end, slot_duration_minutes,
+           availability_version, availability_rules
+    FROM calendar_connections
+    WHERE slug = $1 AND is_valid = true
+"""
+
+# Returns the slug actually stored: a reconnecting owner keeps their old one.
+UPSERT_CONNECTION = """
+    INSERT INTO calendar_connections (owner_id, slug, nylas_grant_id, google_email)
+    VALUES ($1::uuid, $2, $3, $4)
+    ON CONFLICT (owner_id) DO UPDATE
+       SET nylas_grant_id       = EXCLUDED.nylas_grant_id,
+           google_email         = EXCLUDED.google_email,
+           connected_at         = now(),
+           is_valid             = true,
+           availability_version = calendar_connections.availability_version + 1
+    RETURNING slug
+"""
+
+UPDATE_SETTINGS = """
+    UPDATE calendar_connections
+    SET timezone = $2,
+        business_hours_start = $3,
+        business_hours_end = $4,
+        slot_duration_minutes = $5,
+        availability_rules = CASE WHEN $7 THEN $6::jsonb ELSE availability_rules END,
+        availability_version = availability_version + 1
+    WHERE slug = $1 AND is_valid = true
+    RETURNING availability_version
+"""
+
+TOUCH_CONNECTION = """
+    UPDATE calendar_connections SET last_active_at = now() WHERE id = $1::uuid
+"""
+
+
+async def owner_by_slug(conn: asyncpg.Connection, slug: str) -> asyncpg.Record | None:
+    return await conn.fetchrow(OWNER_BY_SLUG, slug)
+
+
+async def upsert_connection(
+    conn: asyncpg.Connection, owner_id: str, slug: str, encrypted_grant_id: str, email: str
+) -> str:
+    """Create or reconnect the owner's connection; returns its slug.
+
+    Reconnecting bumps ``availability_version`` so nothing cached under the
+    previous grant is served again.
+    """
+    return await conn.fetchval(UPSERT_CONNECTION, owner_id, slug, encrypted_grant_id, email)
+
+
+async def update_settings(
+    conn: asyncpg.Connection,
+    slug: str,
+    timezone: str,
+    business_hours_start: str,
+    business_hours_end: str,
+    slot_duration_minutes: int,
+    availability_rules: str | None = None,
+    replace_rules: bool = False,
+) -> int | None:
+    """Save the owner's settings; returns the new availability version, or
+    ``None`` if no valid connection has *slug*.
+
+    Stored rules are only replaced (or cleared, with ``None``) when
+    *replace_rules* is set.
+    """
+    return await conn.fetchval(
+        UPDATE_SETTINGS, slug, timezone, business_hours_start, business_hours_end,
+        slot_duration_minutes, availability_rules, replace_rules,
+    )
+
+
+async def touch_connection(conn: asyncpg.Connection, connection_id: str) -> None:
+    await conn.execute(TOUCH_CONNECTION, connection_id)
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import json
+import random
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from app.config import settings
+from app.database import acquire
+from app.metrics import phase, rate_limited
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """Allow *limit* requests per *window* seconds per client on *prefix*."""
+
+    name: str
+    prefix: str
+    limit: int
+    window: int
+    methods: frozenset[str] | None = None
+
+    @classmethod
+    def parse(cls, name: str, prefix: str, spec: str, methods: tuple[str, ...] | None = None):
+        """Build a rule from a ``"<limit>/<seconds>"`` spec such as ``"10/60"``."""
+        limit, _, window = spec.partition("/")
+        return cls(name, prefix, int(limit), int(window or 60), frozenset(methods) if methods else None)
+
+    def matches(self, method: str, path: str) -> bool:
+        if self.methods is not None and method not in self.methods:
+            return False
+        return path.startswith(self.prefix)
+
+
+def _weighted(prev: int, cur: int, now: float, window_start: int, window: int) -> float:
+    """Sliding-window estimate from the previous and current fixed windows."""
+    elapsed = (now - window_start) / window
+    return prev * (1 - elapsed) + cur
+
+
+class MemoryRateLimiter:
+    """Sliding-window counter per key, kept in one process.
+
+    Each key costs one small ``[window_start, prev, cur, window]`` list.
+    Keys are kept in least-recently-seen order so idle ones are dropped from
+    the front in O(1), and the total is capped at *max_keys* regardless of
+    traffic.
+    """
+
+    def __init__(self, max_keys: int) -> None:
+        self.max_keys = max_keys
+        self._keys: OrderedDict[str, list[int]] = OrderedDict()
+        self.rejections = 0
+        self.evictions = 0
+
+    async def hit(self, key: str, limit: int, window: int) -> float | None:
+        """Count a request; return ``None`` if allowed, else seconds to wait."""
+        now = time.time()
+        window_start = int(now // window * window)
+
+        state = self._keys.get(key)
+        if state is None:
+            state = [window_start, 0, 0, window]
+            self._keys[key] = state
+        else:
+            self._keys.move_to_end(key)
+            if state[0] != window_start:
+                state[1] = state[2] if state[0] == window_start - window else 0
+                state[0], state[2] = window_start, 0
+        self._evict(now)
+
+        if _weighted(state[1], state[2], now, window_start, window) >= limit:
+            self.rejections += 1
+            return window_start + window - now
+        state[2] += 1
+        return None
+
+    def _evict(self, now: float) -> None:
+        while len(self._keys) > self.max_keys:
+            self._keys.popitem(last=False)
+            self.evictions += 1
+        while self._keys:
+            oldest = next(iter(self._keys.values()))
+            if oldest[0] + 2 * oldest[3] > now:
+                break
+            self._keys.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "keys": len(self._keys),
+            "max_keys": self.max_keys,
+            "rejections": self.rejections,
+            "evictions": self.evictions,
+        }
+
+
+class PostgresRateLimiter:
+    """Sliding-window counter shared by every instance through ``rate_limits``.
+
+    One statement per request bumps the current window and reads the
+    previous one.  Old windows are swept occasionally.  If the database is
+    unreachable requests are let through rather than failing the API.
+    """
+
+    _HIT_SQL = """
+        WITH cur AS (
+            INSERT INTO rate_limits (key, window_start, hits)
+            VALUES ($1, $2, 1)
+            ON CONFLICT (key, window_start) DO UPDATE SET hits = rate_limits.hits + 1
+            RETURNING hits
+        )
+        SELECT (SELECT hits FROM cur) AS cur,
+               COALESCE((SELECT hits FROM rate_limits
+                         WHERE key = $1 AND window_start = $2 - $3), 0) AS prev
+    """
+
+    def __init__(self, sweep_probability: float = 0.01) -> None:
+        self.sweep_probability = sweep_probability
+        self.rejections = 0
+        self.errors = 0
+
+    async def hit(self, key: str, limit: int, window: int) -> float | None:
+        now = time.time()
+        window_start = int(now // window * window)
+        try:
+            async with acquire() as conn:
+                row = await conn.fetchrow(self._HIT_SQL, key, window_start, window)
+                if random.random() < self.sweep_probability:
+                    await conn.execute(
+                        "DELETE FROM rate_limits WHERE window_start < $1",
+                        window_start - 2 * window,
+                    )
+        except Exception:
+            self.errors += 1
+            return None
+
+        # The current request is already counted in ``cur``.
+        if _weighted(row["prev"], row["cur"] - 1, now, window_start, window) >= limit:
+            self.rejections += 1
+            return window_start + window - now
+        return None
+
+    def stats(self) -> dict:
+        return {"backend": "postgres", "rejections": self.rejections, "errors": self.errors}
+
+
+def build_limiter() -> MemoryRateLimiter | PostgresRateLimiter:
+    if settings.rate_limit_backend == "postgres":
+        return PostgresRateLimiter()
+    return MemoryRateLimiter(max_keys=settings.rate_limit_max_keys)
+
+
+def default_rules() -> list[RateLimitRule]:
+    return [
+        RateLimitRule.parse("book", "/api/book", settings.rate_limit_book, ("POST",)),
+        RateLimitRule.parse("team_book", "/api/team/", settings.rate_limit_book, ("POST",)),
+        RateLimitRule.parse("availability", "/api/availability", settings.rate_limit_availability),
+        RateLimitRule.parse("auth", "/auth/", settings.rate_limit_auth),
+    ]
+
+
+class RateLimitMiddleware:
+    """ASGI middleware applying the first matching :class:`RateLimitRule`."""
+
+    def __init__(self, app, limiter, rules: list[RateLimitRule]) -> None:
+        self.app = app
+        self.limiter = limiter
+        self.rules = rules
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        rule = next((r for r in self.rules if r.matches(scope["method"], scope["path"])), None)
+        if rule is None:
+            return await self.app(scope, receive, send)
+
+        with phase("rate_limit"):
+            retry_after = await self.limiter.hit(f"{rule.name}:{_client_ip(scope)}", rule.limit, rule.window)
+        if retry_after is None:
+            return await self.app(scope, receive, send)
+
+        rate_limited.inc(rule=rule.name)
+        body = json.dumps({"detail": "Too many requests – try again later"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(int(retry_after), 1)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def _client_ip(scope) -> str:
+    if settings.rate_limit_trust_proxy:
+        for name, value in scope.get("headers", []):
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from app.config import settings
+from app.services import bulk
+
+router = APIRouter()
+
+_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+def check_admin_token(authorization: str) -> None:
+    """Require ``Authorization: Bearer $ADMIN_TOKEN``; 403 while no token is set."""
+    if not settings.admin_token:
+        raise HTTPException(status_code=403, detail="Admin API is disabled")
+    if authorization != f"Bearer {settings.admin_token}":
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+def _format(fmt: str | None, content_type: str = "") -> str:
+    if fmt is None:
+        fmt = "csv" if "csv" in content_type else "ndjson"
+    if fmt not in bulk.FORMATS:
+        raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+    return fmt
+
+
+@router.post("/api/admin/owners/import")
+async def import_owners(
+    request: Request,
+    fmt: str | None = Query(None, alias="format"),
+    content_type: str = Header(""),
+    authorization: str = Header(""),
+):
+    """Bulk-update owner settings from a streamed NDJSON or CSV body.
+
+    The format comes from ``format`` or the ``Content-Type`` header.  The
+    whole file is applied atomically; any invalid row rejects it.
+    """
+    check_admin_token(authorization)
+    fmt = _format(fmt, content_type)
+    try:
+        return await bulk.import_settings(bulk.iter_lines(request.stream()), fmt)
+    except bulk.BulkImportError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Body must be UTF-8")
+
+
+@router.get("/api/admin/owners/export")
+async def export_owners(
+    fmt: str = Query("ndjson", alias="format"),
+    authorization: str = Header(""),
+):
+    """Stream every owner's settings as NDJSON or CSV."""
+    check_admin_token(authorization)
+    fmt = _format(fmt)
+    return StreamingResponse(
+        bulk.stream_export(fmt),
+        media_type=_MEDIA_TYPES[fmt],
+        headers={
+            "Content-Disposition": f'attachment; filename="owners.{fmt}"',
+            "Cache-Control": "no-store",
+        },
+    )
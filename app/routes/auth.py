@@ -7,10 +7,12 @@ from urllib.parse import urlencode
 from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import RedirectResponse
 
+from app import queries
 from app.config import settings
-from app.database import get_pool
+from app.database import acquire
 from app.encryption import encrypt
 from app.services.nylas_client import exchange_code_for_grant
+from app.services.owner_cache import owner_cache
 
 router = APIRouter()
 
@@ -54,29 +56,12 @@ async def auth_google_callback(
         raise HTTPException(status_code=502, detail="No grant_id in Nylas response")
 
     encrypted_grant_id = encrypt(grant_id)
-    slug = _generate_slug()
-
-    pool = await get_pool()
-    async with pool.acquire() as conn:
-        await conn.execute(
-            """
-            INSERT INTO calendar_connections (owner_id, slug, nylas_grant_id, google_email)
-            VALUES ($1::uuid, $2, $3, $4)
-            ON CONFLICT (owner_id) DO UPDATE
-               SET nylas_grant_id = EXCLUDED.nylas_grant_id,
-                   google_email   = EXCLUDED.google_email,
-                   connected_at   = now(),
-                   is_valid       = true
-            """,
-            owner_id,
-            slug,
-            encrypted_grant_id,
-            email,
-        )
-        row = await conn.fetchrow(
-            "SELECT slug FROM calendar_connections WHERE owner_id = $1::uuid",
-            owner_id,
+
+    async with acquire() as conn:
+        final_slug = await queries.upsert_connection(
+            conn, owner_id, _generate_slug(), encrypted_grant_id, email,
         )
 
-    final_slug = row["slug"] if row else slug
+    owner_cache.invalidate_owner(owner_id)
+
     return RedirectResponse(f"/setup.html?slug={final_slug}")
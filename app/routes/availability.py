@@ -1,71 +1,319 @@
 from __future__ import annotations
 
-from datetime import date, datetime, time, timezone
+import asyncio
+import hashlib
+from datetime import date, timedelta
+from time import monotonic
+from typing import AsyncIterator
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 
 from app.config import settings
-from app.database import get_pool
-from app.encryption import decrypt
-from app.services.calendar import compute_available_slots
-from app.services.nylas_client import get_free_busy
+from app.metrics import phase
+from app.routes.errors import nylas_error
+from app.services import busy_mirror, ledger, live, rules, slot_codec, warmup
+from app.services.freebusy_cache import freebusy_cache
+from app.services.owner_cache import OwnerConnection, owner_cache
+from app.services.resilience import clear_deadline, deadline
 
 router = APIRouter()
 
+_MAX_RANGE_DAYS = 62
 
-@router.get("/api/availability")
-async def availability(
-    slug: str = Query(...),
-    date_str: str = Query(..., alias="date"),
-):
-    if not slug:
-        raise HTTPException(status_code=400, detail="slug is required")
 
+def _parse_date(value: str) -> date:
     try:
-        target_date = date.fromisoformat(date_str)
+        return date.fromisoformat(value)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format, use YYYY-MM-DD")
 
-    pool = await get_pool()
-    async with pool.acquire() as conn:
-        row = await conn.fetchrow(
-            "SELECT nylas_grant_id, google_email, timezone, "
-            "business_hours_start, business_hours_end, slot_duration_minutes "
-            "FROM calendar_connections WHERE slug = $1 AND is_valid = true",
-            slug,
-        )
-    if not row:
+
+async def _load_owner(slug: str) -> OwnerConnection:
+    if not slug:
+        raise HTTPException(status_code=400, detail="slug is required")
+
+    owner = await owner_cache.get(slug)
+    if not owner:
         raise HTTPException(status_code=404, detail="No calendar connected for this owner")
+    return owner
 
-    grant_id = decrypt(row["nylas_grant_id"])
-    email = row["google_email"] or ""
-    tz = row["timezone"] or "UTC"
-    slot_duration = row["slot_duration_minutes"] or settings.slot_duration_minutes
 
-    bh_start = time.fromisoformat(row["business_hours_start"] or settings.business_hours_start)
-    bh_end = time.fromisoformat(row["business_hours_end"] or settings.business_hours_end)
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [c.strip().removeprefix("W/") for c in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
 
-    day_start_dt = datetime.combine(target_date, bh_start, tzinfo=timezone.utc)
-    day_end_dt = datetime.combine(target_date, bh_end, tzinfo=timezone.utc)
 
-    try:
-        busy_blocks = await get_free_busy(
-            grant_id,
-            int(day_start_dt.timestamp()),
-            int(day_end_dt.timestamp()),
-            email,
+def _cached_response(
+    payload: dict,
+    owner: OwnerConnection,
+    version: int | None,
+    if_none_match: str | None,
+    media_type: str = slot_codec.JSON_MEDIA_TYPE,
+) -> Response:
+    """Serve *payload* with a strong ETag and cache headers, or a 304.
+
+    The ETag covers the slots and every owner setting that shapes them.
+    Only requests carrying the owner's current ``availability_version`` as
+    ``v`` may be cached by shared caches: the version is bumped on every
+    booking and settings change, so a confirmed booking moves clients to a
+    new URL instead of being hidden behind a cached one.
+    """
+    body = slot_codec.dumps(payload)
+    digest = hashlib.sha256(body)
+    digest.update(
+        f"{owner.timezone}|{owner.business_hours_start}|{owner.business_hours_end}|"
+        f"{owner.availability_rules or ''}".encode()
+    )
+    etag = f'"{digest.hexdigest()[:32]}"'
+
+    if version is not None and version == owner.availability_version:
+        cache_control = (
+            f"public, max-age={settings.availability_cache_max_age}, "
+            f"s-maxage={settings.availability_cache_s_maxage}, "
+            f"stale-while-revalidate={settings.availability_cache_swr}"
         )
+    else:
+        cache_control = "no-cache"
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept"}
+
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type=media_type, headers=headers)
+
+
+async def _free_busy(owner: OwnerConnection, start_time: int, end_time: int) -> list[dict]:
+    if settings.busy_mirror_enabled:
+        mirrored = await busy_mirror.busy_blocks(
+            owner.grant_id, start_time, end_time, rules.compiled(owner).tz,
+        )
+        if mirrored is not None:
+            return mirrored
+    try:
+        return await freebusy_cache.get(owner.grant_id, start_time, end_time, owner.email, owner)
     except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"Nylas free/busy call failed: {exc}")
+        raise nylas_error(exc, "Nylas free/busy call failed")
 
-    slots = compute_available_slots(
-        busy_blocks, target_date, bh_start, bh_end, slot_duration,
-    )
 
-    return {
+async def day_slots(owner: OwnerConnection, target_date: date) -> list[dict]:
+    """Free slots of *owner* on their local *target_date*, from a snapshot or live."""
+    warmup.touch(owner.id)
+    compiled = rules.compiled(owner)
+    if not compiled.windows(target_date):
+        return []
+    day_start, day_end = compiled.day_bounds(target_date)
+
+    snapshot, booked = await warmup.day_snapshot(owner.id, target_date, day_start, day_end)
+    if snapshot is not None:
+        return compiled.still_bookable(snapshot)
+
+    # Buffers reach past the windows, so fetch free/busy for the whole day.
+    busy_blocks = await _free_busy(owner, day_start, day_end)
+    with phase("slots"):
+        return compiled.slots([target_date], busy_blocks, booked)[0]
+
+
+@router.get("/api/availability")
+async def availability(
+    slug: str = Query(...),
+    date_str: str = Query(..., alias="date"),
+    version: int | None = Query(None, alias="v"),
+    fmt: str | None = Query(None, alias="format"),
+    accept: str | None = Header(None),
+    if_none_match: str | None = Header(None),
+):
+    target_date = _parse_date(date_str)
+    owner = await _load_owner(slug)
+
+    email = owner.email
+    tz = owner.timezone
+    slot_duration = owner.slot_duration_minutes
+    slots = await day_slots(owner, target_date)
+
+    payload = {
         "date": date_str,
         "timezone": tz,
         "slot_duration_minutes": slot_duration,
-        "slots": slots,
         "owner_email": email,
+        "availability_version": owner.availability_version,
     }
+    if slot_codec.wants_compact(accept, fmt):
+        windows = rules.compiled(owner).windows(target_date)
+        payload.update(slot_codec.encode_day(slots, windows, slot_duration * 60))
+        return _cached_response(
+            payload, owner, version, if_none_match, slot_codec.COMPACT_MEDIA_TYPE,
+        )
+    payload["slots"] = slots
+    return _cached_response(payload, owner, version, if_none_match)
+
+
+@router.get("/api/availability/range")
+async def availability_range(
+    slug: str = Query(...),
+    start_str: str = Query(..., alias="start"),
+    end_str: str = Query(..., alias="end"),
+    version: int | None = Query(None, alias="v"),
+    fmt: str | None = Query(None, alias="format"),
+    accept: str | None = Header(None),
+    if_none_match: str | None = Header(None),
+):
+    """Available slots for every day from *start* to *end* inclusive.
+
+    Served from warm-up snapshots when every day has a current one.
+    Otherwise the whole window is fetched with one free/busy call per chunk
+    of ``availability_range_chunk_days`` days, issued concurrently.
+
+    With ``format=compact`` (or the compact media type in ``Accept``) each
+    day is sent as a bitmap over its slot grid instead of a slot list.
+    """
+    start_date = _parse_date(start_str)
+    end_date = _parse_date(end_str)
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    num_days = (end_date - start_date).days + 1
+    if num_days > _MAX_RANGE_DAYS:
+        raise HTTPException(
+            status_code=400, detail=f"Range is limited to {_MAX_RANGE_DAYS} days"
+        )
+
+    owner = await _load_owner(slug)
+
+    email = owner.email
+    tz = owner.timezone
+    slot_duration = owner.slot_duration_minutes
+    compiled = rules.compiled(owner)
+
+    days = [start_date + timedelta(days=i) for i in range(num_days)]
+    warmup.touch(owner.id)
+    snapshot = await warmup.snapshot_slots(owner.id, start_date, end_date)
+    if len(snapshot) == num_days:
+        per_day = [compiled.still_bookable(snapshot[d]) for d in days]
+    else:
+        per_day = await _range_slots(owner, days)
+
+    payload = {
+        "start": start_date.isoformat(),
+        "end": end_date.isoformat(),
+        "timezone": tz,
+        "slot_duration_minutes": slot_duration,
+        "owner_email": email,
+        "availability_version": owner.availability_version,
+    }
+    if slot_codec.wants_compact(accept, fmt):
+        payload["days"] = [
+            {"date": d.isoformat(), **slot_codec.encode_day(slots, compiled.windows(d), slot_duration * 60)}
+            for d, slots in zip(days, per_day)
+        ]
+        return _cached_response(
+            payload, owner, version, if_none_match, slot_codec.COMPACT_MEDIA_TYPE,
+        )
+    payload["days"] = [
+        {"date": d.isoformat(), "slots": slots, "fully_booked": not slots}
+        for d, slots in zip(days, per_day)
+    ]
+    return _cached_response(payload, owner, version, if_none_match)
+
+
+async def _range_slots(owner: OwnerConnection, days: list[date]) -> list[list[dict]]:
+    compiled = rules.compiled(owner)
+    num_days = len(days)
+    bounds = [compiled.day_bounds(d) for d in days]
+
+    chunk = max(settings.availability_range_chunk_days, 1)
+    calls = [
+        _free_busy(owner, bounds[i][0], bounds[min(i + chunk, num_days) - 1][1])
+        for i in range(0, num_days, chunk)
+    ]
+    booked, *results = await asyncio.gather(
+        ledger.busy_blocks(owner.id, bounds[0][0], bounds[-1][1]), *calls,
+    )
+
+    busy_blocks = [block for result in results for block in result]
+    with phase("slots"):
+        return compiled.slots(days, busy_blocks, booked)
+
+
+# How long EventSource waits before reconnecting after a stream ends, and
+# after one that could not compute its first slots.
+_SSE_RETRY_MS = 2000
+_SSE_ERROR_RETRY_MS = 30000
+
+
+def _sse(event: str, data: dict) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + slot_codec.dumps(data) + b"\n\n"
+
+
+@router.get("/api/availability/stream")
+async def availability_stream(
+    slug: str = Query(...),
+    date_str: str = Query(..., alias="date"),
+):
+    """Server-sent events carrying one day's slots as they change.
+
+    The first ``slots`` event has the full list; each later ``change``
+    event lists the slots ``added`` and ``removed`` since the previous one,
+    with the new ``availability_version``.  If the first computation
+    fails, a single ``unavailable`` event asks the browser to retry later.
+    Comment lines keep idle connections open, and the stream ends after
+    ``live_stream_max_seconds`` so serverless functions return in time;
+    ``EventSource`` reconnects on its own.
+    """
+    target_date = _parse_date(date_str)
+    owner = await _load_owner(slug)
+    return StreamingResponse(
+        _slot_events(owner, target_date),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _slot_events(owner: OwnerConnection, target_date: date) -> AsyncIterator[bytes]:
+    # The request's Nylas budget would run out long before the stream does;
+    # each recomputation gets a budget of its own instead.
+    clear_deadline()
+    ends = monotonic() + settings.live_stream_max_seconds
+    async with live.hub.subscribe(owner.slug) as sub:
+        # Subscribed before the first computation, so no change is missed.
+        try:
+            with deadline(settings.request_deadline_seconds or 60.0):
+                slots = await day_slots(owner, target_date)
+        except Exception:
+            # The headers are already sent, so say so in the stream; without
+            # a longer retry EventSource would reconnect straight away.
+            yield f"retry: {_SSE_ERROR_RETRY_MS}\n".encode() + _sse("unavailable", {
+                "date": target_date.isoformat(),
+                "detail": "Availability is temporarily unavailable",
+            })
+            return
+        version = owner.availability_version
+        yield f"retry: {_SSE_RETRY_MS}\n".encode() + _sse("slots", {
+            "date": target_date.isoformat(),
+            "availability_version": version,
+            "slots": slots,
+        })
+
+        while (left := ends - monotonic()) > 0:
+            fresh = await sub.next(min(settings.live_heartbeat_seconds, left))
+            if fresh is None:
+                yield b": ping\n\n"
+                continue
+            if fresh.availability_version == version:
+                continue
+            try:
+                with deadline(settings.request_deadline_seconds or 60.0):
+                    new_slots = await day_slots(fresh, target_date)
+            except Exception:
+                # Keep the old version so the next change retries.
+                continue
+            version = fresh.availability_version
+            before = {s["start_time"] for s in slots}
+            after = {s["start_time"] for s in new_slots}
+            yield _sse("change", {
+                "date": target_date.isoformat(),
+                "availability_version": version,
+                "added": [s for s in new_slots if s["start_time"] not in before],
+                "removed": [s for s in slots if s["start_time"] not in after],
+            })
+            slots = new_slots
@@ -1,78 +1,238 @@
 from __future__ import annotations
 
-import time as _time
-from collections import defaultdict
 from datetime import datetime, timezone
+from typing import Awaitable, Callable, Sequence
+from uuid import UUID
 
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, EmailStr
 
-from app.database import get_pool
-from app.encryption import decrypt
+from app.config import settings
+from app.routes.errors import nylas_error
+from app.services import idempotency, ledger, live, outbox, rules
+from app.services.freebusy_cache import freebusy_cache
 from app.services.nylas_client import create_event, get_free_busy
+from app.services.owner_cache import OwnerConnection, owner_cache
 
 router = APIRouter()
 
-_RATE_WINDOW = 60
-_RATE_LIMIT = 10
-_request_log: dict[str, list[float]] = defaultdict(list)
 
-
-def _check_rate_limit(ip: str) -> None:
-    now = _time.time()
-    window_start = now - _RATE_WINDOW
-    log = _request_log[ip]
-    _request_log[ip] = [t for t in log if t > window_start]
-    if len(_request_log[ip]) >= _RATE_LIMIT:
-        raise HTTPException(status_code=429, detail="Too many requests – try again later")
-    _request_log[ip].append(now)
-
-
-class BookingRequest(BaseModel):
-    slug: str
+class SlotRequest(BaseModel):
     start_time: int
     end_time: int
     customer_name: str
     customer_email: EmailStr
 
 
+class BookingRequest(SlotRequest):
+    slug: str
+
+
 class BookingResponse(BaseModel):
     status: str
+    booking_id: str
     event_id: str
     title: str
     start_time: int
     end_time: int
     customer_name: str
     customer_email: str
+    availability_version: int | None = None
+
+
+class BookingStatus(BaseModel):
+    booking_id: str
+    status: str
+    event_id: str | None = None
+    failure_reason: str | None = None
+    start_time: int
+    end_time: int
+    customer_name: str | None = None
+    customer_email: str | None = None
 
 
 @router.post("/api/book", response_model=BookingResponse)
-async def book(body: BookingRequest, request: Request):
-    client_ip = request.client.host if request.client else "unknown"
-    _check_rate_limit(client_ip)
+async def book(body: BookingRequest, idempotency_key: str | None = Header(None)):
+    if not idempotency_key:
+        return _respond(await _book(body))
+    return await run_idempotent(
+        f"book:{idempotency_key}", body.model_dump(), lambda: _book(body),
+    )
+
+
+@router.get("/api/book/{booking_id}", response_model=BookingStatus)
+async def booking_status(booking_id: UUID):
+    """Poll target for bookings accepted with ``202``."""
+    booking = await ledger.get(str(booking_id))
+    if booking is None:
+        raise HTTPException(status_code=404, detail="Booking not found")
+    return BookingStatus(**booking)
+
+
+def _status_code(response: BookingResponse) -> int:
+    return 202 if response.status == "pending" else 200
+
 
+def _respond(response: BookingResponse):
+    if response.status == "pending":
+        return JSONResponse(response.model_dump(), status_code=202)
+    return response
+
+
+async def run_idempotent(key: str, payload: dict, handler: Callable[[], Awaitable[BookingResponse]]):
+    """Run *handler* at most once per *key* and replay its outcome.
+
+    Successes and client errors (4xx) are stored and replayed with an
+    ``Idempotent-Replayed`` header and no Nylas traffic; a duplicate that
+    arrives while the first is running waits for it.  Server errors release
+    the key so the client's retry is attempted afresh.
+    """
+    try:
+        stored = await idempotency.begin(key, idempotency.request_hash(payload))
+    except idempotency.KeyReused:
+        raise HTTPException(
+            status_code=422, detail="Idempotency-Key was already used with a different request"
+        )
+    except idempotency.StillRunning:
+        raise HTTPException(
+            status_code=409, detail="A request with this Idempotency-Key is still in progress"
+        )
+    if stored is not None:
+        status_code, stored_body = stored
+        return JSONResponse(stored_body, status_code=status_code, headers={"Idempotent-Replayed": "true"})
+
+    try:
+        response = await handler()
+    except HTTPException as exc:
+        if exc.status_code < 500:
+            await idempotency.complete(key, exc.status_code, {"detail": exc.detail})
+        else:
+            await idempotency.abandon(key)
+        raise
+    except BaseException:
+        await idempotency.abandon(key)
+        raise
+    await idempotency.complete(key, _status_code(response), response.model_dump())
+    return _respond(response)
+
+
+async def _book(body: BookingRequest) -> BookingResponse:
     if not body.slug:
         raise HTTPException(status_code=400, detail="slug is required")
     if body.end_time <= body.start_time:
         raise HTTPException(status_code=400, detail="end_time must be after start_time")
 
-    pool = await get_pool()
-    async with pool.acquire() as conn:
-        row = await conn.fetchrow(
-            "SELECT nylas_grant_id, google_email FROM calendar_connections "
-            "WHERE slug = $1 AND is_valid = true",
-            body.slug,
-        )
-    if not row:
+    owner = await owner_cache.get(body.slug)
+    if not owner:
         raise HTTPException(status_code=404, detail="No calendar connected for this owner")
+    if not rules.compiled(owner).allows(body.start_time, body.end_time):
+        raise HTTPException(status_code=400, detail="Slot is outside the owner's availability")
+
+    if settings.async_booking:
+        return await _queue_booking(owner, body)
+
+    booking_id, event_id, version = await place_booking(owner, body)
+
+    return BookingResponse(
+        status="confirmed",
+        booking_id=booking_id,
+        event_id=event_id,
+        title=_title(body),
+        start_time=body.start_time,
+        end_time=body.end_time,
+        customer_name=body.customer_name,
+        customer_email=body.customer_email,
+        availability_version=version,
+    )
+
+
+async def _queue_booking(owner: OwnerConnection, body: SlotRequest) -> BookingResponse:
+    """Reserve the slot and leave the calendar event to the outbox worker."""
+    try:
+        booking_id, version = await ledger.enqueue(
+            owner.id, body.start_time, body.end_time, body.customer_name, body.customer_email,
+            rules=rules.compiled(owner),
+        )
+    except ledger.SlotTaken:
+        raise HTTPException(status_code=409, detail="Time slot is no longer available")
+
+    owner_cache.invalidate(owner.slug)
+    live.hub.publish(owner.slug, version)
+    if settings.outbox_inline_drain:
+        outbox.kick()
+    return BookingResponse(
+        status="pending",
+        booking_id=booking_id,
+        event_id="",
+        title=_title(body),
+        start_time=body.start_time,
+        end_time=body.end_time,
+        customer_name=body.customer_name,
+        customer_email=body.customer_email,
+        availability_version=version,
+    )
+
 
-    grant_id = decrypt(row["nylas_grant_id"])
-    email = row["google_email"] or ""
+async def place_booking(
+    owner: OwnerConnection,
+    body: SlotRequest,
+    extra_participants: list[dict] | None = None,
+    co_hosts: Sequence[OwnerConnection] = (),
+) -> tuple[str, str, int]:
+    """Claim the slot for *owner*, create the event and confirm the claim.
 
+    The slot is held for *co_hosts* too, in the same ledger transaction,
+    and each host's buffers and daily limit are checked there.
+    Raises 409 if the slot is taken and 502 if Nylas fails; the claim is
+    released on any failure.  Returns ``(booking_id, event_id,
+    availability_version)``, the version being the owner's new one.
+    """
+    try:
+        booking_id = await ledger.claim(
+            owner.id, body.start_time, body.end_time, body.customer_name, body.customer_email,
+            rules=rules.compiled(owner),
+            also_hold=[(m.id, rules.compiled(m)) for m in co_hosts],
+        )
+    except ledger.SlotTaken:
+        raise HTTPException(status_code=409, detail="Time slot is no longer available")
+
+    try:
+        event_id = await _create_booking_event(
+            owner.grant_id, owner.email, body, extra_participants,
+        )
+    except BaseException:
+        await ledger.release(booking_id)
+        raise
+    version = await ledger.confirm(booking_id, event_id)
+    freebusy_cache.invalidate_grant(owner.grant_id)
+    owner_cache.invalidate(owner.slug)
+    live.hub.publish(owner.slug, version)
+    for member in co_hosts:
+        freebusy_cache.invalidate_grant(member.grant_id)
+        owner_cache.invalidate(member.slug)
+        live.hub.publish(member.slug, 0)
+    return booking_id, event_id, version
+
+
+def _title(body: SlotRequest) -> str:
+    return f"Booking: {body.customer_name}"
+
+
+async def _create_booking_event(
+    grant_id: str,
+    email: str,
+    body: SlotRequest,
+    extra_participants: list[dict] | None = None,
+) -> str:
+    """Re-check the calendar for the claimed slot and create the event.
+
+    Returns the Nylas event ID.
+    """
     try:
         busy = await get_free_busy(grant_id, body.start_time, body.end_time, email)
     except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"Nylas free/busy check failed: {exc}")
+        raise nylas_error(exc, "Nylas free/busy check failed")
 
     slot_start = datetime.fromtimestamp(body.start_time, tz=timezone.utc)
     slot_end = datetime.fromtimestamp(body.end_time, tz=timezone.utc)
@@ -83,28 +243,18 @@ async def book(body: BookingRequest, request: Request):
         if b_start < slot_end and b_end > slot_start:
             raise HTTPException(status_code=409, detail="Time slot is no longer available")
 
-    title = f"Booking: {body.customer_name}"
-
     try:
         event_data = await create_event(
             grant_id=grant_id,
-            title=title,
+            title=_title(body),
             start_time=body.start_time,
             end_time=body.end_time,
             participant_email=body.customer_email,
             participant_name=body.customer_name,
+            extra_participants=extra_participants,
         )
     except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"Failed to create event: {exc}")
+        raise nylas_error(exc, "Failed to create event")
 
     event = event_data.get("data", event_data)
-
-    return BookingResponse(
-        status="confirmed",
-        event_id=event.get("id", ""),
-        title=title,
-        start_time=body.start_time,
-        end_time=body.end_time,
-        customer_name=body.customer_name,
-        customer_email=body.customer_email,
-    )
+    return event.get("id", "")
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Header, HTTPException
+
+from app.config import settings
+from app.services import outbox, warmup
+
+router = APIRouter()
+
+
+def _check_cron_secret(authorization: str) -> None:
+    # Vercel sends CRON_SECRET as a bearer token on scheduled invocations.
+    # Without one the endpoints stay off; locally, use ``python -m app.cli``.
+    if not settings.cron_secret:
+        raise HTTPException(status_code=503, detail="Cron endpoints are disabled until CRON_SECRET is set")
+    if authorization != f"Bearer {settings.cron_secret}":
+        raise HTTPException(status_code=401, detail="Invalid cron secret")
+
+
+@router.get("/api/cron/outbox")
+async def drain_outbox(authorization: str = Header("")):
+    _check_cron_secret(authorization)
+    return await outbox.drain(max_seconds=settings.cron_max_seconds)
+
+
+@router.get("/api/cron/warmup")
+async def warm_availability(authorization: str = Header("")):
+    _check_cron_secret(authorization)
+    return await warmup.run(max_seconds=settings.cron_max_seconds)
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from fastapi import HTTPException
+
+from app.services.resilience import CircuitOpen, DeadlineExceeded
+
+
+def nylas_error(exc: Exception, detail: str) -> HTTPException:
+    """Map a failed Nylas call to the HTTP error the client should see.
+
+    An open circuit breaker is a 503 with ``Retry-After``, an exhausted
+    latency budget a 504, and anything else a 502.
+    """
+    if isinstance(exc, CircuitOpen):
+        return HTTPException(
+            status_code=503,
+            detail="Calendar provider is unavailable, try again shortly",
+            headers={"Retry-After": str(max(int(exc.retry_after), 1))},
+        )
+    if isinstance(exc, DeadlineExceeded):
+        return HTTPException(status_code=504, detail="Calendar provider timed out")
+    return HTTPException(status_code=502, detail=f"{detail}: {exc}")
@@ -1,9 +1,14 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException
+import json
+
+from fastapi import APIRouter, HTTPException, Response
 from pydantic import BaseModel
 
-from app.database import get_pool
+from app import queries
+from app.database import acquire
+from app.services import live, rules
+from app.services.owner_cache import owner_cache
 
 router = APIRouter()
 
@@ -13,51 +18,56 @@ class OwnerSettings(BaseModel):
     business_hours_start: str = "09:00"
     business_hours_end: str = "17:00"
     slot_duration_minutes: int = 30
+    # Weekly windows, breaks, overrides, buffers and limits; see
+    # app.services.rules.  Omit to keep the stored rules, null to clear them.
+    rules: dict | None = None
 
 
 @router.get("/api/owner/{slug}")
-async def get_owner(slug: str):
-    pool = await get_pool()
-    async with pool.acquire() as conn:
-        row = await conn.fetchrow(
-            "SELECT slug, google_email, timezone, business_hours_start, "
-            "business_hours_end, slot_duration_minutes "
-            "FROM calendar_connections WHERE slug = $1 AND is_valid = true",
-            slug,
-        )
-    if not row:
+async def get_owner(slug: str, response: Response):
+    owner = await owner_cache.get(slug)
+    if not owner:
         raise HTTPException(status_code=404, detail="Owner not found")
 
+    # The version keys cached availability URLs, so it must never be stale.
+    response.headers["Cache-Control"] = "no-store"
+
     return {
-        "slug": row["slug"],
-        "email": row["google_email"],
-        "timezone": row["timezone"],
-        "business_hours_start": row["business_hours_start"],
-        "business_hours_end": row["business_hours_end"],
-        "slot_duration_minutes": row["slot_duration_minutes"],
+        "slug": owner.slug,
+        "email": owner.email,
+        "timezone": owner.timezone,
+        "business_hours_start": owner.business_hours_start,
+        "business_hours_end": owner.business_hours_end,
+        "slot_duration_minutes": owner.slot_duration_minutes,
+        "availability_version": owner.availability_version,
+        "rules": json.loads(owner.availability_rules) if owner.availability_rules else None,
     }
 
 
 @router.post("/api/owner/{slug}/settings")
 async def update_settings(slug: str, body: OwnerSettings):
-    pool = await get_pool()
-    async with pool.acquire() as conn:
-        result = await conn.execute(
-            """
-            UPDATE calendar_connections
-            SET timezone = $1,
-                business_hours_start = $2,
-                business_hours_end = $3,
-                slot_duration_minutes = $4
-            WHERE slug = $5 AND is_valid = true
-            """,
+    try:
+        rules.parse(
+            body.rules, body.timezone, body.business_hours_start, body.business_hours_end,
+            body.slot_duration_minutes,
+        )
+    except (TypeError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid settings: {exc}")
+
+    async with acquire() as conn:
+        new_version = await queries.update_settings(
+            conn,
+            slug,
             body.timezone,
             body.business_hours_start,
             body.business_hours_end,
             body.slot_duration_minutes,
-            slug,
+            json.dumps(body.rules) if body.rules is not None else None,
+            replace_rules="rules" in body.model_fields_set,
         )
-    if result == "UPDATE 0":
+    owner_cache.invalidate(slug)
+    if new_version is None:
         raise HTTPException(status_code=404, detail="Owner not found")
+    live.hub.publish(slug, new_version)
 
-    return {"status": "saved"}
+    return {"status": "saved", "availability_version": new_version}
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import asyncio
+import html
+import json
+from string import Template
+
+from fastapi import APIRouter, Header, HTTPException
+
+from app import assets
+from app.config import settings
+from app.routes.availability import day_slots
+from app.services import rules
+from app.services.owner_cache import owner_cache
+
+router = APIRouter()
+
+_BOOKING_HTML = Template("""<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="UTF-8">
+  <meta name="viewport" content="width=device-width, initial-scale=1.0">
+  <title>Book an Appointment</title>
+  <link rel="stylesheet" href="${styles_url}">
+  <link rel="preload" href="${script_url}" as="script">
+</head>
+<body>
+  <div class="container">
+    <h1>Book an Appointment</h1>
+    <p class="subtitle" id="ownerInfo">${owner_info}</p>
+    <div id="errorMsg" class="status-msg error hidden"></div>
+    <div id="stepDate" class="card">
+      <h2>Select a Date</h2>
+      <div class="form-group"><input type="date" id="datePicker" /></div>
+      <div id="dayStrip" class="day-strip"></div>
+    </div>
+    <div id="stepSlots" class="card hidden">
+      <h2>Available Times</h2>
+      <div id="slotsLoading" class="loading-text">Loading available times&hellip;</div>
+      <div id="slotsGrid" class="slots-grid"></div>
+      <p id="noSlots" class="loading-text hidden">No available slots for this date.</p>
+    </div>
+    <div id="stepForm" class="card hidden">
+      <h2>Your Details</h2>
+      <div class="form-group"><label for="customerName">Name</label>
+        <input type="text" id="customerName" placeholder="Jane Smith" required /></div>
+      <div class="form-group"><label for="customerEmail">Email</label>
+        <input type="email" id="customerEmail" placeholder="jane@example.com" required /></div>
+      <button class="btn btn-primary" id="bookBtn" disabled>Confirm Booking</button>
+    </div>
+    <div id="stepConfirm" class="card hidden">
+      <div class="confirmation">
+        <div class="check-icon">&#10003;</div>
+        <h2>Booking Confirmed</h2>
+        <p>You'll receive a calendar invite shortly.</p>
+      </div>
+      <div id="confirmDetails"></div><br/>
+      <button class="btn btn-primary" onclick="location.reload()">Book Another</button>
+    </div>
+  </div>
+  <script id="initialData" type="application/json">${initial}</script>
+  <script src="${script_url}"></script>
+</body>
+</html>""")
+
+
+async def _initial_data(slug: str) -> dict:
+    """Owner and today's slots for *slug*, or ``{}`` if they are not ready in time.
+
+    The page still works without them: ``app.js`` then fetches the same data
+    from the API.
+    """
+    try:
+        owner = await owner_cache.get(slug)
+        if owner is None:
+            return {}
+        today = rules.compiled(owner).today()
+        slots = await asyncio.wait_for(day_slots(owner, today), settings.booking_page_render_timeout)
+    except Exception:
+        return {}
+    return {
+        "date": today.isoformat(),
+        "slots": slots,
+        "owner_email": owner.email,
+        "availability_version": owner.availability_version,
+    }
+
+
+def _script_json(data: dict) -> str:
+    # "<" is escaped so the payload can never close the <script> element.
+    return json.dumps(data, separators=(",", ":")).replace("<", "\\u003c")
+
+
+@router.get("/book/{slug:path}")
+async def serve_booking_page(slug: str, accept_encoding: str = Header("")):
+    """The booking page, rendered with the owner and today's slots.
+
+    A customer sees a usable slot grid after this one round trip; the
+    hashed script and stylesheet are cached by the browser and CDN forever.
+    """
+    initial = await _initial_data(slug.strip("/").split("/")[0])
+    owner_email = initial.get("owner_email")
+    body = _BOOKING_HTML.substitute(
+        styles_url=assets.url("styles.css"),
+        script_url=assets.url("app.js"),
+        owner_info=(
+            f"Booking with {html.escape(owner_email)}" if owner_email
+            else "Choose a date and time that works for you."
+        ),
+        initial=_script_json(initial),
+    ).encode()
+    gz, br = assets.compress(body, fast=True)
+    return assets.encoded_response(
+        body, gz, br, "text/html; charset=utf-8", accept_encoding,
+        {"Cache-Control": "private, no-cache"},
+    )
+
+
+@router.get("/assets/{name}")
+async def serve_asset(name: str, accept_encoding: str = Header("")):
+    asset = assets.lookup(name)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return assets.encoded_response(
+        asset.identity, asset.gzip, asset.br, asset.media_type, accept_encoding,
+        {"Cache-Control": assets.IMMUTABLE},
+    )
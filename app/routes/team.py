@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import secrets
+from datetime import date, datetime, time, timezone
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from pydantic import BaseModel
+
+from app.database import acquire
+from app.routes.admin import check_admin_token
+from app.routes.booking import BookingResponse, SlotRequest, _title, place_booking, run_idempotent
+from app.routes.errors import nylas_error
+from app.services import rules
+from app.services import team as team_service
+
+router = APIRouter()
+
+
+class TeamCreate(BaseModel):
+    name: str
+    member_slugs: list[str]
+    mode: str = "any"
+    slug: str | None = None
+    business_hours_start: str = "09:00"
+    business_hours_end: str = "17:00"
+    slot_duration_minutes: int = 30
+
+
+async def _load_team(slug: str) -> team_service.Team:
+    team = await team_service.load_team(slug)
+    if not team or not team.members:
+        raise HTTPException(status_code=404, detail="Team not found")
+    return team
+
+
+def _day_window(team: team_service.Team, target_date: date) -> tuple[int, int]:
+    bh_start = time.fromisoformat(team.business_hours_start)
+    bh_end = time.fromisoformat(team.business_hours_end)
+    return (
+        int(datetime.combine(target_date, bh_start, tzinfo=timezone.utc).timestamp()),
+        int(datetime.combine(target_date, bh_end, tzinfo=timezone.utc).timestamp()),
+    )
+
+
+@router.post("/api/team")
+async def create_team(body: TeamCreate, authorization: str = Header("")):
+    # A team page books straight into its members' calendars.
+    check_admin_token(authorization)
+    if body.mode not in team_service.MODES:
+        raise HTTPException(status_code=400, detail="mode must be 'any' or 'all'")
+    if not body.member_slugs:
+        raise HTTPException(status_code=400, detail="member_slugs is required")
+    try:
+        # Team hours are plain UTC business hours; the owner checks apply.
+        rules.parse(
+            None, "UTC", body.business_hours_start, body.business_hours_end,
+            body.slot_duration_minutes,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid settings: {exc}")
+
+    slug = body.slug or secrets.token_urlsafe(6)[:8].lower()
+    async with acquire() as conn:
+        async with conn.transaction():
+            team_id = await conn.fetchval(
+                """
+                INSERT INTO teams (slug, name, mode, business_hours_start,
+                                   business_hours_end, slot_duration_minutes)
+                VALUES ($1, $2, $3, $4, $5, $6)
+                ON CONFLICT (slug) DO NOTHING
+                RETURNING id
+                """,
+                slug,
+                body.name,
+                body.mode,
+                body.business_hours_start,
+                body.business_hours_end,
+                body.slot_duration_minutes,
+            )
+            if team_id is None:
+                raise HTTPException(status_code=409, detail="Team slug already taken")
+            added = await conn.execute(
+                """
+                INSERT INTO team_members (team_id, connection_id)
+                SELECT $1, id FROM calendar_connections
+                WHERE slug = ANY($2::text[]) AND is_valid = true
+                """,
+                team_id,
+                body.member_slugs,
+            )
+    return {"slug": slug, "members": int(added.split()[-1])}
+
+
+@router.get("/api/team/{slug}/availability")
+async def team_availability(slug: str, date_str: str = Query(..., alias="date")):
+    try:
+        target_date = date.fromisoformat(date_str)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format, use YYYY-MM-DD")
+
+    team = await _load_team(slug)
+    day_start, day_end = _day_window(team, target_date)
+
+    try:
+        busy = await team_service.member_busy(team.members, day_start, day_end)
+    except Exception as exc:
+        raise nylas_error(exc, "Nylas free/busy call failed")
+
+    slots = team_service.team_slots(
+        team.mode, busy, [m.id for m in team.members], day_start, day_end,
+        team.slot_duration_minutes,
+        member_rules={m.id: rules.compiled(m) for m in team.members},
+    )
+    return {
+        "date": date_str,
+        "team": team.name,
+        "mode": team.mode,
+        "slot_duration_minutes": team.slot_duration_minutes,
+        "slots": slots,
+    }
+
+
+@router.post("/api/team/{slug}/book", response_model=BookingResponse)
+async def team_book(slug: str, body: SlotRequest, idempotency_key: str | None = Header(None)):
+    if not idempotency_key:
+        return await _team_book(slug, body)
+    return await run_idempotent(
+        f"team:{slug}:{idempotency_key}", body.model_dump(), lambda: _team_book(slug, body),
+    )
+
+
+async def _team_book(slug: str, body: SlotRequest) -> BookingResponse:
+    if body.end_time <= body.start_time:
+        raise HTTPException(status_code=400, detail="end_time must be after start_time")
+
+    team = await _load_team(slug)
+    day = datetime.fromtimestamp(body.start_time, tz=timezone.utc).date()
+    window_start, window_end = _day_window(team, day)
+    if body.start_time < window_start or body.end_time > window_end:
+        raise HTTPException(status_code=400, detail="Slot is outside the team's availability")
+    # Each member's own rules (hours, notice, overrides) apply as well.
+    allowed = {
+        m.id for m in team.members if rules.compiled(m).allows(body.start_time, body.end_time)
+    }
+    if not allowed or (team.mode == "all" and len(allowed) != len(team.members)):
+        raise HTTPException(status_code=400, detail="Slot is outside the team's availability")
+    day_start = int(datetime.combine(day, time.min, tzinfo=timezone.utc).timestamp())
+
+    try:
+        hosts = await team_service.rank_hosts(
+            team, body.start_time, body.end_time, day_start, day_start + 86400,
+        )
+    except Exception as exc:
+        raise nylas_error(exc, "Nylas free/busy check failed")
+    hosts = [h for h in hosts if h.id in allowed]
+    if team.mode == "all":
+        # Every member is held with the first host, so another host would
+        # race for exactly the same claims.
+        hosts = hosts[:1]
+
+    for host in hosts:
+        co_hosts = [m for m in team.members if team.mode == "all" and m.id != host.id]
+        others = [{"email": m.email, "name": m.email} for m in co_hosts if m.email]
+        try:
+            booking_id, event_id, _ = await place_booking(host, body, others, co_hosts)
+        except HTTPException as exc:
+            if exc.status_code == 409:
+                continue  # lost a race for this host; try the next one
+            raise
+        return BookingResponse(
+            status="confirmed",
+            booking_id=booking_id,
+            event_id=event_id,
+            title=_title(body),
+            start_time=body.start_time,
+            end_time=body.end_time,
+            customer_name=body.customer_name,
+            customer_email=body.customer_email,
+        )
+
+    raise HTTPException(status_code=409, detail="Time slot is no longer available")
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+
+from app.config import settings
+from app.services import busy_mirror, warmup
+from app.services.freebusy_cache import freebusy_cache
+
+router = APIRouter()
+
+_EVENT_TYPES = {"event.created", "event.updated", "event.deleted"}
+
+
+def verify_signature(body: bytes, signature: str, secret: str) -> bool:
+    """Check Nylas' hex HMAC-SHA256 of the raw request body."""
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature.strip().lower())
+
+
+@router.get("/api/webhooks/nylas")
+async def nylas_webhook_challenge(challenge: str = Query(...)):
+    """Echo the challenge Nylas sends when the webhook is registered."""
+    return PlainTextResponse(challenge)
+
+
+@router.post("/api/webhooks/nylas")
+async def nylas_webhook(request: Request):
+    if not settings.nylas_webhook_secret:
+        raise HTTPException(status_code=503, detail="Webhook secret not configured")
+
+    body = await request.body()
+    signature = request.headers.get("x-nylas-signature", "")
+    if not signature or not verify_signature(body, signature, settings.nylas_webhook_secret):
+        raise HTTPException(status_code=401, detail="Invalid signature")
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON")
+
+    notification_type = payload.get("type", "")
+    if notification_type not in _EVENT_TYPES:
+        return {"status": "ignored"}
+
+    event = (payload.get("data") or {}).get("object") or {}
+    grant_id = await busy_mirror.apply_event(notification_type, event)
+    if grant_id:
+        freebusy_cache.invalidate_grant(grant_id)
+        await warmup.invalidate_grant(grant_id)
+    return {"status": "ok"}
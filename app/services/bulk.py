@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import asyncio
+import csv
+import json
+from collections import deque
+from datetime import time
+from functools import lru_cache
+from typing import AsyncIterator, Awaitable, Callable
+from zoneinfo import ZoneInfo
+
+from app.database import acquire
+from app.services import rules
+from app.services.owner_cache import owner_cache
+
+FORMATS = ("ndjson", "csv")
+
+# Settings that can be bulk-loaded; ``slug`` selects the connection and every
+# other column is optional (missing or null keeps the stored value).
+COLUMNS = (
+    "slug", "timezone", "business_hours_start", "business_hours_end",
+    "slot_duration_minutes", "is_valid",
+)
+
+_STAGING_SQL = """
+    CREATE TEMP TABLE owner_import (
+        line BIGINT NOT NULL,
+        slug TEXT NOT NULL,
+        timezone TEXT,
+        business_hours_start TEXT,
+        business_hours_end TEXT,
+        slot_duration_minutes INT,
+        is_valid BOOLEAN
+    ) ON COMMIT DROP
+"""
+
+# One statement applies the whole file.  The last line wins for a slug that
+# appears twice, and only rows that actually change get a new
+# availability_version, so re-running an import does not bust caches.
+_MERGE_SQL = """
+    WITH src AS (
+        SELECT DISTINCT ON (slug) * FROM owner_import ORDER BY slug, line DESC
+    ), updated AS (
+        UPDATE calendar_connections cc
+        SET timezone = COALESCE(s.timezone, cc.timezone),
+            business_hours_start = COALESCE(s.business_hours_start, cc.business_hours_start),
+            business_hours_end = COALESCE(s.business_hours_end, cc.business_hours_end),
+            slot_duration_minutes = COALESCE(s.slot_duration_minutes, cc.slot_duration_minutes),
+            is_valid = COALESCE(s.is_valid, cc.is_valid),
+            availability_version = cc.availability_version + 1
+        FROM src s
+        WHERE cc.slug = s.slug
+          AND (COALESCE(s.timezone, cc.timezone),
+               COALESCE(s.business_hours_start, cc.business_hours_start),
+               COALESCE(s.business_hours_end, cc.business_hours_end),
+               COALESCE(s.slot_duration_minutes, cc.slot_duration_minutes),
+               COALESCE(s.is_valid, cc.is_valid))
+              IS DISTINCT FROM
+              (cc.timezone, cc.business_hours_start, cc.business_hours_end,
+               cc.slot_duration_minutes, cc.is_valid)
+        RETURNING cc.slug
+    )
+    SELECT
+        (SELECT count(*) FROM src) AS rows,
+        (SELECT count(*) FROM updated) AS updated,
+        (SELECT count(*) FROM src
+         WHERE NOT EXISTS (SELECT 1 FROM calendar_connections cc WHERE cc.slug = src.slug)) AS unknown
+"""
+
+_EXPORT_COLUMNS = """
+    slug, timezone, business_hours_start, business_hours_end, slot_duration_minutes, is_valid
+    FROM calendar_connections ORDER BY slug
+"""
+
+# COPY cannot emit JSON lines as-is: text format escapes backslashes.  CSV
+# format with quote and delimiter characters that never occur in
+# row_to_json output (it escapes control characters) passes each line
+# through untouched.
+_EXPORT_SQL = {
+    "csv": f"SELECT {_EXPORT_COLUMNS}",
+    "ndjson": f"SELECT row_to_json(t)::text FROM (SELECT {_EXPORT_COLUMNS}) t",
+}
+_COPY_OPTIONS = {
+    "csv": {"format": "csv", "header": True},
+    "ndjson": {"format": "csv", "quote": "\x01", "delimiter": "\x02"},
+}
+
+
+class BulkImportError(Exception):
+    def __init__(self, line: int, message: str) -> None:
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+
+
+@lru_cache(maxsize=1024)
+def _valid_timezone(name: str) -> bool:
+    try:
+        ZoneInfo(name)
+    except (ValueError, KeyError):
+        return False
+    return True
+
+
+def _parse_bool(value) -> bool | None:
+    if value is None or isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ("true", "t", "1", "yes"):
+        return True
+    if text in ("false", "f", "0", "no"):
+        return False
+    raise ValueError(f"invalid is_valid {value!r}")
+
+
+def _record(line: int, row: dict) -> tuple:
+    """Validate one input row and turn it into a staging-table record."""
+    # Empty CSV cells mean "keep the stored value", like JSON nulls.
+    row = {key: (None if value == "" else value) for key, value in row.items()}
+    unknown = set(row) - set(COLUMNS)
+    if unknown:
+        raise BulkImportError(line, f"unknown columns {sorted(unknown)}")
+    slug = row.get("slug")
+    if not slug:
+        raise BulkImportError(line, "slug is required")
+    try:
+        tz = row.get("timezone")
+        if tz is not None and not _valid_timezone(tz):
+            raise ValueError(f"unknown timezone {tz!r}")
+        start, end = row.get("business_hours_start"), row.get("business_hours_end")
+        for value in (start, end):
+            if value is not None:
+                time.fromisoformat(value)
+        if start is not None and end is not None and time.fromisoformat(start) >= time.fromisoformat(end):
+            raise ValueError("business_hours_start must be before business_hours_end")
+        duration = row.get("slot_duration_minutes")
+        if duration is not None:
+            duration = int(duration)
+            rules.check_slot_duration(duration)
+        is_valid = _parse_bool(row.get("is_valid"))
+    except (TypeError, ValueError) as exc:
+        raise BulkImportError(line, str(exc)) from None
+    return (line, str(slug), tz, start, end, duration, is_valid)
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a byte stream into decoded lines without buffering it whole."""
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8").rstrip("\r")
+    if pending:
+        yield pending.decode("utf-8").rstrip("\r")
+
+
+class _Feed:
+    """Lines for one long-lived ``csv.reader``, handed over a record at a time."""
+
+    def __init__(self) -> None:
+        self.lines: deque[str] = deque()
+
+    def __iter__(self) -> _Feed:
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+async def _csv_rows(lines: AsyncIterator[str]) -> AsyncIterator[tuple[int, list[str]]]:
+    """``(first line number, fields)`` per CSV record.
+
+    Quoted fields may span lines: lines are collected until their quotes
+    balance and the whole record then goes through the same reader.
+    """
+    feed = _Feed()
+    reader = csv.reader(feed)
+    line_no = first = quotes = 0
+    async for line in lines:
+        line_no += 1
+        if not feed.lines:
+            first = line_no
+        feed.lines.append(line + "\n")
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+        quotes = 0
+        yield first, next(reader)
+    if feed.lines:
+        raise BulkImportError(first, "unterminated quoted field")
+
+
+async def _records(lines: AsyncIterator[str], fmt: str) -> AsyncIterator[tuple]:
+    if fmt == "csv":
+        header: list[str] | None = None
+        async for line_no, values in _csv_rows(lines):
+            if not any(value.strip() for value in values):
+                continue
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            if len(values) != len(header):
+                raise BulkImportError(line_no, f"expected {len(header)} fields, got {len(values)}")
+            yield _record(line_no, dict(zip(header, values)))
+        return
+
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            raise BulkImportError(line_no, f"invalid JSON: {exc}") from None
+        if not isinstance(row, dict):
+            raise BulkImportError(line_no, "expected a JSON object")
+        yield _record(line_no, row)
+
+
+async def import_settings(lines: AsyncIterator[str], fmt: str) -> dict:
+    """Apply owner settings from NDJSON or CSV *lines* in one transaction.
+
+    Rows are validated as they stream into a temporary staging table via
+    COPY, then merged into ``calendar_connections`` with a single UPDATE.
+    Any invalid row aborts the import and raises :class:`BulkImportError`.
+    Returns ``{"rows", "updated", "unknown"}``; unknown slugs are skipped.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {FORMATS}")
+    async with acquire() as conn:
+        async with conn.transaction():
+            await conn.execute(_STAGING_SQL)
+            await conn.copy_records_to_table(
+                "owner_import",
+                records=_records(lines, fmt),
+                columns=("line", *COLUMNS),
+            )
+            row = await conn.fetchrow(_MERGE_SQL)
+    owner_cache.clear()
+    return dict(row)
+
+
+async def export_settings(fmt: str, write: Callable[[bytes], Awaitable[None]]) -> None:
+    """Stream every connection's settings to *write* as NDJSON or CSV via COPY."""
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {FORMATS}")
+    async with acquire() as conn:
+        await conn.copy_from_query(_EXPORT_SQL[fmt], output=write, **_COPY_OPTIONS[fmt])
+
+
+async def stream_export(fmt: str, max_chunks: int = 16) -> AsyncIterator[bytes]:
+    """:func:`export_settings` as an async iterator, for streaming responses.
+
+    A bounded queue between COPY and the consumer keeps memory constant
+    however many rows there are.
+    """
+    queue: asyncio.Queue[bytes | None] = asyncio.Queue(maxsize=max_chunks)
+
+    async def produce() -> None:
+        try:
+            await export_settings(fmt, queue.put)
+        finally:
+            await queue.put(None)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while (chunk := await queue.get()) is not None:
+            yield chunk
+        await producer
+    finally:
+        producer.cancel()
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import time
+from datetime import date, datetime, timedelta, timezone, tzinfo
+
+from app.config import settings
+from app.database import acquire
+from app.services.nylas_client import list_events
+from app.services.resilience import clear_deadline
+
+_RANGE = "tstzrange(to_timestamp($2), to_timestamp($3), '[)')"
+_UPSERT_SQL = """
+    INSERT INTO busy_mirror (grant_key, event_id, during, all_day)
+    VALUES ($1, $2, tstzrange(to_timestamp($3), to_timestamp($4), '[)'),
+            CASE WHEN $5::date IS NULL THEN NULL ELSE daterange($5::date, $6::date) END)
+    ON CONFLICT (grant_key, event_id) DO UPDATE
+       SET during = EXCLUDED.during, all_day = EXCLUDED.all_day, updated_at = now()
+"""
+
+# Widest UTC offsets in use, so the stored span of an all-day event
+# overlaps every window its days can fall in, whatever the owner's zone.
+_EARLIEST_OFFSET = 14 * 3600
+_LATEST_OFFSET = 12 * 3600
+
+_syncing: dict[str, asyncio.Task] = {}
+stats = {
+    "mirror_hits": 0, "mirror_misses": 0, "mirror_errors": 0,
+    "syncs": 0, "sync_errors": 0, "webhook_events": 0,
+}
+
+
+def grant_key(grant_id: str) -> str:
+    """Stable lookup key for a grant that keeps the raw ID out of the table."""
+    return hashlib.sha256(grant_id.encode()).hexdigest()
+
+
+def _midnight(day: date, tz: tzinfo) -> int:
+    return int(datetime.combine(day, datetime.min.time(), tzinfo=tz).timestamp())
+
+
+def event_days(event: dict) -> tuple[date, date] | None:
+    """``(first_day, day_after_last)`` for an all-day Nylas event, else ``None``."""
+    when = event.get("when") or {}
+    start_day = when.get("date") or when.get("start_date")
+    end_day = when.get("date") or when.get("end_date")
+    if "start_time" in when or "time" in when or not (start_day and end_day):
+        return None
+    return date.fromisoformat(start_day), date.fromisoformat(end_day) + timedelta(days=1)
+
+
+def event_span(event: dict) -> tuple[int, int] | None:
+    """Busy ``(start, end)`` for a Nylas event object, or ``None`` if free.
+
+    All-day events have no time zone of their own; their span here runs
+    from the first day's midnight at the earliest offset to the last day's
+    end at the latest one, and :func:`busy_blocks` narrows it to the
+    owner's local days.
+    """
+    if event.get("status") == "cancelled" or event.get("busy") is False:
+        return None
+    when = event.get("when") or {}
+    if "start_time" in when and "end_time" in when:
+        return int(when["start_time"]), int(when["end_time"])
+    if "time" in when:
+        return int(when["time"]), int(when["time"])
+    days = event_days(event)
+    if days:
+        return (
+            _midnight(days[0], timezone.utc) - _EARLIEST_OFFSET,
+            _midnight(days[1], timezone.utc) + _LATEST_OFFSET,
+        )
+    return None
+
+
+def _record(key: str, event_id: str, event: dict) -> tuple | None:
+    span = event_span(event)
+    if span is None:
+        return None
+    days = event_days(event)
+    return (key, event_id, span[0], span[1], *(days or (None, None)))
+
+
+async def busy_blocks(
+    grant_id: str, start_time: int, end_time: int, tz: tzinfo = timezone.utc,
+) -> list[dict] | None:
+    """Busy blocks from the mirror, or ``None`` if it cannot answer.
+
+    The mirror answers only when a sync covered the whole window within
+    ``busy_mirror_max_age_seconds``; webhooks keep it current in between.
+    All-day events block whole days in *tz*, the owner's zone.
+    A missing or stale mirror schedules a background sync; a window past
+    the synced horizon is only a miss, since a sync would not cover it
+    either.  A database error counts as a miss, so callers fall back to
+    Nylas.
+    """
+    try:
+        async with acquire() as conn:
+            rows = await conn.fetch(
+                f"""
+                SELECT s.synced_at > now() - $4::interval AS fresh,
+                       s.synced_from <= to_timestamp($2)
+                           AND s.synced_until >= to_timestamp($3) AS covers,
+                       extract(epoch FROM lower(m.during))::bigint AS start_time,
+                       extract(epoch FROM upper(m.during))::bigint AS end_time,
+                       lower(m.all_day) AS first_day,
+                       upper(m.all_day) AS end_day
+                FROM busy_mirror_state s
+                LEFT JOIN busy_mirror m
+                  ON m.grant_key = s.grant_key AND m.during && {_RANGE}
+                 AND s.synced_at > now() - $4::interval
+                 AND s.synced_from <= to_timestamp($2)
+                 AND s.synced_until >= to_timestamp($3)
+                WHERE s.grant_key = $1
+                """,
+                grant_key(grant_id),
+                start_time,
+                end_time,
+                timedelta(seconds=settings.busy_mirror_max_age_seconds),
+            )
+    except Exception:
+        stats["mirror_errors"] += 1
+        return None
+    if not rows or not rows[0]["fresh"]:
+        stats["mirror_misses"] += 1
+        schedule_sync(grant_id)
+        return None
+    if not rows[0]["covers"]:
+        stats["mirror_misses"] += 1
+        return None
+    stats["mirror_hits"] += 1
+    blocks = []
+    for r in rows:
+        if r["start_time"] is None:
+            continue
+        if r["first_day"] is not None:
+            start, end = _midnight(r["first_day"], tz), _midnight(r["end_day"], tz)
+        else:
+            start, end = r["start_time"], r["end_time"]
+        blocks.append({"start_time": start, "end_time": end, "status": "busy"})
+    return blocks
+
+
+def schedule_sync(grant_id: str) -> None:
+    """Backfill the mirror for *grant_id* in the background, once at a time."""
+    key = grant_key(grant_id)
+    if key in _syncing:
+        return
+    task = asyncio.create_task(_sync_quietly(grant_id))
+    _syncing[key] = task
+    task.add_done_callback(lambda _: _syncing.pop(key, None))
+
+
+async def _sync_quietly(grant_id: str) -> None:
+    clear_deadline()
+    try:
+        await sync_grant(grant_id)
+    except Exception:
+        stats["sync_errors"] += 1
+
+
+async def sync_grant(grant_id: str) -> None:
+    """Replace the mirror for the next ``busy_mirror_sync_days`` days.
+
+    Events are listed from Nylas and written in one transaction together
+    with the covered window, which is what makes the mirror warm.  The
+    window opens a day before UTC midnight, so today's local day is
+    covered in zones ahead of UTC too.
+    """
+    now = int(time.time())
+    start = now - now % 86400 - 86400
+    end = now - now % 86400 + settings.busy_mirror_sync_days * 86400
+    events = await list_events(grant_id, start, end)
+
+    key = grant_key(grant_id)
+    records = []
+    for event in events:
+        record = _record(key, event.get("id"), event) if event.get("id") else None
+        if record:
+            records.append(record)
+
+    async with acquire() as conn:
+        async with conn.transaction():
+            await conn.execute(
+                f"DELETE FROM busy_mirror WHERE grant_key = $1 AND during && {_RANGE}",
+                key, start, end,
+            )
+            await conn.executemany(_UPSERT_SQL, records)
+            await conn.execute(
+                """
+                INSERT INTO busy_mirror_state (grant_key, synced_from, synced_until, synced_at)
+                VALUES ($1, to_timestamp($2), to_timestamp($3), now())
+                ON CONFLICT (grant_key) DO UPDATE
+                   SET synced_from = EXCLUDED.synced_from,
+                       synced_until = EXCLUDED.synced_until,
+                       synced_at = now()
+                """,
+                key, start, end,
+            )
+            # Warm-up snapshots were computed from the calendar as it was.
+            await conn.execute("DELETE FROM availability_snapshots WHERE grant_key = $1", key)
+    stats["syncs"] += 1
+
+
+async def apply_event(notification_type: str, event: dict) -> str | None:
+    """Apply one ``event.*`` webhook object to the mirror.
+
+    Returns the grant ID the event belongs to, if any.
+    """
+    grant_id = event.get("grant_id")
+    event_id = event.get("id")
+    if not grant_id or not event_id:
+        return None
+
+    key = grant_key(grant_id)
+    record = None if notification_type == "event.deleted" else _record(key, event_id, event)
+
+    async with acquire() as conn:
+        if record is None:
+            await conn.execute(
+                "DELETE FROM busy_mirror WHERE grant_key = $1 AND event_id = $2",
+                key, event_id,
+            )
+        else:
+            await conn.execute(_UPSERT_SQL, *record)
+        await conn.execute(
+            "UPDATE busy_mirror_state SET last_event_at = now() WHERE grant_key = $1",
+            key,
+        )
+    stats["webhook_events"] += 1
+    return grant_id
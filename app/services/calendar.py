@@ -1,6 +1,68 @@
 from __future__ import annotations
 
-from datetime import date, datetime, time, timedelta, timezone
+from datetime import date, datetime, time, timezone
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1)
+def _numpy():
+    """NumPy if installed, imported on first bulk call rather than at startup."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def merge_intervals(busy_blocks: list[dict]) -> list[tuple[int, int]]:
+    """Sort busy blocks and coalesce overlapping or touching ones.
+
+    Returns disjoint ``(start, end)`` Unix-second pairs in ascending order.
+    """
+    intervals = sorted((int(b["start_time"]), int(b["end_time"])) for b in busy_blocks)
+    merged: list[tuple[int, int]] = []
+    for start, end in intervals:
+        if end < start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _sweep(
+    merged: list[tuple[int, int]],
+    i: int,
+    day_start: int,
+    day_end: int,
+    step: int,
+    out: list[dict],
+) -> int:
+    """Append free grid slots of ``[day_start, day_end)`` to *out*.
+
+    *merged* is walked from index *i*; the index of the first interval that
+    may still matter for a later window is returned so callers can sweep
+    several ascending windows in one pass.
+    """
+    if step <= 0:
+        # A zero grid would never advance; durations are validated on
+        # write, but rows stored before that may still carry one.
+        return i
+    n = len(merged)
+    cursor = day_start
+    while cursor + step <= day_end:
+        while i < n and merged[i][1] <= cursor:
+            i += 1
+        slot_end = cursor + step
+        if i < n and merged[i][0] < slot_end:
+            # Jump to the first grid point at or after the end of this block.
+            cursor += -(-(merged[i][1] - cursor) // step) * step
+            continue
+        out.append({"start_time": cursor, "end_time": slot_end})
+        cursor = slot_end
+    return i
 
 
 def compute_available_slots(
@@ -24,28 +86,93 @@ def compute_available_slots(
         list of ``{"start_time": <unix>, "end_time": <unix>}`` dicts
         representing each free slot.
     """
-    day_start = datetime.combine(target_date, business_start, tzinfo=timezone.utc)
-    day_end = datetime.combine(target_date, business_end, tzinfo=timezone.utc)
-    slot_delta = timedelta(minutes=slot_duration_minutes)
+    day_start = int(datetime.combine(target_date, business_start, tzinfo=timezone.utc).timestamp())
+    day_end = int(datetime.combine(target_date, business_end, tzinfo=timezone.utc).timestamp())
+    return compute_window_slots(busy_blocks, day_start, day_end, slot_duration_minutes)
 
-    busy_intervals: list[tuple[datetime, datetime]] = []
-    for block in busy_blocks:
-        b_start = datetime.fromtimestamp(block["start_time"], tz=timezone.utc)
-        b_end = datetime.fromtimestamp(block["end_time"], tz=timezone.utc)
-        busy_intervals.append((b_start, b_end))
 
-    busy_intervals.sort(key=lambda iv: iv[0])
+def business_windows(
+    days: list[date], business_start: time, business_end: time
+) -> list[tuple[int, int]]:
+    """``(start, end)`` Unix windows of business hours for each of *days*."""
+    return [
+        (
+            int(datetime.combine(d, business_start, tzinfo=timezone.utc).timestamp()),
+            int(datetime.combine(d, business_end, tzinfo=timezone.utc).timestamp()),
+        )
+        for d in days
+    ]
 
-    slots: list[dict] = []
-    cursor = day_start
-    while cursor + slot_delta <= day_end:
-        slot_end = cursor + slot_delta
-        conflict = any(b_start < slot_end and b_end > cursor for b_start, b_end in busy_intervals)
-        if not conflict:
-            slots.append({
-                "start_time": int(cursor.timestamp()),
-                "end_time": int(slot_end.timestamp()),
-            })
-        cursor += slot_delta
 
+def compute_window_slots(
+    busy_blocks: list[dict],
+    window_start: int,
+    window_end: int,
+    slot_duration_minutes: int,
+) -> list[dict]:
+    """Free slots on a grid anchored at *window_start* (Unix seconds)."""
+    slots: list[dict] = []
+    _sweep(merge_intervals(busy_blocks), 0, window_start, window_end, slot_duration_minutes * 60, slots)
     return slots
+
+
+def compute_available_slots_bulk(
+    busy_blocks: list[dict],
+    windows: list[tuple[int, int]],
+    slot_duration_minutes: int,
+    use_numpy: bool = False,
+) -> list[list[dict]]:
+    """Free slots for many ``(start, end)`` Unix windows at once.
+
+    *busy_blocks* may cover all windows together (e.g. one owner's month,
+    or one day for a merged team).  Windows must not overlap.  One linear
+    sweep over all windows; *use_numpy* switches to a vectorised path when
+    NumPy is installed.  ``benchmarks/test_slots.py`` shows the sweep
+    matching or beating it up to the 62-day range limit (the conversion
+    back to slot dicts dominates), so it is off by default.
+    """
+    step = slot_duration_minutes * 60
+    merged = merge_intervals(busy_blocks)
+    np = _numpy() if use_numpy else None
+    if np is not None and windows:
+        return _bulk_numpy(np, merged, windows, step)
+
+    order = sorted(range(len(windows)), key=lambda k: windows[k][0])
+    results: list[list[dict]] = [[] for _ in windows]
+    i = 0
+    for k in order:
+        w_start, w_end = windows[k]
+        i = _sweep(merged, i, w_start, w_end, step, results[k])
+    return results
+
+
+def _bulk_numpy(
+    np,
+    merged: list[tuple[int, int]],
+    windows: list[tuple[int, int]],
+    step: int,
+) -> list[list[dict]]:
+    counts = [max((w_end - w_start) // step, 0) for w_start, w_end in windows]
+    starts = np.concatenate([
+        np.arange(w_start, w_start + c * step, step, dtype=np.int64)
+        for (w_start, _), c in zip(windows, counts)
+    ])
+    if merged:
+        busy = np.asarray(merged, dtype=np.int64)
+        # First busy interval ending after each slot start; intervals are
+        # disjoint and sorted, so their ends are sorted too.
+        idx = np.searchsorted(busy[:, 1], starts, side="right")
+        in_range = idx < len(busy)
+        conflict = np.zeros(len(starts), dtype=bool)
+        conflict[in_range] = busy[idx[in_range], 0] < starts[in_range] + step
+        free = ~conflict
+    else:
+        free = np.ones(len(starts), dtype=bool)
+
+    results: list[list[dict]] = []
+    offset = 0
+    for c in counts:
+        day_starts = starts[offset:offset + c][free[offset:offset + c]].tolist()
+        results.append([{"start_time": s, "end_time": s + step} for s in day_starts])
+        offset += c
+    return results
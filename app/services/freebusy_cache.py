@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+from typing import TYPE_CHECKING
+
+from app.config import settings
+from app.services.freebusy_store import freebusy_store
+from app.services.nylas_client import get_free_busy
+from app.services.resilience import clear_deadline, nylas_resilience
+from app.services.singleflight import SingleFlight
+from app.services.ttl_cache import TTLCache
+
+if TYPE_CHECKING:
+    from app.services.owner_cache import OwnerConnection
+
+_Key = tuple[str, int, int, str]
+
+
+class FreeBusyCache:
+    """LRU cache in front of :func:`get_free_busy` with stale-while-revalidate.
+
+    Entries younger than ``ttl`` are served directly.  Entries older than
+    ``ttl`` but younger than ``ttl + stale_ttl`` are served immediately while
+    a single background task refreshes them.  Anything older is refetched;
+    if that fails, or the grant's circuit breaker is open, the last known
+    entry is served regardless of age rather than failing the request.
+
+    Concurrent fetches of the same window, whether misses or a background
+    refresh, share one in-flight Nylas call.
+
+    Given the *owner* whose calendar is asked for, misses first consult the
+    Postgres tier in :mod:`app.services.freebusy_store`, which every
+    instance shares, and fresh Nylas results are written back to it.  Its
+    entries are judged fresh or stale by the same ``ttl`` and ``stale_ttl``.
+    """
+
+    def __init__(self, ttl: float, stale_ttl: float, max_entries: int) -> None:
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries = TTLCache(max_entries)
+        self._refreshing: dict[_Key, asyncio.Task] = {}
+        self._flight = SingleFlight()
+        self._generations: dict[str, int] = {}
+        self._generation_counter = itertools.count(1)
+        self._base_generation = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.refresh_errors = 0
+        self.fallback_hits = 0
+        self.shared_hits = 0
+
+    async def get(
+        self,
+        grant_id: str,
+        start_time: int,
+        end_time: int,
+        email: str,
+        owner: OwnerConnection | None = None,
+    ) -> list[dict]:
+        key = (grant_id, start_time, end_time, email)
+        cached = self._entries.get(key) if self.ttl > 0 else None
+        if cached is not None:
+            busy, age = cached
+            if age < self.ttl:
+                self.hits += 1
+                return busy
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._schedule_refresh(key, owner)
+                return busy
+
+        if owner is not None and self.ttl > 0 and settings.freebusy_shared_cache:
+            generation = self._generation(grant_id)
+            shared = await freebusy_store.get(owner.id, start_time, end_time)
+            if shared is not None and self._generation(grant_id) == generation:
+                busy, age = shared
+                self._entries.set(key, busy, age=age)
+                if age < self.ttl + self.stale_ttl:
+                    self.shared_hits += 1
+                    if age >= self.ttl:
+                        self._schedule_refresh(key, owner)
+                    return busy
+                cached = (busy, age)
+
+        if cached is not None and nylas_resilience.is_open(grant_id):
+            self.fallback_hits += 1
+            return cached[0]
+
+        self.misses += 1
+        try:
+            busy = await self._fetch(key, owner)
+        except Exception:
+            if cached is None:
+                raise
+            self.fallback_hits += 1
+            return cached[0]
+        return busy
+
+    async def _fetch(self, key: _Key, owner: OwnerConnection | None = None) -> list[dict]:
+        """Fetch *key* through the single-flight layer and store the result.
+
+        A fetch that started before :meth:`invalidate_grant` is neither
+        joined by later callers nor stored, so it cannot resurrect data
+        from before a booking.  The shared copy is tagged with the version
+        *owner* was loaded at, so it is ignored if that is already outdated.
+        """
+        generation = self._generation(key[0])
+        busy = await self._flight.do((key, generation), lambda: get_free_busy(*key))
+        if self._generation(key[0]) == generation:
+            self._entries.set(key, busy)
+            if owner is not None and settings.freebusy_shared_cache:
+                freebusy_store.put(
+                    owner.id, key[0], owner.availability_version, key[1], key[2], busy,
+                )
+        return busy
+
+    def _schedule_refresh(self, key: _Key, owner: OwnerConnection | None = None) -> None:
+        if key in self._refreshing:
+            return
+        task = asyncio.create_task(self._refresh(key, owner))
+        self._refreshing[key] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+
+    async def _refresh(self, key: _Key, owner: OwnerConnection | None) -> None:
+        # The task inherits the triggering request's deadline; it should not.
+        clear_deadline()
+        try:
+            await self._fetch(key, owner)
+        except Exception:
+            # Keep serving the stale entry until it ages out completely.
+            self.refresh_errors += 1
+
+    def _generation(self, grant_id: str) -> int:
+        return self._generations.get(grant_id, self._base_generation)
+
+    def _prune_generations(self) -> None:
+        """Forget the generation of every grant with nothing cached.
+
+        Generations are drawn from one counter and pruned grants move to a
+        fresh base, so a fetch that began before the prune never sees its
+        starting generation again and is not stored.
+        """
+        live = {key[0] for key in self._entries.keys()}
+        live.update(key[0] for key in self._refreshing)
+        self._generations = {g: n for g, n in self._generations.items() if g in live}
+        self._base_generation = next(self._generation_counter)
+
+    def invalidate_grant(self, grant_id: str) -> int:
+        """Evict every cached window belonging to *grant_id*."""
+        self._generations[grant_id] = next(self._generation_counter)
+        for key, task in list(self._refreshing.items()):
+            if key[0] == grant_id:
+                task.cancel()
+        removed = self._entries.delete_where(lambda key, _: key[0] == grant_id)
+        if settings.freebusy_shared_cache:
+            freebusy_store.invalidate_grant(grant_id)
+        if len(self._generations) > self._entries.max_entries:
+            self._prune_generations()
+        self.invalidations += removed
+        return removed
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_entries": self._entries.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self._entries.evictions,
+            "invalidations": self.invalidations,
+            "refreshing": len(self._refreshing),
+            "refresh_errors": self.refresh_errors,
+            "fallback_hits": self.fallback_hits,
+            "shared_hits": self.shared_hits,
+            "shared": freebusy_store.stats(),
+            "coalesced": self._flight.coalesced,
+            "in_flight": len(self._flight),
+        }
+
+
+freebusy_cache = FreeBusyCache(
+    ttl=settings.freebusy_cache_ttl_seconds,
+    stale_ttl=settings.freebusy_cache_stale_seconds,
+    max_entries=settings.freebusy_cache_max_entries,
+)
@@ -0,0 +1,192 @@
+"""Second-tier free/busy cache shared by every instance, in Postgres.
+
+Rows live in the UNLOGGED ``freebusy_cache`` table, keyed by connection and
+window.  Each row is tagged with the owner's ``availability_version`` at
+fetch time and only read back while it still matches, so a booking or
+settings change on any instance hides the owner's entries at once.
+Lookups issued in the same event-loop tick (the chunks of a range request,
+say) are answered by one query, and writes are upserted in batches off the
+request path.  Expired rows are swept now and then by writers.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+from datetime import timedelta
+
+from app.config import settings
+from app.database import acquire
+from app.services.busy_mirror import grant_key
+
+_Key = tuple[str, int, int]
+
+_SWEEP_PROBABILITY = 0.02
+_SWEEP_LIMIT = 1000
+
+_READ_SQL = """
+    SELECT k.connection_id::text AS connection_id, k.start_time, k.end_time, f.busy::text AS busy,
+           extract(epoch FROM now() - f.fetched_at)::float8 AS age
+    FROM unnest($1::uuid[], $2::bigint[], $3::bigint[]) AS k(connection_id, start_time, end_time)
+    JOIN freebusy_cache f
+      ON f.connection_id = k.connection_id
+     AND f.start_time = k.start_time
+     AND f.end_time = k.end_time
+    JOIN calendar_connections cc
+      ON cc.id = f.connection_id AND cc.availability_version = f.version
+    WHERE f.expires_at > now()
+"""
+
+_WRITE_SQL = """
+    INSERT INTO freebusy_cache
+        (connection_id, grant_key, start_time, end_time, version, busy, fetched_at, expires_at)
+    SELECT t.connection_id, t.grant_key, t.start_time, t.end_time, t.version, t.busy::jsonb,
+           now(), now() + $7::interval
+    FROM unnest($1::uuid[], $2::text[], $3::bigint[], $4::bigint[], $5::bigint[], $6::text[])
+         AS t(connection_id, grant_key, start_time, end_time, version, busy)
+    ON CONFLICT (connection_id, start_time, end_time) DO UPDATE
+       SET grant_key = EXCLUDED.grant_key,
+           version = EXCLUDED.version,
+           busy = EXCLUDED.busy,
+           fetched_at = EXCLUDED.fetched_at,
+           expires_at = EXCLUDED.expires_at
+"""
+
+_SWEEP_SQL = """
+    DELETE FROM freebusy_cache
+    WHERE ctid IN (SELECT ctid FROM freebusy_cache WHERE expires_at < now() LIMIT $1)
+"""
+
+
+class FreeBusyStore:
+    """Batched reads and writes against the ``freebusy_cache`` table.
+
+    Any database error is counted and treated as a miss; callers then go
+    to Nylas as they would without this tier.
+    """
+
+    def __init__(self, max_age: float) -> None:
+        self.max_age = max_age
+        self._reads: dict[_Key, asyncio.Future] = {}
+        self._writes: dict[_Key, tuple[str, int, str]] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+        self.writes = 0
+        self.swept = 0
+        self.errors = 0
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def get(self, connection_id: str, start_time: int, end_time: int) -> tuple[list[dict], float] | None:
+        """``(busy_blocks, age_seconds)`` for the window, or ``None`` on a miss."""
+        key = (connection_id, start_time, end_time)
+        future = self._reads.get(key)
+        if future is None:
+            if not self._reads:
+                self._spawn(self._flush_reads())
+            future = asyncio.get_running_loop().create_future()
+            self._reads[key] = future
+        return await asyncio.shield(future)
+
+    async def _flush_reads(self) -> None:
+        # Let every lookup started in this tick join the batch.
+        await asyncio.sleep(0)
+        pending, self._reads = self._reads, {}
+        found: dict[_Key, tuple[list[dict], float]] = {}
+        try:
+            async with acquire() as conn:
+                rows = await conn.fetch(
+                    _READ_SQL,
+                    [k[0] for k in pending],
+                    [k[1] for k in pending],
+                    [k[2] for k in pending],
+                )
+            self.batches += 1
+            for r in rows:
+                found[(r["connection_id"], r["start_time"], r["end_time"])] = (
+                    json.loads(r["busy"]), max(r["age"], 0.0),
+                )
+        except Exception:
+            self.errors += 1
+        for key, future in pending.items():
+            hit = found.get(key)
+            if hit is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            if not future.done():
+                future.set_result(hit)
+
+    def put(
+        self,
+        connection_id: str,
+        grant_id: str,
+        version: int,
+        start_time: int,
+        end_time: int,
+        busy: list[dict],
+    ) -> None:
+        """Queue the window for upsert, tagged with the owner's *version*."""
+        if not self._writes:
+            self._spawn(self._flush_writes())
+        self._writes[(connection_id, start_time, end_time)] = (grant_id, version, json.dumps(busy))
+
+    async def _flush_writes(self) -> None:
+        await asyncio.sleep(0)
+        pending, self._writes = self._writes, {}
+        if not pending:
+            return
+        try:
+            async with acquire() as conn:
+                await conn.execute(
+                    _WRITE_SQL,
+                    [k[0] for k in pending],
+                    [grant_key(v[0]) for v in pending.values()],
+                    [k[1] for k in pending],
+                    [k[2] for k in pending],
+                    [v[1] for v in pending.values()],
+                    [v[2] for v in pending.values()],
+                    timedelta(seconds=self.max_age),
+                )
+                self.writes += len(pending)
+                if random.random() < _SWEEP_PROBABILITY:
+                    self.swept += int((await conn.execute(_SWEEP_SQL, _SWEEP_LIMIT)).split()[-1])
+        except Exception:
+            self.errors += 1
+
+    def invalidate_grant(self, grant_id: str) -> None:
+        """Drop every shared window of *grant_id*, e.g. after a calendar webhook.
+
+        An upsert already in flight may still land afterwards; expiry bounds
+        how long it is served.
+        """
+        for key in [k for k, v in self._writes.items() if v[0] == grant_id]:
+            del self._writes[key]
+        self._spawn(self._delete_grant(grant_key(grant_id)))
+
+    async def _delete_grant(self, key: str) -> None:
+        try:
+            async with acquire() as conn:
+                await conn.execute("DELETE FROM freebusy_cache WHERE grant_key = $1", key)
+        except Exception:
+            self.errors += 1
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "batches": self.batches,
+            "writes": self.writes,
+            "swept": self.swept,
+            "errors": self.errors,
+        }
+
+
+freebusy_store = FreeBusyStore(
+    max_age=settings.freebusy_cache_ttl_seconds + settings.freebusy_cache_stale_seconds,
+)
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import random
+import time
+from datetime import timedelta
+
+from app.config import settings
+from app.database import acquire
+
+_SWEEP_PROBABILITY = 0.01
+_STALE_PENDING = timedelta(minutes=5)
+
+
+class KeyReused(Exception):
+    """The key was already used with a different request body."""
+
+
+class StillRunning(Exception):
+    """The first request with this key did not finish while we waited."""
+
+
+def request_hash(payload: dict) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+async def begin(key: str, digest: str) -> tuple[int, dict] | None:
+    """Claim *key*, or return the stored ``(status_code, body)`` for it.
+
+    Returns ``None`` if this caller now owns the key and must call
+    :func:`complete` or :func:`abandon`.  If another request holds the key,
+    waits up to ``idempotency_wait_seconds`` for its outcome.  A key left
+    pending for longer than ``_STALE_PENDING`` (e.g. by a crashed instance)
+    is taken over.
+    """
+    async with acquire() as conn:
+        if random.random() < _SWEEP_PROBABILITY:
+            await conn.execute(
+                "DELETE FROM idempotency_keys WHERE created_at < now() - $1::interval",
+                timedelta(hours=settings.idempotency_ttl_hours),
+            )
+        inserted = await conn.fetchval(
+            """
+            INSERT INTO idempotency_keys (key, request_hash) VALUES ($1, $2)
+            ON CONFLICT (key) DO NOTHING
+            RETURNING true
+            """,
+            key,
+            digest,
+        )
+    if inserted:
+        return None
+
+    deadline = time.monotonic() + settings.idempotency_wait_seconds
+    delay = 0.05
+    while True:
+        async with acquire() as conn:
+            row = await conn.fetchrow(
+                """
+                SELECT request_hash, status_code, response,
+                       created_at < now() - $2::interval AS stale
+                FROM idempotency_keys WHERE key = $1
+                """,
+                key,
+                _STALE_PENDING,
+            )
+            if row is not None and row["status_code"] is None and row["stale"]:
+                await conn.execute(
+                    "DELETE FROM idempotency_keys WHERE key = $1 AND status_code IS NULL", key,
+                )
+                row = None
+        if row is None:
+            # The first request failed and released the key; take it over.
+            return await begin(key, digest)
+        if row["request_hash"] != digest:
+            raise KeyReused()
+        if row["status_code"] is not None:
+            return row["status_code"], json.loads(row["response"])
+        if time.monotonic() + delay > deadline:
+            raise StillRunning()
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 0.5)
+
+
+async def complete(key: str, status_code: int, body: dict) -> None:
+    async with acquire() as conn:
+        await conn.execute(
+            """
+            UPDATE idempotency_keys
+            SET status_code = $2, response = $3::jsonb, completed_at = now()
+            WHERE key = $1
+            """,
+            key,
+            status_code,
+            json.dumps(body),
+        )
+
+
+async def abandon(key: str) -> None:
+    """Release *key* so a retry runs the request again."""
+    async with acquire() as conn:
+        await conn.execute("DELETE FROM idempotency_keys WHERE key = $1", key)
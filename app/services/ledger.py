@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+import json
+from datetime import timedelta
+from typing import TYPE_CHECKING, Sequence
+
+from app.database import acquire
+from app.metrics import phase
+
+if TYPE_CHECKING:
+    from app.services.rules import CompiledRules
+
+_RANGE = "tstzrange(to_timestamp($2), to_timestamp($3), '[)')"
+_STALE_CLAIM = timedelta(minutes=5)
+# Statuses that hold a slot; must match the bookings_no_overlap predicate.
+_ACTIVE = "('pending', 'queued', 'confirmed')"
+
+# Active bookings of connection $1 overlapping [$2, $3); other modules may
+# embed it as a subquery.
+BOOKED_BLOCKS_SQL = f"""
+    SELECT extract(epoch FROM lower(during))::bigint AS start_time,
+           extract(epoch FROM upper(during))::bigint AS end_time
+    FROM bookings
+    WHERE connection_id = $1::uuid
+      AND during && {_RANGE}
+      AND status IN {_ACTIVE}
+"""
+
+
+class SlotTaken(Exception):
+    """The requested range overlaps an active booking for the same owner,
+    or falls in one's buffer or on a day already at its booking limit."""
+
+
+async def claim(
+    connection_id: str,
+    start_time: int,
+    end_time: int,
+    customer_name: str,
+    customer_email: str,
+    rules: CompiledRules | None = None,
+    also_hold: Sequence[tuple[str, CompiledRules | None]] = (),
+) -> str:
+    """Reserve ``[start_time, end_time)`` for *connection_id*.
+
+    The ``bookings`` exclusion constraint rejects any overlap with another
+    pending, queued or confirmed booking, which is raised as
+    :class:`SlotTaken`.  With *rules*, their buffers and daily limit are
+    checked against the owner's bookings in the same transaction.
+    Pending claims abandoned for longer than ``_STALE_CLAIM`` (e.g. by a
+    crashed instance) are cleared first.  Returns the new booking ID.
+
+    The range is also held for every ``(connection_id, rules)`` in
+    *also_hold* (the other hosts of a collective team booking), in the same
+    transaction, so either all of them are reserved or none is.  Those
+    holds follow the returned booking through :func:`confirm`,
+    :func:`fail` and :func:`release`.
+    """
+    async with acquire() as conn:
+        async with conn.transaction():
+            booking_id = await _claim(
+                conn, connection_id, start_time, end_time, customer_name, customer_email, "pending",
+                rules=rules,
+            )
+            for member_id, member_rules in also_hold:
+                await _claim(
+                    conn, member_id, start_time, end_time, customer_name, customer_email, "pending",
+                    rules=member_rules, parent_id=booking_id,
+                )
+    return booking_id
+
+
+async def enqueue(
+    connection_id: str,
+    start_time: int,
+    end_time: int,
+    customer_name: str,
+    customer_email: str,
+    extra_participants: list[dict] | None = None,
+    rules: CompiledRules | None = None,
+) -> tuple[str, int]:
+    """Reserve the range as ``queued`` and add it to ``booking_outbox``.
+
+    Both rows are written in one transaction, so a reserved slot always
+    has outbox work behind it.  The outbox worker creates the calendar
+    event later.  Raises :class:`SlotTaken` like :func:`claim`.  Returns
+    the booking ID and the owner's bumped ``availability_version``.
+    """
+    async with acquire() as conn:
+        async with conn.transaction():
+            booking_id = await _claim(
+                conn, connection_id, start_time, end_time, customer_name, customer_email, "queued",
+                rules=rules,
+            )
+            await conn.execute(
+                """
+                INSERT INTO booking_outbox (booking_id, connection_id, extra_participants)
+                VALUES ($1::uuid, $2::uuid, $3::jsonb)
+                """,
+                booking_id,
+                connection_id,
+                json.dumps(extra_participants or []),
+            )
+            version = await conn.fetchval(
+                """
+                UPDATE calendar_connections
+                SET availability_version = availability_version + 1
+                WHERE id = $1::uuid
+                RETURNING availability_version
+                """,
+                connection_id,
+            )
+    return booking_id, version
+
+
+async def _claim(
+    conn,
+    connection_id: str,
+    start_time: int,
+    end_time: int,
+    customer_name: str,
+    customer_email: str,
+    status: str,
+    rules: CompiledRules | None = None,
+    parent_id: str | None = None,
+) -> str:
+    import asyncpg
+
+    if rules is not None and rules.limits_bookings:
+        # Claims for this owner queue up here until the transaction ends, so
+        # two of them cannot both squeeze under the daily limit or into
+        # each other's buffers.
+        await conn.execute(
+            "SELECT 1 FROM calendar_connections WHERE id = $1::uuid FOR UPDATE", connection_id,
+        )
+        span_start, span_end = rules.booking_span(start_time, end_time)
+        booked = await conn.fetch(
+            f"""
+            SELECT extract(epoch FROM lower(during))::bigint AS start_time,
+                   extract(epoch FROM upper(during))::bigint AS end_time
+            FROM bookings
+            WHERE connection_id = $1::uuid
+              AND during && {_RANGE}
+              AND status IN {_ACTIVE}
+              AND NOT (status = 'pending' AND created_at < now() - $4::interval)
+            """,
+            connection_id,
+            span_start,
+            span_end,
+            _STALE_CLAIM,
+        )
+        if not rules.allows(start_time, end_time, booked):
+            raise SlotTaken()
+
+    await conn.execute(
+        f"""
+        DELETE FROM bookings
+        WHERE connection_id = $1::uuid
+          AND during && {_RANGE}
+          AND status = 'pending'
+          AND created_at < now() - $4::interval
+        """,
+        connection_id,
+        start_time,
+        end_time,
+        _STALE_CLAIM,
+    )
+    try:
+        return str(await conn.fetchval(
+            f"""
+            INSERT INTO bookings
+                (connection_id, during, customer_name, customer_email, status, parent_id)
+            VALUES ($1::uuid, {_RANGE}, $4, $5, $6, $7::uuid)
+            RETURNING id
+            """,
+            connection_id,
+            start_time,
+            end_time,
+            customer_name,
+            customer_email,
+            status,
+            parent_id,
+        ))
+    except asyncpg.exceptions.ExclusionViolationError:
+        raise SlotTaken()
+
+
+async def confirm(booking_id: str, event_id: str) -> int:
+    """Mark the claim and its holds confirmed and bump each owner's version.
+
+    Returns the new ``availability_version`` of the claim's own owner.
+    """
+    async with acquire() as conn:
+        return await conn.fetchval(
+            """
+            WITH b AS (
+                UPDATE bookings SET status = 'confirmed', nylas_event_id = $2
+                WHERE id = $1::uuid OR parent_id = $1::uuid
+                RETURNING connection_id, parent_id IS NULL AS is_claim
+            ),
+            v AS (
+                UPDATE calendar_connections cc
+                SET availability_version = cc.availability_version + 1
+                FROM b WHERE cc.id = b.connection_id
+                RETURNING cc.availability_version, b.is_claim
+            )
+            SELECT availability_version FROM v WHERE is_claim
+            """,
+            booking_id,
+            event_id,
+        )
+
+
+async def fail(booking_id: str, reason: str) -> None:
+    """Give up on a queued booking, freeing its slot but keeping the record."""
+    async with acquire() as conn:
+        await conn.execute(
+            """
+            WITH b AS (
+                UPDATE bookings SET status = 'failed', failure_reason = $2
+                WHERE id = $1::uuid OR parent_id = $1::uuid
+                RETURNING connection_id
+            )
+            UPDATE calendar_connections cc
+            SET availability_version = cc.availability_version + 1
+            FROM b WHERE cc.id = b.connection_id
+            """,
+            booking_id,
+            reason,
+        )
+
+
+async def get(booking_id: str) -> dict | None:
+    """The booking's status and slot, or ``None`` if there is no such booking."""
+    async with acquire() as conn:
+        row = await conn.fetchrow(
+            """
+            SELECT id::text AS booking_id, status, nylas_event_id AS event_id, failure_reason,
+                   extract(epoch FROM lower(during))::bigint AS start_time,
+                   extract(epoch FROM upper(during))::bigint AS end_time,
+                   customer_name, customer_email
+            FROM bookings WHERE id = $1::uuid
+            """,
+            booking_id,
+        )
+    return dict(row) if row else None
+
+
+async def release(booking_id: str) -> None:
+    """Drop a claim that did not turn into a calendar event, with its holds."""
+    async with acquire() as conn:
+        await conn.execute("DELETE FROM bookings WHERE id = $1::uuid", booking_id)
+
+
+async def busy_blocks(connection_id: str, start_time: int, end_time: int) -> list[dict]:
+    """Active bookings overlapping the window, shaped like free/busy blocks."""
+    async with acquire() as conn:
+        with phase("ledger_query"):
+            rows = await conn.fetch(BOOKED_BLOCKS_SQL, connection_id, start_time, end_time)
+    return [{"start_time": r["start_time"], "end_time": r["end_time"], "status": "busy"} for r in rows]
+
+
+async def busy_blocks_many(
+    connection_ids: list[str], start_time: int, end_time: int
+) -> dict[str, list[dict]]:
+    """:func:`busy_blocks` for several owners in one query."""
+    async with acquire() as conn:
+        with phase("ledger_query"):
+            rows = await conn.fetch(
+                f"""
+                SELECT connection_id::text AS connection_id,
+                       extract(epoch FROM lower(during))::bigint AS start_time,
+                       extract(epoch FROM upper(during))::bigint AS end_time
+                FROM bookings
+                WHERE connection_id = ANY($1::uuid[])
+                  AND during && {_RANGE}
+                  AND status IN {_ACTIVE}
+                """,
+                connection_ids,
+                start_time,
+                end_time,
+            )
+    busy: dict[str, list[dict]] = {cid: [] for cid in connection_ids}
+    for r in rows:
+        busy[r["connection_id"]].append(
+            {"start_time": r["start_time"], "end_time": r["end_time"], "status": "busy"}
+        )
+    return busy
+
+
+async def booking_counts(
+    connection_ids: list[str], start_time: int, end_time: int
+) -> dict[str, int]:
+    """Active bookings per owner overlapping the window."""
+    async with acquire() as conn:
+        rows = await conn.fetch(
+            f"""
+            SELECT connection_id::text AS connection_id, count(*) AS n
+            FROM bookings
+            WHERE connection_id = ANY($1::uuid[])
+              AND during && {_RANGE}
+              AND status IN {_ACTIVE}
+            GROUP BY connection_id
+            """,
+            connection_ids,
+            start_time,
+            end_time,
+        )
+    counts = {cid: 0 for cid in connection_ids}
+    counts.update({r["connection_id"]: r["n"] for r in rows})
+    return counts
@@ -0,0 +1,193 @@
+"""Fan-out of availability changes to live booking pages.
+
+Every bump of an owner's ``availability_version`` fires a trigger that
+sends ``NOTIFY availability_changed, '<slug> <version>'`` (migration 11),
+whichever instance or worker made the change.  While an instance has
+subscribers it holds one dedicated ``LISTEN`` connection and hands each
+notification to the subscribers of that slug.  Changes made in this
+process are also published directly, so its own subscribers do not wait
+for the round trip through Postgres.
+
+A published version is only a hint: the hub reloads the owner once per
+hint and hands the fresh row to every subscriber of that slug, which then
+recompute.  Version ``0`` means "something may have changed" and is sent
+to everyone after the listener reconnects, since notifications sent while
+it was down are lost.
+"""
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from app.config import settings
+from app.services.owner_cache import OwnerConnection, owner_cache
+
+CHANNEL = "availability_changed"
+
+
+class Subscription:
+    """One live client's queue of refreshed owner rows for a slug."""
+
+    def __init__(self, slug: str, max_queue: int) -> None:
+        self.slug = slug
+        self.queue: asyncio.Queue[OwnerConnection] = asyncio.Queue(maxsize=max(max_queue, 1))
+        self.dropped = 0
+
+    def offer(self, owner: OwnerConnection) -> None:
+        # A slow client only needs the latest row, so the oldest is dropped
+        # rather than blocking the publisher.
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(owner)
+
+    async def next(self, timeout: float) -> OwnerConnection | None:
+        """Latest owner row delivered since the last call, or ``None`` if
+        nothing arrives within *timeout* seconds."""
+        try:
+            owner = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        while not self.queue.empty():
+            owner = self.queue.get_nowait()
+        return owner
+
+
+class Hub:
+    """In-process subscribers per slug, fed locally and by ``LISTEN``."""
+
+    def __init__(self, max_queue: int) -> None:
+        self.max_queue = max_queue
+        self._subscribers: dict[str, set[Subscription]] = {}
+        self._listener: asyncio.Task | None = None
+        # Per slug: the refresh in flight, whether another hint arrived
+        # meanwhile, and the last version handed out.
+        self._refreshing: dict[str, asyncio.Task] = {}
+        self._dirty: set[str] = set()
+        self._versions: dict[str, int] = {}
+        self.listening = False
+        self.published = 0
+        self.notifications = 0
+        self.refreshes = 0
+        self.dropped = 0
+        self.reconnects = 0
+
+    @asynccontextmanager
+    async def subscribe(self, slug: str) -> AsyncIterator[Subscription]:
+        sub = Subscription(slug, self.max_queue)
+        self._subscribers.setdefault(slug, set()).add(sub)
+        self._ensure_listener()
+        try:
+            yield sub
+        finally:
+            subs = self._subscribers.get(slug)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[slug]
+                    self._versions.pop(slug, None)
+            self.dropped += sub.dropped
+            if not self._subscribers and self._listener is not None:
+                self._listener.cancel()
+                self._listener = None
+
+    def publish(self, slug: str, version: int) -> None:
+        """Refresh *slug*'s owner for every subscriber in this process."""
+        self.published += 1
+        if slug not in self._subscribers:
+            return
+        if version and version <= self._versions.get(slug, 0):
+            return
+        self._dirty.add(slug)
+        if slug not in self._refreshing:
+            self._refreshing[slug] = asyncio.create_task(self._refresh(slug))
+
+    async def _refresh(self, slug: str) -> None:
+        try:
+            while slug in self._dirty and slug in self._subscribers:
+                self._dirty.discard(slug)
+                owner_cache.invalidate(slug)
+                try:
+                    owner = await owner_cache.get(slug)
+                except Exception:
+                    # Subscribers keep what they have; the next hint retries.
+                    continue
+                self.refreshes += 1
+                if owner is None:
+                    continue
+                self._versions[slug] = owner.availability_version
+                for sub in list(self._subscribers.get(slug, ())):
+                    sub.offer(owner)
+        finally:
+            self._dirty.discard(slug)
+            del self._refreshing[slug]
+
+    def _ensure_listener(self) -> None:
+        if not settings.live_listen:
+            return
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    def _on_notify(self, conn, pid: int, channel: str, payload: str) -> None:
+        slug, _, version = payload.rpartition(" ")
+        self.notifications += 1
+        # The change may come from another instance, whose writes never
+        # reach this process's owner cache.
+        owner_cache.invalidate(slug)
+        try:
+            self.publish(slug, int(version))
+        except ValueError:
+            self.publish(slug, 0)
+
+    async def _listen(self) -> None:
+        import asyncpg
+
+        delay = 1.0
+        while True:
+            try:
+                conn = await asyncpg.connect(_listen_dsn())
+            except Exception:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+                continue
+            delay = 1.0
+            lost = asyncio.Event()
+            try:
+                conn.add_termination_listener(lambda _: lost.set())
+                await conn.add_listener(CHANNEL, self._on_notify)
+                if self.reconnects:
+                    for slug in list(self._subscribers):
+                        self.publish(slug, 0)
+                self.listening = True
+                await lost.wait()
+            finally:
+                self.listening = False
+                if not conn.is_closed():
+                    conn.terminate()
+            self.reconnects += 1
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": sum(len(s) for s in self._subscribers.values()),
+            "slugs": len(self._subscribers),
+            "listening": self.listening,
+            "published": self.published,
+            "notifications": self.notifications,
+            "refreshes": self.refreshes,
+            "dropped": self.dropped + sum(
+                sub.dropped for subs in self._subscribers.values() for sub in subs
+            ),
+            "reconnects": self.reconnects,
+        }
+
+
+def _listen_dsn() -> str:
+    if settings.live_database_url:
+        return settings.live_database_url
+    # LISTEN needs a session of its own, which pgbouncer in transaction mode
+    # cannot give; Neon's direct endpoint is the pooled host minus "-pooler".
+    return settings.database_url.replace("-pooler.", ".")
+
+
+hub = Hub(max_queue=settings.live_queue_size)
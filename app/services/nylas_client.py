@@ -1,11 +1,104 @@
 from __future__ import annotations
 
-import httpx
+from typing import TYPE_CHECKING
 
 from app.config import settings
+from app.metrics import nylas_responses, phase
+from app.services.resilience import nylas_resilience
+
+if TYPE_CHECKING:
+    import httpx
 
 _BASE = settings.nylas_api_uri
 
+_client: httpx.AsyncClient | None = None
+_stats: dict[str, int] = {"requests": 0, "connections_opened": 0}
+
+
+async def _trace(event_name: str, info: dict) -> None:
+    if event_name == "connection.connect_tcp.complete":
+        _stats["connections_opened"] += 1
+
+
+async def _on_request(request: httpx.Request) -> None:
+    _stats["requests"] += 1
+    request.extensions["trace"] = _trace
+
+
+async def _on_response(response: httpx.Response) -> None:
+    endpoint = response.request.url.path.rsplit("/", 1)[-1]
+    nylas_responses.inc(endpoint=endpoint, status=str(response.status_code))
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _build_client() -> httpx.AsyncClient:
+    import httpx
+
+    return httpx.AsyncClient(
+        base_url=_BASE,
+        http2=settings.nylas_http2 and _http2_available(),
+        limits=httpx.Limits(
+            max_connections=settings.nylas_max_connections,
+            max_keepalive_connections=settings.nylas_max_keepalive_connections,
+            keepalive_expiry=settings.nylas_keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(
+            connect=settings.nylas_connect_timeout,
+            read=settings.nylas_read_timeout,
+            write=settings.nylas_write_timeout,
+            pool=settings.nylas_pool_timeout,
+        ),
+        event_hooks={"request": [_on_request], "response": [_on_response]},
+    )
+
+
+async def init_client() -> None:
+    global _client
+    if _client is None:
+        _client = _build_client()
+
+
+async def close_client() -> None:
+    global _client
+    if _client:
+        await _client.aclose()
+        _client = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it on first use outside the lifespan."""
+    global _client
+    if _client is None:
+        _client = _build_client()
+    return _client
+
+
+def pool_stats() -> dict:
+    """Connection pool statistics for the shared Nylas client."""
+    connections: list = []
+    if _client is not None:
+        transport = _client._transport
+        pool = getattr(transport, "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+    requests = _stats["requests"]
+    opened = _stats["connections_opened"]
+    return {
+        "requests": requests,
+        "connections_opened": opened,
+        "connections_reused": max(requests - opened, 0),
+        "reuse_ratio": round(1 - opened / requests, 4) if requests else 0.0,
+        "open_connections": len(connections),
+        "idle_connections": sum(1 for c in connections if c.is_idle()),
+        "http2": bool(_client and settings.nylas_http2 and _http2_available()),
+    }
+
 
 def _headers() -> dict[str, str]:
     return {
@@ -16,20 +109,19 @@ def _headers() -> dict[str, str]:
 
 async def exchange_code_for_grant(code: str) -> dict:
     """Exchange an authorization code for a grant via Nylas token endpoint."""
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(
-            f"{_BASE}/v3/connect/token",
-            headers={"Content-Type": "application/json"},
-            json={
-                "client_id": settings.nylas_client_id,
-                "client_secret": settings.nylas_api_key,
-                "code": code,
-                "grant_type": "authorization_code",
-                "redirect_uri": settings.nylas_callback_uri,
-            },
-        )
-        resp.raise_for_status()
-        return resp.json()
+    resp = await get_client().post(
+        "/v3/connect/token",
+        headers={"Content-Type": "application/json"},
+        json={
+            "client_id": settings.nylas_client_id,
+            "client_secret": settings.nylas_api_key,
+            "code": code,
+            "grant_type": "authorization_code",
+            "redirect_uri": settings.nylas_callback_uri,
+        },
+    )
+    resp.raise_for_status()
+    return resp.json()
 
 
 async def get_free_busy(
@@ -39,25 +131,69 @@ async def get_free_busy(
 
     Returns a list of time_slots dicts with 'start_time', 'end_time', 'status'.
     """
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(
-            f"{_BASE}/v3/grants/{grant_id}/calendars/free-busy",
+    by_email = await get_free_busy_multi(grant_id, start_time, end_time, [email])
+    return [slot for slots in by_email.values() for slot in slots]
+
+
+async def get_free_busy_multi(
+    grant_id: str, start_time: int, end_time: int, emails: list[str]
+) -> dict[str, list[dict]]:
+    """Busy blocks for several calendars visible to one grant, in one call.
+
+    Returns a mapping of email to its busy time_slots dicts.  The call is
+    retried and hedged by :data:`nylas_resilience`.
+    """
+    async def call() -> dict:
+        resp = await get_client().post(
+            f"/v3/grants/{grant_id}/calendars/free-busy",
             headers=_headers(),
             json={
                 "start_time": start_time,
                 "end_time": end_time,
-                "emails": [email],
+                "emails": emails,
             },
         )
         resp.raise_for_status()
-        data = resp.json()
+        return resp.json()
+
+    with phase("nylas_freebusy"):
+        data = await nylas_resilience.call(grant_id, call, hedge=True)
 
-    busy_slots: list[dict] = []
+    busy: dict[str, list[dict]] = {email: [] for email in emails}
     for entry in data.get("data", []):
+        slots = busy.setdefault(entry.get("email", ""), [])
         for slot in entry.get("time_slots", []):
             if slot.get("status") == "busy":
-                busy_slots.append(slot)
-    return busy_slots
+                slots.append(slot)
+    return busy
+
+
+async def list_events(grant_id: str, start_time: int, end_time: int) -> list[dict]:
+    """List primary-calendar events overlapping the window, following pages."""
+    events: list[dict] = []
+    params: dict = {
+        "calendar_id": "primary",
+        "start": start_time,
+        "end": end_time,
+        "limit": 200,
+    }
+    async def call() -> dict:
+        resp = await get_client().get(
+            f"/v3/grants/{grant_id}/events",
+            headers=_headers(),
+            params=params,
+        )
+        resp.raise_for_status()
+        return resp.json()
+
+    while True:
+        with phase("nylas_events"):
+            data = await nylas_resilience.call(grant_id, call)
+        events.extend(data.get("data", []))
+        cursor = data.get("next_cursor")
+        if not cursor:
+            return events
+        params["page_token"] = cursor
 
 
 async def create_event(
@@ -67,11 +203,15 @@ async def create_event(
     end_time: int,
     participant_email: str,
     participant_name: str,
+    extra_participants: list[dict] | None = None,
 ) -> dict:
-    """Create a calendar event via Nylas Events API."""
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(
-            f"{_BASE}/v3/grants/{grant_id}/events",
+    """Create a calendar event via Nylas Events API.
+
+    Not retried: a timed-out create may still have succeeded.
+    """
+    async def call() -> dict:
+        resp = await get_client().post(
+            f"/v3/grants/{grant_id}/events",
             headers=_headers(),
             params={"calendar_id": "primary"},
             json={
@@ -81,10 +221,14 @@ async def create_event(
                     "end_time": end_time,
                 },
                 "participants": [
-                    {"email": participant_email, "name": participant_name}
+                    {"email": participant_email, "name": participant_name},
+                    *(extra_participants or []),
                 ],
                 "notify_participants": True,
             },
         )
         resp.raise_for_status()
         return resp.json()
+
+    with phase("nylas_create_event"):
+        return await nylas_resilience.call(grant_id, call, idempotent=False)
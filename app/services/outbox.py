@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import time
+from datetime import timedelta
+
+from app.config import settings
+from app.database import acquire
+from app.services import ledger
+from app.services.freebusy_cache import freebusy_cache
+from app.services.nylas_client import create_event, get_free_busy, list_events
+from app.services.owner_cache import owner_cache
+from app.services.resilience import CircuitOpen, clear_deadline
+
+# How long a claimed job is hidden from other workers before it is retried.
+_LEASE = timedelta(minutes=2)
+_LOCK_ID = 0x6F7574626F78  # "outbox"
+
+# Takes the oldest job of every connection whose head job is due.  A job
+# waiting for a retry or leased by a worker therefore holds back the jobs
+# queued behind it for the same calendar.
+_CLAIM_SQL = """
+    WITH head AS (
+        SELECT DISTINCT ON (connection_id) booking_id, next_attempt_at, locked_until
+        FROM booking_outbox
+        ORDER BY connection_id, created_at
+    ), due AS (
+        SELECT booking_id FROM head
+        WHERE next_attempt_at <= now() AND (locked_until IS NULL OR locked_until < now())
+        ORDER BY next_attempt_at
+        LIMIT $1
+    )
+    UPDATE booking_outbox o
+    SET locked_until = now() + $2::interval, attempts = o.attempts + 1
+    FROM due, bookings b, calendar_connections cc
+    WHERE o.booking_id = due.booking_id AND b.id = o.booking_id AND cc.id = o.connection_id
+    RETURNING o.booking_id::text AS booking_id, o.attempts, o.extra_participants, cc.slug,
+              extract(epoch FROM lower(b.during))::bigint AS start_time,
+              extract(epoch FROM upper(b.during))::bigint AS end_time,
+              b.customer_name, b.customer_email
+"""
+
+stats: dict[str, int] = {"processed": 0, "confirmed": 0, "failed": 0, "retried": 0}
+
+_kick_task: asyncio.Task | None = None
+
+
+async def _claim_jobs(limit: int) -> list[dict]:
+    async with acquire() as conn:
+        async with conn.transaction():
+            # Serialise claiming so two workers never lease the same head.
+            await conn.execute("SELECT pg_advisory_xact_lock($1)", _LOCK_ID)
+            rows = await conn.fetch(_CLAIM_SQL, limit, _LEASE)
+    return [dict(r) for r in rows]
+
+
+async def _finish(booking_id: str) -> None:
+    async with acquire() as conn:
+        await conn.execute("DELETE FROM booking_outbox WHERE booking_id = $1::uuid", booking_id)
+
+
+async def _retry_later(booking_id: str, delay: float, error: str) -> None:
+    async with acquire() as conn:
+        await conn.execute(
+            """
+            UPDATE booking_outbox
+            SET next_attempt_at = now() + $2::interval, locked_until = NULL, last_error = $3
+            WHERE booking_id = $1::uuid
+            """,
+            booking_id,
+            timedelta(seconds=delay),
+            error[:500],
+        )
+
+
+async def _give_up(booking_id: str, reason: str) -> None:
+    await ledger.fail(booking_id, reason)
+    await _finish(booking_id)
+    stats["failed"] += 1
+
+
+def _title(customer_name: str) -> str:
+    return f"Booking: {customer_name}"
+
+
+async def _existing_event(grant_id: str, job: dict) -> str | None:
+    """Event ID from an earlier attempt whose create call outlived its timeout."""
+    for event in await list_events(grant_id, job["start_time"], job["end_time"]):
+        when = event.get("when", {})
+        emails = {p.get("email") for p in event.get("participants", [])}
+        if (
+            when.get("start_time") == job["start_time"]
+            and job["customer_email"] in emails
+            and event.get("title") == _title(job["customer_name"])
+        ):
+            return event.get("id")
+    return None
+
+
+async def process(job: dict) -> None:
+    """Create the calendar event for one leased outbox job."""
+    booking_id = job["booking_id"]
+    owner = await owner_cache.get(job["slug"])
+    if owner is None:
+        await _give_up(booking_id, "calendar_disconnected")
+        return
+
+    try:
+        event_id = None
+        if job["attempts"] > 1:
+            event_id = await _existing_event(owner.grant_id, job)
+        if event_id is None:
+            busy = await get_free_busy(owner.grant_id, job["start_time"], job["end_time"], owner.email)
+            if any(b["start_time"] < job["end_time"] and b["end_time"] > job["start_time"] for b in busy):
+                await _give_up(booking_id, "slot_unavailable")
+                return
+            event_data = await create_event(
+                grant_id=owner.grant_id,
+                title=_title(job["customer_name"]),
+                start_time=job["start_time"],
+                end_time=job["end_time"],
+                participant_email=job["customer_email"],
+                participant_name=job["customer_name"],
+                extra_participants=json.loads(job["extra_participants"]),
+            )
+            event_id = event_data.get("data", event_data).get("id", "")
+    except Exception as exc:
+        if job["attempts"] >= settings.outbox_max_attempts:
+            await _give_up(booking_id, f"nylas_error: {exc}")
+            return
+        delay = min(5 * 2 ** job["attempts"], 300) * random.uniform(0.5, 1.0)
+        if isinstance(exc, CircuitOpen):
+            delay = max(delay, exc.retry_after)
+        await _retry_later(booking_id, delay, str(exc))
+        stats["retried"] += 1
+        return
+
+    await ledger.confirm(booking_id, event_id)
+    await _finish(booking_id)
+    freebusy_cache.invalidate_grant(owner.grant_id)
+    owner_cache.invalidate(owner.slug)
+    stats["confirmed"] += 1
+
+
+async def drain(max_seconds: float | None = None) -> dict:
+    """Process due jobs until the outbox is idle or *max_seconds* pass.
+
+    Jobs run ``outbox_concurrency`` at a time, at most one per calendar.
+    Returns the number of jobs processed.
+    """
+    clear_deadline()
+    started = time.monotonic()
+    semaphore = asyncio.Semaphore(max(settings.outbox_concurrency, 1))
+    processed = 0
+
+    async def run(job: dict) -> None:
+        async with semaphore:
+            await process(job)
+
+    while max_seconds is None or time.monotonic() - started < max_seconds:
+        jobs = await _claim_jobs(settings.outbox_batch_size)
+        if not jobs:
+            break
+        await asyncio.gather(*(run(job) for job in jobs))
+        processed += len(jobs)
+        stats["processed"] += len(jobs)
+    return {"processed": processed, "seconds": round(time.monotonic() - started, 3)}
+
+
+def kick() -> None:
+    """Start draining in the background now, unless a drain is running."""
+    global _kick_task
+    if _kick_task is not None and not _kick_task.done():
+        return
+    _kick_task = asyncio.create_task(_drain_quietly())
+
+
+async def _drain_quietly() -> None:
+    try:
+        await drain(max_seconds=30)
+    except Exception:
+        # The cron endpoint or worker picks the jobs up later.
+        pass
+
+
+async def run_worker(poll_interval: float) -> None:
+    """Drain forever, sleeping *poll_interval* seconds when idle."""
+    while True:
+        result = await drain()
+        if not result["processed"]:
+            await asyncio.sleep(poll_interval)
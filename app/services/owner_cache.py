@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from app import queries
+from app.config import settings
+from app.database import acquire
+from app.encryption import decrypt
+from app.metrics import phase
+from app.services.singleflight import SingleFlight
+from app.services.ttl_cache import TTLCache
+
+
+@dataclass(frozen=True)
+class OwnerConnection:
+    """A valid ``calendar_connections`` row with the grant ID decrypted."""
+
+    id: str
+    owner_id: str
+    slug: str
+    grant_id: str
+    email: str
+    timezone: str
+    business_hours_start: str
+    business_hours_end: str
+    slot_duration_minutes: int
+    availability_version: int = 0
+    # Raw JSON of the owner's weekly rules; see app.services.rules.
+    availability_rules: str | None = None
+
+
+class OwnerCache:
+    """Slug -> :class:`OwnerConnection` cache with a TTL and a size bound.
+
+    Writers in this process invalidate explicitly; other instances pick up
+    changes once their entry's TTL runs out.  Concurrent misses for one slug
+    share a single query and decrypt.  Every invalidation bumps a
+    generation; a load that started before one is neither joined by later
+    callers nor stored, so it cannot bring back the row it read.
+    """
+
+    def __init__(self, ttl: float, max_entries: int) -> None:
+        self.ttl = ttl
+        self._entries = TTLCache(max_entries)
+        self._flight = SingleFlight()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get(self, slug: str) -> OwnerConnection | None:
+        cached = self._entries.get(slug)
+        if cached is not None and cached[1] < self.ttl:
+            self.hits += 1
+            return cached[0]
+
+        self.misses += 1
+        generation = self._generation
+        return await self._flight.do((slug, generation), lambda: self._load(slug, generation))
+
+    async def _load(self, slug: str, generation: int) -> OwnerConnection | None:
+        async with acquire() as conn:
+            with phase("owner_query"):
+                row = await queries.owner_by_slug(conn, slug)
+        if not row:
+            if self._generation == generation:
+                self._entries.delete(slug)
+            return None
+
+        with phase("decrypt"):
+            grant_id = decrypt(row["nylas_grant_id"])
+        owner = OwnerConnection(
+            id=str(row["id"]),
+            owner_id=str(row["owner_id"]),
+            slug=row["slug"],
+            grant_id=grant_id,
+            email=row["google_email"] or "",
+            timezone=row["timezone"] or "UTC",
+            business_hours_start=row["business_hours_start"] or settings.business_hours_start,
+            business_hours_end=row["business_hours_end"] or settings.business_hours_end,
+            slot_duration_minutes=row["slot_duration_minutes"] or settings.slot_duration_minutes,
+            availability_version=row["availability_version"],
+            availability_rules=row["availability_rules"],
+        )
+        if self.ttl > 0 and self._generation == generation:
+            self._entries.set(slug, owner)
+        return owner
+
+    def invalidate(self, slug: str) -> None:
+        self._generation += 1
+        if self._entries.delete(slug):
+            self.invalidations += 1
+
+    def invalidate_owner(self, owner_id: str) -> None:
+        """Drop the entry for *owner_id*, whatever slug it is cached under."""
+        self._generation += 1
+        self.invalidations += self._entries.delete_where(
+            lambda _, owner: owner.owner_id == owner_id
+        )
+
+    def clear(self) -> None:
+        """Drop every entry, e.g. after a bulk settings import."""
+        self._generation += 1
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "max_entries": self._entries.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self._entries.evictions,
+            "invalidations": self.invalidations,
+            "coalesced": self._flight.coalesced,
+        }
+
+
+owner_cache = OwnerCache(
+    ttl=settings.owner_cache_ttl_seconds,
+    max_entries=settings.owner_cache_max_entries,
+)
@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable
+
+from app.config import settings
+from app.services.ttl_cache import TTLCache
+
+_deadline: ContextVar[float | None] = ContextVar("nylas_deadline", default=None)
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling Nylas while a breaker is open."""
+
+    def __init__(self, scope: str, retry_after: float) -> None:
+        super().__init__(f"Nylas circuit open ({scope})")
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """The request's latency budget ran out before Nylas answered."""
+
+
+@contextmanager
+def deadline(seconds: float):
+    """Bound every Nylas call in this context to *seconds* from now.
+
+    Nested deadlines can only shorten the budget, never extend it.
+    """
+    at = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(at if current is None else min(at, current))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def clear_deadline() -> None:
+    """Drop the inherited deadline, e.g. in a background task."""
+    _deadline.set(None)
+
+
+def remaining() -> float | None:
+    """Seconds left in the current budget, or ``None`` if unbounded."""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with a single half-open probe.
+
+    After *failure_threshold* transient failures in a row the breaker opens
+    and calls fail fast for *reset_timeout* seconds.  Then one probe call is
+    let through: success closes the breaker, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.opens = 0
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(self.reset_timeout - (time.monotonic() - self.opened_at), 0.0)
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            if self.opened_at is None or self._probing:
+                self.opens += 1
+            self.opened_at = time.monotonic()
+            self._probing = False
+
+    def release_probe(self) -> None:
+        """Give the probe slot back when the probe ended without a verdict."""
+        self._probing = False
+
+
+class LatencyTracker:
+    """Rolling window of recent call latencies."""
+
+    def __init__(self, size: int = 200) -> None:
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> float | None:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def _is_transient(exc: BaseException) -> bool:
+    """Errors worth retrying and counting against the breaker.
+
+    Timeouts count whichever layer raised them; the caller still stops
+    once the request's own deadline has run out.
+    """
+    import httpx
+
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return status >= 500 or status == 429
+    return isinstance(exc, (httpx.TransportError, TimeoutError, asyncio.TimeoutError))
+
+
+class NylasResilience:
+    """Deadline, retry, hedging and circuit breaking around Nylas calls.
+
+    Every call checks a global breaker and a per-grant breaker first.
+    Idempotent calls are retried with full-jitter exponential backoff while
+    the request's :func:`deadline` allows.  Hedged calls start a second
+    identical request if the first has not answered by the recent p95
+    latency and take whichever succeeds first.
+    """
+
+    _MIN_HEDGE_SAMPLES = 20
+
+    def __init__(self) -> None:
+        self.global_breaker = CircuitBreaker(
+            settings.nylas_circuit_global_threshold, settings.nylas_circuit_reset_seconds,
+        )
+        self._grant_breakers = TTLCache(max_entries=4096)
+        self.latency = LatencyTracker()
+        self.calls = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.short_circuits = 0
+        self.deadline_exceeded = 0
+
+    def breaker_for(self, grant_id: str) -> CircuitBreaker:
+        cached = self._grant_breakers.get(grant_id)
+        if cached is not None:
+            return cached[0]
+        breaker = CircuitBreaker(
+            settings.nylas_circuit_failure_threshold, settings.nylas_circuit_reset_seconds,
+        )
+        self._grant_breakers.set(grant_id, breaker)
+        return breaker
+
+    def is_open(self, grant_id: str) -> bool:
+        """True while calls for *grant_id* would fail fast."""
+        return self.global_breaker.state == "open" or self.breaker_for(grant_id).state == "open"
+
+    async def call(
+        self,
+        grant_id: str,
+        fn: Callable[[], Awaitable[Any]],
+        *,
+        idempotent: bool = True,
+        hedge: bool = False,
+    ) -> Any:
+        """Run ``fn()`` under the current deadline and both breakers."""
+        self.calls += 1
+        attempts = 1 + (settings.nylas_retry_attempts if idempotent else 0)
+        for attempt in range(attempts):
+            grant = self._acquire(grant_id)
+            budget = remaining()
+            if budget is not None and budget <= 0:
+                self._release(grant)
+                self.deadline_exceeded += 1
+                raise DeadlineExceeded("Nylas request budget exhausted")
+
+            started = time.monotonic()
+            try:
+                result = await asyncio.wait_for(self._attempt(fn, hedge and idempotent), budget)
+            except Exception as exc:
+                if (
+                    isinstance(exc, (TimeoutError, asyncio.TimeoutError))
+                    and budget is not None
+                    and time.monotonic() - started >= budget
+                ):
+                    self._failure(grant)
+                    self.deadline_exceeded += 1
+                    raise DeadlineExceeded("Nylas request budget exhausted") from exc
+                if not _is_transient(exc):
+                    self._release(grant)
+                    raise
+                self._failure(grant)
+                if attempt + 1 >= attempts:
+                    raise
+                delay = random.uniform(
+                    0, min(settings.nylas_retry_max_delay, settings.nylas_retry_base_delay * 2 ** attempt)
+                )
+                left = remaining()
+                if left is not None and left <= delay:
+                    raise
+                self.retries += 1
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                self._release(grant)
+                raise
+
+            self.latency.add(time.monotonic() - started)
+            self.global_breaker.record_success()
+            grant.record_success()
+            return result
+
+    def _acquire(self, grant_id: str) -> CircuitBreaker:
+        grant = self.breaker_for(grant_id)
+        if not self.global_breaker.allow():
+            self.short_circuits += 1
+            raise CircuitOpen("global", self.global_breaker.retry_after())
+        if not grant.allow():
+            self.global_breaker.release_probe()
+            self.short_circuits += 1
+            raise CircuitOpen("grant", grant.retry_after())
+        return grant
+
+    def _release(self, grant: CircuitBreaker) -> None:
+        self.global_breaker.release_probe()
+        grant.release_probe()
+
+    def _failure(self, grant: CircuitBreaker) -> None:
+        self.global_breaker.record_failure()
+        grant.record_failure()
+
+    def hedge_delay(self) -> float:
+        if len(self.latency) < self._MIN_HEDGE_SAMPLES:
+            return settings.nylas_hedge_after_seconds
+        return max(self.latency.percentile(0.95), settings.nylas_hedge_min_seconds)
+
+    async def _attempt(self, fn: Callable[[], Awaitable[Any]], hedge: bool) -> Any:
+        if not (hedge and settings.nylas_hedge_enabled):
+            return await fn()
+
+        first = asyncio.ensure_future(fn())
+        tasks = {first}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay())
+            if not done:
+                self.hedges += 1
+                tasks.add(asyncio.ensure_future(fn()))
+            error: BaseException | None = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> dict:
+        p95 = self.latency.percentile(0.95)
+        open_grants = sum(
+            1 for breaker in self._grant_breakers.values() if breaker.state != "closed"
+        )
+        return {
+            "global_breaker": self.global_breaker.state,
+            "global_opens": self.global_breaker.opens,
+            "open_grant_breakers": open_grants,
+            "calls": self.calls,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "short_circuits": self.short_circuits,
+            "deadline_exceeded": self.deadline_exceeded,
+            "latency_p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+
+nylas_resilience = NylasResilience()
+
+
+class DeadlineMiddleware:
+    """ASGI middleware giving each API request a Nylas latency budget."""
+
+    def __init__(self, app, seconds: float) -> None:
+        self.app = app
+        self.seconds = seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.seconds <= 0:
+            return await self.app(scope, receive, send)
+        with deadline(self.seconds):
+            return await self.app(scope, receive, send)
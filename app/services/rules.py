@@ -0,0 +1,355 @@
+"""Weekly availability rules, compiled into per-day UTC windows.
+
+An owner's ``availability_rules`` (JSONB, optional) look like::
+
+    {
+      "weekly": {"mon": [["09:00", "12:00"], ["13:00", "17:00"]], "fri": [["09:00", "13:00"]]},
+      "breaks": [["10:30", "10:45"]],
+      "overrides": {"2025-12-24": [["09:00", "12:00"]], "2025-12-25": []},
+      "buffer_before_minutes": 10,
+      "buffer_after_minutes": 5,
+      "min_notice_minutes": 120,
+      "max_bookings_per_day": 6
+    }
+
+Times are wall-clock times in the owner's ``timezone``; ``"24:00"`` ends a
+window at midnight.  Weekdays missing from ``weekly`` are closed, breaks
+apply to every day, and an override replaces the weekly windows for its
+date (``[]`` closes the day).  Owners without rules are open every day
+between ``business_hours_start`` and ``business_hours_end``.
+
+Rules are parsed and compiled once per distinct settings; a compiled rule
+set keeps the per-weekday local intervals with breaks already removed and
+memoises the UTC windows of each day it is asked about, so slot
+generation only has to sweep busy blocks over ready-made windows.
+"""
+from __future__ import annotations
+
+import json
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import Sequence
+from zoneinfo import ZoneInfo
+
+from app.services.calendar import compute_available_slots_bulk
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+# Bounds on the slot grid, shared by every path that stores a duration.
+MIN_SLOT_MINUTES = 5
+MAX_SLOT_MINUTES = 480
+_DAY = 86400
+_MAX_MEMO_DAYS = 1024
+
+Interval = tuple[int, int]
+
+
+def _seconds(value: str) -> int:
+    """Seconds after local midnight for ``"HH:MM"`` (``"24:00"`` allowed)."""
+    if value == "24:00":
+        return _DAY
+    parsed = time.fromisoformat(value)
+    return parsed.hour * 3600 + parsed.minute * 60 + parsed.second
+
+
+def _intervals(pairs, what: str) -> list[Interval]:
+    out = []
+    for pair in pairs or ():
+        if not isinstance(pair, (list, tuple)) or len(pair) != 2:
+            raise ValueError(f"{what}: expected [start, end] pairs")
+        start, end = _seconds(pair[0]), _seconds(pair[1])
+        if start >= end:
+            raise ValueError(f"{what}: {pair[0]} is not before {pair[1]}")
+        out.append((start, end))
+    return out
+
+
+def _subtract(windows: list[Interval], breaks: list[Interval]) -> tuple[Interval, ...]:
+    """Merge *windows* and cut every break out of them."""
+    merged: list[list[int]] = []
+    for start, end in sorted(windows):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    out: list[Interval] = []
+    for start, end in merged:
+        pieces = [(start, end)]
+        for b_start, b_end in breaks:
+            next_pieces = []
+            for p_start, p_end in pieces:
+                if b_end <= p_start or b_start >= p_end:
+                    next_pieces.append((p_start, p_end))
+                    continue
+                if p_start < b_start:
+                    next_pieces.append((p_start, b_start))
+                if b_end < p_end:
+                    next_pieces.append((b_end, p_end))
+            pieces = next_pieces
+        out.extend(pieces)
+    return tuple(out)
+
+
+class CompiledRules:
+    """An owner's rules as local interval templates plus a per-day UTC memo."""
+
+    def __init__(
+        self,
+        tz: ZoneInfo,
+        weekly: tuple[tuple[Interval, ...], ...],
+        overrides: dict[date, tuple[Interval, ...]],
+        slot_duration_minutes: int,
+        buffer_before_minutes: int = 0,
+        buffer_after_minutes: int = 0,
+        min_notice_minutes: int = 0,
+        max_bookings_per_day: int | None = None,
+    ) -> None:
+        self.tz = tz
+        self.weekly = weekly
+        self.overrides = overrides
+        self.slot_duration_minutes = slot_duration_minutes
+        self.buffer_before = buffer_before_minutes * 60
+        self.buffer_after = buffer_after_minutes * 60
+        self.min_notice = min_notice_minutes * 60
+        self.max_bookings_per_day = max_bookings_per_day
+        self._windows: dict[date, tuple[Interval, ...]] = {}
+
+    def _utc(self, day: date, seconds: int) -> int:
+        # Wall-clock arithmetic, then zoneinfo resolves the offset in force
+        # at that local time, so DST days get their true length.
+        local = datetime.combine(day, time.min) + timedelta(seconds=seconds)
+        return int(local.replace(tzinfo=self.tz).timestamp())
+
+    def windows(self, day: date) -> tuple[Interval, ...]:
+        """Bookable ``(start, end)`` Unix windows on the owner's local *day*."""
+        cached = self._windows.get(day)
+        if cached is None:
+            local = self.overrides.get(day, self.weekly[day.weekday()])
+            cached = tuple((self._utc(day, s), self._utc(day, e)) for s, e in local)
+            if len(self._windows) >= _MAX_MEMO_DAYS:
+                self._windows.clear()
+            self._windows[day] = cached
+        return cached
+
+    def day_bounds(self, day: date) -> Interval:
+        """Unix start of the owner's local *day* and of the next one."""
+        return self._utc(day, 0), self._utc(day + timedelta(days=1), 0)
+
+    def local_date(self, ts: int) -> date:
+        return datetime.fromtimestamp(ts, tz=self.tz).date()
+
+    def today(self) -> date:
+        return datetime.now(self.tz).date()
+
+    def _earliest(self, now: int) -> int:
+        return now + self.min_notice
+
+    def slots(
+        self,
+        days: list[date],
+        busy_blocks: list[dict],
+        booked: list[dict],
+        now: int | None = None,
+    ) -> list[list[dict]]:
+        """Free slots per day of *days*.
+
+        *busy_blocks* are calendar events and *booked* the owner's own
+        bookings; both count as busy, widened by the buffers, and
+        *booked* also counts towards ``max_bookings_per_day``.  Slots
+        starting within ``min_notice`` of *now* are left out.
+        """
+        now = int(datetime.now(timezone.utc).timestamp()) if now is None else now
+        before, after = self.buffer_before, self.buffer_after
+        busy = [
+            {"start_time": b["start_time"] - after, "end_time": b["end_time"] + before}
+            for b in (*busy_blocks, *booked)
+        ]
+        busy.append({"start_time": 0, "end_time": self._earliest(now)})
+
+        full: set[date] = set()
+        if self.max_bookings_per_day is not None:
+            counts: dict[date, int] = {}
+            for b in booked:
+                d = self.local_date(b["start_time"])
+                counts[d] = counts.get(d, 0) + 1
+            full = {d for d, n in counts.items() if n >= self.max_bookings_per_day}
+
+        flat: list[Interval] = []
+        owners: list[int] = []
+        for i, day in enumerate(days):
+            if day in full:
+                continue
+            for window in self.windows(day):
+                flat.append(window)
+                owners.append(i)
+        per_window = compute_available_slots_bulk(busy, flat, self.slot_duration_minutes)
+
+        result: list[list[dict]] = [[] for _ in days]
+        for i, window_slots in zip(owners, per_window):
+            result[i].extend(window_slots)
+        return result
+
+    def still_bookable(self, slots: list[dict], now: int | None = None) -> list[dict]:
+        """Drop slots that have fallen inside the notice period since they were computed."""
+        now = int(datetime.now(timezone.utc).timestamp()) if now is None else now
+        earliest = self._earliest(now)
+        return [s for s in slots if s["start_time"] >= earliest]
+
+    @property
+    def limits_bookings(self) -> bool:
+        """Whether :meth:`allows` depends on the owner's other bookings."""
+        return bool(self.buffer_before or self.buffer_after) or self.max_bookings_per_day is not None
+
+    def booking_span(self, start_time: int, end_time: int) -> Interval:
+        """The range whose bookings :meth:`allows` needs to see for this slot."""
+        day_start, day_end = self.day_bounds(self.local_date(start_time))
+        return min(day_start, start_time - self.buffer_before), max(day_end, end_time + self.buffer_after)
+
+    def allows(
+        self,
+        start_time: int,
+        end_time: int,
+        booked: Sequence[dict] = (),
+        now: int | None = None,
+    ) -> bool:
+        """Whether ``[start_time, end_time)`` lies in one window and outside the notice period.
+
+        With *booked* (the owner's active bookings over :meth:`booking_span`)
+        the slot must also clear their buffers, and its day must be under
+        ``max_bookings_per_day``.
+        """
+        now = int(datetime.now(timezone.utc).timestamp()) if now is None else now
+        if start_time < self._earliest(now):
+            return False
+        day = self.local_date(start_time)
+        if not any(w_start <= start_time and end_time <= w_end for w_start, w_end in self.windows(day)):
+            return False
+        before, after = self.buffer_before, self.buffer_after
+        if any(b["start_time"] - after < end_time and start_time < b["end_time"] + before for b in booked):
+            return False
+        if self.max_bookings_per_day is not None:
+            same_day = sum(1 for b in booked if self.local_date(b["start_time"]) == day)
+            if same_day >= self.max_bookings_per_day:
+                return False
+        return True
+
+
+def check_slot_duration(minutes: int) -> None:
+    """Raise ``ValueError`` unless *minutes* is a usable slot length."""
+    if not MIN_SLOT_MINUTES <= minutes <= MAX_SLOT_MINUTES:
+        raise ValueError(
+            f"slot_duration_minutes must be between {MIN_SLOT_MINUTES} and {MAX_SLOT_MINUTES}"
+        )
+
+
+def parse(
+    raw: dict | None,
+    timezone_name: str,
+    business_hours_start: str,
+    business_hours_end: str,
+    slot_duration_minutes: int,
+) -> CompiledRules:
+    """Validate and compile rules; raises ``ValueError`` on bad input."""
+    try:
+        return _parse(raw, timezone_name, business_hours_start, business_hours_end, slot_duration_minutes)
+    except (TypeError, AttributeError) as exc:
+        # JSON of the wrong shape, e.g. a number where a time belongs.
+        raise ValueError(f"invalid rules: {exc}") from None
+
+
+def _parse(
+    raw: dict | None,
+    timezone_name: str,
+    business_hours_start: str,
+    business_hours_end: str,
+    slot_duration_minutes: int,
+) -> CompiledRules:
+    try:
+        tz = ZoneInfo(timezone_name or "UTC")
+    except (ValueError, KeyError, TypeError):
+        raise ValueError(f"unknown timezone {timezone_name!r}") from None
+    check_slot_duration(slot_duration_minutes)
+
+    if raw is None:
+        day = _subtract(_intervals([(business_hours_start, business_hours_end)], "business hours"), [])
+        return CompiledRules(tz, (day,) * 7, {}, slot_duration_minutes)
+
+    if not isinstance(raw, dict):
+        raise ValueError("rules must be an object")
+    unknown = set(raw) - {
+        "weekly", "breaks", "overrides", "buffer_before_minutes", "buffer_after_minutes",
+        "min_notice_minutes", "max_bookings_per_day",
+    }
+    if unknown:
+        raise ValueError(f"unknown rule fields {sorted(unknown)}")
+
+    weekly_raw = raw.get("weekly") or {}
+    bad_days = set(weekly_raw) - set(WEEKDAYS)
+    if bad_days:
+        raise ValueError(f"unknown weekdays {sorted(bad_days)}")
+    breaks = _intervals(raw.get("breaks"), "breaks")
+    weekly = tuple(
+        _subtract(_intervals(weekly_raw.get(name), f"weekly.{name}"), breaks) for name in WEEKDAYS
+    )
+    overrides = {}
+    for day, pairs in (raw.get("overrides") or {}).items():
+        overrides[date.fromisoformat(day)] = _subtract(_intervals(pairs, f"overrides.{day}"), breaks)
+
+    def minutes(name: str) -> int:
+        value = int(raw.get(name) or 0)
+        if not 0 <= value <= 7 * 24 * 60:
+            raise ValueError(f"{name} out of range")
+        return value
+
+    max_per_day = raw.get("max_bookings_per_day")
+    if max_per_day is not None:
+        max_per_day = int(max_per_day)
+        if max_per_day < 0:
+            raise ValueError("max_bookings_per_day must not be negative")
+
+    return CompiledRules(
+        tz,
+        weekly,
+        overrides,
+        slot_duration_minutes,
+        buffer_before_minutes=minutes("buffer_before_minutes"),
+        buffer_after_minutes=minutes("buffer_after_minutes"),
+        min_notice_minutes=minutes("min_notice_minutes"),
+        max_bookings_per_day=max_per_day,
+    )
+
+
+@lru_cache(maxsize=4096)
+def _compile(
+    rules_json: str | None,
+    timezone_name: str,
+    business_hours_start: str,
+    business_hours_end: str,
+    slot_duration_minutes: int,
+) -> CompiledRules:
+    raw = json.loads(rules_json) if rules_json else None
+    return parse(raw, timezone_name, business_hours_start, business_hours_end, slot_duration_minutes)
+
+
+def compiled(owner) -> CompiledRules:
+    """The compiled rules for an :class:`~app.services.owner_cache.OwnerConnection`.
+
+    Keyed on the settings themselves, so owners sharing settings share one
+    compiled object and a settings change compiles afresh.  Stored settings
+    that do not compile (written before they were validated, or by hand)
+    leave the owner with no availability rather than failing every request.
+    """
+    try:
+        return _compile(
+            owner.availability_rules,
+            owner.timezone,
+            owner.business_hours_start,
+            owner.business_hours_end,
+            owner.slot_duration_minutes,
+        )
+    except (TypeError, ValueError):
+        return _closed(owner.slot_duration_minutes)
+
+
+@lru_cache(maxsize=16)
+def _closed(slot_duration_minutes: int) -> CompiledRules:
+    return CompiledRules(ZoneInfo("UTC"), ((),) * 7, {}, slot_duration_minutes)
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import json
+from functools import lru_cache
+
+# Media type of the compact availability format.  Clients opt in with
+# ``Accept: application/vnd.calendar.slots+json`` or ``format=compact``.
+COMPACT_MEDIA_TYPE = "application/vnd.calendar.slots+json"
+JSON_MEDIA_TYPE = "application/json"
+
+
+@lru_cache(maxsize=1)
+def _orjson():
+    """orjson if installed, imported on first use rather than at startup."""
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return orjson
+
+
+def dumps(payload) -> bytes:
+    """Serialise *payload* to compact JSON bytes, with orjson when available."""
+    fast = _orjson()
+    if fast is not None:
+        return fast.dumps(payload)
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+def wants_compact(accept: str | None, fmt: str | None) -> bool:
+    if fmt is not None:
+        return fmt == "compact"
+    return bool(accept) and COMPACT_MEDIA_TYPE in accept
+
+
+def _encode_window(slots: list[dict], window_start: int, window_end: int, step: int) -> dict:
+    n = max((window_end - window_start) // step, 0)
+    if not n:
+        return {"start": window_start, "n": 0, "free": ""}
+    bits = bytearray(b"0" * n)
+    for slot in slots:
+        bits[(slot["start_time"] - window_start) // step] = 49  # ord("1")
+    return {"start": window_start, "n": n, "free": format(int(bits, 2), f"0{-(-n // 4)}x")}
+
+
+def encode_day(slots: list[dict], windows, step: int) -> dict:
+    """Encode one day's free slots as a bitmap per bookable window.
+
+    Slot *k* of a window's grid starts at ``start + k * step``; bit *k* of
+    its ``free`` (hex, most significant bit first) is set when that slot is
+    free.  *windows* are the day's ``(start, end)`` pairs in order and every
+    slot must fall inside one of them.
+    """
+    encoded = []
+    i = 0
+    for window_start, window_end in windows:
+        j = i
+        while j < len(slots) and slots[j]["start_time"] < window_end:
+            j += 1
+        encoded.append(_encode_window(slots[i:j], window_start, window_end, step))
+        i = j
+    return {"windows": encoded}
+
+
+def decode_day(day: dict, step: int) -> list[dict]:
+    """Inverse of :func:`encode_day`."""
+    slots = []
+    for window in day["windows"]:
+        n = window["n"]
+        bits = int(window["free"], 16) if window["free"] else 0
+        slots.extend(
+            {"start_time": window["start"] + k * step, "end_time": window["start"] + (k + 1) * step}
+            for k in range(n)
+            if bits >> (n - 1 - k) & 1
+        )
+    return slots
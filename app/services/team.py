@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import asyncio
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from app.config import settings
+from app.database import acquire
+from app.services import ledger
+from app.services.calendar import compute_window_slots
+from app.services.freebusy_cache import freebusy_cache
+from app.services.nylas_client import get_free_busy_multi
+from app.services.owner_cache import OwnerConnection, owner_cache
+from app.services.ttl_cache import TTLCache
+
+if TYPE_CHECKING:
+    from app.services.rules import CompiledRules
+
+MODES = ("any", "all")
+
+
+@dataclass(frozen=True)
+class Team:
+    """A pooled booking page over several connected calendars.
+
+    ``mode`` is ``"any"`` (a slot is open if any host is free; round robin)
+    or ``"all"`` (every host must be free; collective meeting).
+    """
+
+    id: str
+    slug: str
+    name: str
+    mode: str
+    business_hours_start: str
+    business_hours_end: str
+    slot_duration_minutes: int
+    members: tuple[OwnerConnection, ...]
+
+
+_teams = TTLCache(max_entries=1024)
+
+
+async def load_team(slug: str) -> Team | None:
+    cached = _teams.get(slug)
+    if cached is not None and cached[1] < settings.owner_cache_ttl_seconds:
+        return cached[0]
+
+    async with acquire() as conn:
+        row = await conn.fetchrow(
+            """
+            SELECT t.id, t.slug, t.name, t.mode, t.business_hours_start,
+                   t.business_hours_end, t.slot_duration_minutes,
+                   array_remove(array_agg(cc.slug ORDER BY cc.slug), NULL) AS member_slugs
+            FROM teams t
+            LEFT JOIN team_members tm ON tm.team_id = t.id
+            LEFT JOIN calendar_connections cc ON cc.id = tm.connection_id AND cc.is_valid = true
+            WHERE t.slug = $1
+            GROUP BY t.id
+            """,
+            slug,
+        )
+    if not row:
+        return None
+
+    owners = await asyncio.gather(*(owner_cache.get(s) for s in row["member_slugs"]))
+    team = Team(
+        id=str(row["id"]),
+        slug=row["slug"],
+        name=row["name"] or "",
+        mode=row["mode"],
+        business_hours_start=row["business_hours_start"] or settings.business_hours_start,
+        business_hours_end=row["business_hours_end"] or settings.business_hours_end,
+        slot_duration_minutes=row["slot_duration_minutes"] or settings.slot_duration_minutes,
+        members=tuple(o for o in owners if o is not None),
+    )
+    _teams.set(slug, team)
+    return team
+
+
+def invalidate_team(slug: str) -> None:
+    _teams.delete(slug)
+
+
+async def member_busy(
+    members: tuple[OwnerConnection, ...] | list[OwnerConnection],
+    start_time: int,
+    end_time: int,
+    cached: bool = True,
+) -> dict[str, list[dict]]:
+    """Busy blocks per member connection ID, from Nylas plus the ledger.
+
+    Calls are grouped by grant, so members reachable through one grant
+    share a single free/busy request.  Grants are queried concurrently,
+    at most ``team_fanout_concurrency`` at a time, alongside one ledger
+    query for every member.
+    """
+    by_grant: dict[str, list[OwnerConnection]] = defaultdict(list)
+    for member in members:
+        by_grant[member.grant_id].append(member)
+
+    semaphore = asyncio.Semaphore(max(settings.team_fanout_concurrency, 1))
+
+    async def fetch(grant_id: str, group: list[OwnerConnection]) -> dict[str, list[dict]]:
+        async with semaphore:
+            if len(group) == 1 and cached:
+                m = group[0]
+                return {m.id: await freebusy_cache.get(grant_id, start_time, end_time, m.email, m)}
+            by_email = await get_free_busy_multi(
+                grant_id, start_time, end_time, [m.email for m in group],
+            )
+            return {m.id: by_email.get(m.email, []) for m in group}
+
+    results = await asyncio.gather(
+        ledger.busy_blocks_many([m.id for m in members], start_time, end_time),
+        *(fetch(grant_id, group) for grant_id, group in by_grant.items()),
+    )
+    busy: dict[str, list[dict]] = defaultdict(list)
+    for result in results:
+        for cid, blocks in result.items():
+            busy[cid].extend(blocks)
+    return busy
+
+
+def team_slots(
+    mode: str,
+    busy: dict[str, list[dict]],
+    member_ids: list[str],
+    day_start: int,
+    day_end: int,
+    slot_duration_minutes: int,
+    member_rules: dict[str, CompiledRules] | None = None,
+) -> list[dict]:
+    """Merge member calendars into bookable slots.
+
+    In ``"all"`` mode the busy sets are unioned and swept once.  In
+    ``"any"`` mode each member is swept separately and the free slots are
+    unioned; each slot carries ``hosts_available``.  With *member_rules*,
+    a member only counts for slots their own rules allow, as at booking.
+    """
+    if not member_ids:
+        return []
+    member_rules = member_rules or {}
+
+    def allowed(cid: str, slot: dict) -> bool:
+        compiled = member_rules.get(cid)
+        return compiled is None or compiled.allows(slot["start_time"], slot["end_time"])
+
+    if mode == "all":
+        union = [b for cid in member_ids for b in busy.get(cid, [])]
+        return [
+            slot
+            for slot in compute_window_slots(union, day_start, day_end, slot_duration_minutes)
+            if all(allowed(cid, slot) for cid in member_ids)
+        ]
+
+    step = slot_duration_minutes * 60
+    free_count: dict[int, int] = defaultdict(int)
+    for cid in member_ids:
+        member_slots = compute_window_slots(busy.get(cid, []), day_start, day_end, slot_duration_minutes)
+        for slot in member_slots:
+            if allowed(cid, slot):
+                free_count[slot["start_time"]] += 1
+    return [
+        {"start_time": start, "end_time": start + step, "hosts_available": n}
+        for start, n in sorted(free_count.items())
+    ]
+
+
+def _overlaps(blocks: list[dict], start_time: int, end_time: int) -> bool:
+    return any(b["start_time"] < end_time and b["end_time"] > start_time for b in blocks)
+
+
+async def rank_hosts(team: Team, start_time: int, end_time: int, day_start: int, day_end: int):
+    """Members free for the slot, least booked that day first.
+
+    Uses live free/busy (not the cache) since a booking follows.  In
+    ``"all"`` mode returns an empty list unless every member is free.
+    """
+    members = list(team.members)
+    busy, counts = await asyncio.gather(
+        member_busy(members, start_time, end_time, cached=False),
+        ledger.booking_counts([m.id for m in members], day_start, day_end),
+    )
+    free = [m for m in members if not _overlaps(busy.get(m.id, []), start_time, end_time)]
+    if team.mode == "all" and len(free) != len(members):
+        return []
+    return sorted(free, key=lambda m: (counts.get(m.id, 0), m.slug))
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class TTLCache:
+    """Bounded LRU mapping whose entries remember when they were stored.
+
+    Expiry policy is left to callers: :meth:`get` returns the value together
+    with its age so they can decide between fresh, stale and expired.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._data: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> tuple[Any, float] | None:
+        """Return ``(value, age_seconds)`` for *key*, or ``None`` if absent."""
+        item = self._data.get(key)
+        if item is None:
+            return None
+        self._data.move_to_end(key)
+        value, stored_at = item
+        return value, time.monotonic() - stored_at
+
+    def set(self, key: Hashable, value: Any, age: float = 0.0) -> None:
+        """Store *value*, optionally as if it had been stored *age* seconds ago."""
+        self._data[key] = (value, time.monotonic() - age)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: Hashable) -> bool:
+        return self._data.pop(key, None) is not None
+
+    def delete_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """Drop every entry for which ``predicate(key, value)`` is true."""
+        doomed = [k for k, (v, _) in self._data.items() if predicate(k, v)]
+        for key in doomed:
+            del self._data[key]
+        return len(doomed)
+
+    def keys(self) -> list[Hashable]:
+        return list(self._data)
+
+    def values(self) -> list[Any]:
+        return [value for value, _ in self._data.values()]
+
+    def clear(self) -> None:
+        self._data.clear()
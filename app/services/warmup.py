@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from datetime import date, timedelta
+from time import monotonic
+
+from app import queries
+from app.config import settings
+from app.database import acquire
+from app.metrics import phase
+from app.services import ledger, rules
+from app.services.busy_mirror import grant_key
+from app.services.nylas_client import get_free_busy
+from app.services.owner_cache import owner_cache
+from app.services.resilience import CircuitOpen, clear_deadline
+from app.services.ttl_cache import TTLCache
+
+# Connections touched by this instance recently, so activity is written at
+# most once per ``_TOUCH_INTERVAL`` per owner.
+_touched = TTLCache(max_entries=10_000)
+_TOUCH_INTERVAL = 600.0
+_touch_tasks: set[asyncio.Task] = set()
+
+stats: dict[str, int] = {"runs": 0, "owners_warmed": 0, "nylas_calls": 0, "errors": 0}
+
+_ACTIVE_OWNERS_SQL = """
+    SELECT slug
+    FROM calendar_connections
+    WHERE is_valid = true AND last_active_at > now() - $1::interval
+    ORDER BY last_active_at DESC
+    LIMIT $2
+"""
+
+_UPSERT_SQL = """
+    INSERT INTO availability_snapshots (connection_id, grant_key, day, version, slots, computed_at)
+    SELECT $1::uuid, $5, t.day, $2, t.slots::jsonb, now()
+    FROM unnest($3::date[], $4::text[]) AS t(day, slots)
+    ON CONFLICT (connection_id, day) DO UPDATE
+       SET grant_key = EXCLUDED.grant_key, version = EXCLUDED.version,
+           slots = EXCLUDED.slots, computed_at = EXCLUDED.computed_at
+"""
+
+_CURRENT_SNAPSHOTS = """
+    SELECT s.day, s.slots
+    FROM availability_snapshots s
+    JOIN calendar_connections cc
+      ON cc.id = s.connection_id AND cc.availability_version = s.version
+    WHERE s.connection_id = $1::uuid
+      AND s.day BETWEEN $2 AND $3
+      AND s.computed_at > now() - $4::interval
+"""
+
+# One day's snapshot (if current) and the ledger's bookings over the day's
+# bounds, in one round trip; booking rows have a NULL ``slots``.
+_DAY_SQL = f"""
+    SELECT s.slots, NULL::bigint AS start_time, NULL::bigint AS end_time
+    FROM availability_snapshots s
+    JOIN calendar_connections cc
+      ON cc.id = s.connection_id AND cc.availability_version = s.version
+    WHERE s.connection_id = $1::uuid
+      AND s.day = $4
+      AND s.computed_at > now() - $5::interval
+    UNION ALL
+    SELECT NULL, b.start_time, b.end_time FROM ({ledger.BOOKED_BLOCKS_SQL}) b
+"""
+
+
+def touch(connection_id: str) -> None:
+    """Record that a booking page is in use, in the background."""
+    seen = _touched.get(connection_id)
+    if seen is not None and seen[1] < _TOUCH_INTERVAL:
+        return
+    _touched.set(connection_id, True)
+    task = asyncio.create_task(_touch(connection_id))
+    _touch_tasks.add(task)
+    task.add_done_callback(_touch_tasks.discard)
+
+
+async def _touch(connection_id: str) -> None:
+    try:
+        async with acquire() as conn:
+            await queries.touch_connection(conn, connection_id)
+    except Exception:
+        _touched.delete(connection_id)
+
+
+async def snapshot_slots(connection_id: str, start_day: date, end_day: date) -> dict[date, list[dict]]:
+    """Warmed slots per day for the owner, if fresh and still current.
+
+    A snapshot only counts while its version equals the owner's
+    ``availability_version`` in the database, so any booking or settings
+    change made since warm-up, on any instance, hides it.
+    """
+    if settings.warmup_snapshot_max_age_seconds <= 0:
+        return {}
+    with phase("snapshot"):
+        async with acquire() as conn:
+            rows = await conn.fetch(
+                _CURRENT_SNAPSHOTS,
+                connection_id,
+                start_day,
+                end_day,
+                timedelta(seconds=settings.warmup_snapshot_max_age_seconds),
+            )
+    return {r["day"]: json.loads(r["slots"]) for r in rows}
+
+
+async def day_snapshot(
+    connection_id: str, day: date, start_time: int, end_time: int
+) -> tuple[list[dict] | None, list[dict]]:
+    """*day*'s warmed slots (``None`` without a current snapshot) and the
+    owner's active bookings over ``[start_time, end_time)``.
+
+    Both come from one query on one connection, so a single-day request
+    for an owner that was never warmed costs no extra round trip.
+    """
+    if settings.warmup_snapshot_max_age_seconds <= 0:
+        return None, await ledger.busy_blocks(connection_id, start_time, end_time)
+    with phase("snapshot"):
+        async with acquire() as conn:
+            rows = await conn.fetch(
+                _DAY_SQL,
+                connection_id,
+                start_time,
+                end_time,
+                day,
+                timedelta(seconds=settings.warmup_snapshot_max_age_seconds),
+            )
+    snapshot = None
+    booked = []
+    for r in rows:
+        if r["slots"] is not None:
+            snapshot = json.loads(r["slots"])
+        else:
+            booked.append({"start_time": r["start_time"], "end_time": r["end_time"], "status": "busy"})
+    return snapshot, booked
+
+
+async def invalidate_grant(grant_id: str) -> None:
+    """Drop the snapshots of every owner on *grant_id*, whose calendar changed.
+
+    Bookings and settings changes bump ``availability_version`` instead;
+    outside events only reach us through webhooks and mirror syncs.
+    """
+    async with acquire() as conn:
+        await conn.execute(
+            "DELETE FROM availability_snapshots WHERE grant_key = $1", grant_key(grant_id),
+        )
+
+
+async def warm_owner(slug: str, days: int) -> int:
+    """Compute and store the next *days* days of slots for *slug*, counted
+    from today in the owner's timezone.
+
+    The owner is reloaded so the snapshot is tagged with the version its
+    settings were read at.  Free/busy is fetched in windows of
+    ``warmup_chunk_days`` days.  Returns the number of Nylas calls made.
+    """
+    owner_cache.invalidate(slug)
+    owner = await owner_cache.get(slug)
+    if owner is None:
+        return 0
+
+    compiled = rules.compiled(owner)
+    today = compiled.today()
+    day_list = [today + timedelta(days=i) for i in range(days)]
+    bounds = [compiled.day_bounds(d) for d in day_list]
+
+    chunk = max(settings.warmup_chunk_days, 1)
+    calls = [
+        get_free_busy(owner.grant_id, bounds[i][0], bounds[min(i + chunk, days) - 1][1], owner.email)
+        for i in range(0, days, chunk)
+    ]
+    booked, *results = await asyncio.gather(
+        ledger.busy_blocks(owner.id, bounds[0][0], bounds[-1][1]), *calls,
+    )
+    busy = [block for result in results for block in result]
+    per_day = compiled.slots(day_list, busy, booked)
+
+    async with acquire() as conn:
+        await conn.execute(
+            _UPSERT_SQL,
+            owner.id,
+            owner.availability_version,
+            day_list,
+            [json.dumps(slots) for slots in per_day],
+            grant_key(owner.grant_id),
+        )
+    return len(calls)
+
+
+async def run(
+    max_seconds: float | None = None,
+    max_owners: int | None = None,
+    days: int | None = None,
+) -> dict:
+    """Warm recently active owners, most recent first.
+
+    At most ``warmup_concurrency`` owners are in flight at once, and no new
+    owner is started once *max_seconds* have passed or
+    ``warmup_max_nylas_calls`` calls have been spent.  Stops early if the
+    Nylas circuit breaker opens.
+    """
+    clear_deadline()
+    started = monotonic()
+    days = days or settings.warmup_days
+    max_owners = max_owners or settings.warmup_max_owners
+    per_owner_calls = -(-days // max(settings.warmup_chunk_days, 1))
+
+    async with acquire() as conn:
+        owners = await conn.fetch(
+            _ACTIVE_OWNERS_SQL,
+            timedelta(hours=settings.warmup_active_hours),
+            max_owners,
+        )
+
+    semaphore = asyncio.Semaphore(max(settings.warmup_concurrency, 1))
+    result = {"owners": 0, "nylas_calls": 0, "errors": 0, "skipped": 0}
+    stop = False
+
+    async def warm(row) -> None:
+        nonlocal stop
+        async with semaphore:
+            out_of_time = max_seconds is not None and monotonic() - started >= max_seconds
+            out_of_calls = result["nylas_calls"] + per_owner_calls > settings.warmup_max_nylas_calls
+            if stop or out_of_time or out_of_calls:
+                result["skipped"] += 1
+                return
+            # Reserve the calls before the await so concurrent owners see them.
+            result["nylas_calls"] += per_owner_calls
+            try:
+                await warm_owner(row["slug"], days)
+            except CircuitOpen:
+                stop = True
+                result["errors"] += 1
+                return
+            except Exception:
+                result["errors"] += 1
+                return
+            result["owners"] += 1
+
+    await asyncio.gather(*(warm(row) for row in owners))
+
+    stats["runs"] += 1
+    stats["owners_warmed"] += result["owners"]
+    stats["nylas_calls"] += result["nylas_calls"]
+    stats["errors"] += result["errors"]
+    result["seconds"] = round(monotonic() - started, 3)
+    return result
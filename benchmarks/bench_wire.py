@@ -0,0 +1,90 @@
+"""Compare availability payload formats: size on the wire and encoding time.
+
+Run from the project root::
+
+    python -m benchmarks.bench_wire
+
+For each scenario the range response is built as the slot list the API
+used to send and as the compact bitmap format, then encoded with the
+standard library and (when installed) orjson.  Sizes are shown raw and
+gzipped, since the CDN compresses JSON responses.
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import random
+import timeit
+from datetime import date, time, timedelta
+
+from app.services import slot_codec
+from app.services.calendar import business_windows, compute_available_slots_bulk
+
+
+def _random_busy(rng: random.Random, windows: list[tuple[int, int]], per_day: int) -> list[dict]:
+    blocks = []
+    for w_start, w_end in windows:
+        for _ in range(per_day):
+            start = rng.randrange(w_start, w_end, 300)
+            blocks.append({"start_time": start, "end_time": start + rng.choice((900, 1800, 3600))})
+    return blocks
+
+
+def _best(fn, number: int, repeat: int = 5) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+
+def _stdlib(payload: dict) -> bytes:
+    # What JSONResponse did for the list format.
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+def bench(days: int, events_per_day: int, slot_minutes: int) -> None:
+    rng = random.Random(days * 100 + slot_minutes)
+    start = date(2025, 3, 1)
+    dates = [start + timedelta(days=i) for i in range(days)]
+    windows = business_windows(dates, time(8, 0), time(20, 0))
+    per_day = compute_available_slots_bulk(_random_busy(rng, windows, events_per_day), windows, slot_minutes)
+    step = slot_minutes * 60
+
+    header = {"start": dates[0].isoformat(), "end": dates[-1].isoformat(), "slot_duration_minutes": slot_minutes}
+
+    def as_list() -> dict:
+        return {**header, "days": [
+            {"date": d.isoformat(), "slots": slots, "fully_booked": not slots}
+            for d, slots in zip(dates, per_day)
+        ]}
+
+    def as_compact() -> dict:
+        return {**header, "days": [
+            {"date": d.isoformat(), **slot_codec.encode_day(slots, [window], step)}
+            for d, slots, window in zip(dates, per_day, windows)
+        ]}
+
+    for day, slots in zip(as_compact()["days"], per_day):
+        assert slot_codec.decode_day(day, step) == slots
+
+    print(f"{days} days, {events_per_day} events/day, {slot_minutes}-min grid")
+    candidates = [("list   + json", as_list, _stdlib), ("compact + json", as_compact, _stdlib)]
+    if slot_codec._orjson() is not None:
+        candidates += [
+            ("list   + orjson", as_list, slot_codec.dumps),
+            ("compact + orjson", as_compact, slot_codec.dumps),
+        ]
+    for label, build, encode in candidates:
+        body = encode(build())
+        seconds = _best(lambda: encode(build()), number=20)
+        print(
+            f"  {label:<17} {len(body):>8,} B  gzip {len(gzip.compress(body)):>7,} B  "
+            f"build+encode {seconds * 1e3:7.3f} ms"
+        )
+
+
+def main() -> None:
+    bench(days=1, events_per_day=4, slot_minutes=30)
+    bench(days=31, events_per_day=6, slot_minutes=30)
+    bench(days=62, events_per_day=10, slot_minutes=5)
+
+
+if __name__ == "__main__":
+    main()
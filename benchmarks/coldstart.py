@@ -0,0 +1,119 @@
+"""Cold-start report: import time of the app and latency of its first request.
+
+    python -m benchmarks.coldstart                  # human-readable
+    python -m benchmarks.coldstart --json           # for tracking over time
+    python -m benchmarks.coldstart --path "/api/availability?slug=abc&date=2025-03-10"
+
+Every measurement runs in a fresh interpreter so nothing is already
+imported or cached.  The app's settings must be available (``.env`` or
+environment), as on a real cold start.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+_FIRST_REQUEST = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import api.index
+t1 = time.perf_counter()
+import asyncio, httpx
+
+async def main():
+    transport = httpx.ASGITransport(app=api.index.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://coldstart") as client:
+        t2 = time.perf_counter()
+        first = await client.get(sys.argv[1])
+        t3 = time.perf_counter()
+        await client.get(sys.argv[1])
+        t4 = time.perf_counter()
+    print(json.dumps({
+        "import_ms": (t1 - t0) * 1000,
+        "first_request_ms": (t3 - t2) * 1000,
+        "warm_request_ms": (t4 - t3) * 1000,
+        "status": first.status_code,
+    }))
+
+asyncio.run(main())
+"""
+
+
+def import_profile() -> list[tuple[str, int, float, float]]:
+    """``(module, depth, self_ms, cumulative_ms)`` from ``-X importtime``."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import api.index"],
+        capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        head, cumulative_us, name = line.split("|")
+        self_us = head.split(":", 1)[1]
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), depth, int(self_us) / 1000, int(cumulative_us) / 1000))
+    return rows
+
+
+def first_request(path: str, runs: int) -> list[dict]:
+    results = []
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-c", _FIRST_REQUEST, path],
+            capture_output=True, text=True, check=True,
+        )
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Report cold-start costs")
+    parser.add_argument("--path", default="/api/health", help="first request to time")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    profile = import_profile()
+    # Children are listed before their parent; keep the direct children of
+    # api.index rather than modules the interpreter imported at startup.
+    end = next(i for i, row in enumerate(profile) if row[0] == "api.index")
+    start = max((i for i, row in enumerate(profile[:end]) if row[1] == 0), default=-1) + 1
+    total = profile[end][3]
+    top_level = sorted(
+        (row for row in profile[start:end] if row[1] == 1),
+        key=lambda row: row[3],
+        reverse=True,
+    )[:args.top]
+    requests = first_request(args.path, args.runs)
+    summary = {
+        key: statistics.median(r[key] for r in requests)
+        for key in ("import_ms", "first_request_ms", "warm_request_ms")
+    }
+
+    if args.json:
+        print(json.dumps({
+            "import_api_index_ms": total,
+            "top_imports_ms": {name: cum for name, _, _, cum in top_level},
+            "path": args.path,
+            "status": requests[-1]["status"],
+            **summary,
+        }, indent=2))
+        return
+
+    print(f"import api.index: {total:.1f} ms (-X importtime, cumulative)\n")
+    print(f"{'module':<40}{'cumulative':>12}")
+    for name, _, _, cum in top_level:
+        print(f"{name:<40}{cum:>10.1f}ms")
+    print(f"\nmedian of {args.runs} fresh processes, GET {args.path} -> {requests[-1]['status']}")
+    print(f"  import          {summary['import_ms']:8.1f} ms")
+    print(f"  first request   {summary['first_request_ms']:8.1f} ms")
+    print(f"  second request  {summary['warm_request_ms']:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
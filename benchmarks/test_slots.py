@@ -0,0 +1,111 @@
+"""Compare the slot engine against the original datetime-based scan.
+
+Run from the project root with pytest-benchmark (``requirements-dev.txt``)::
+
+    python -m pytest benchmarks/test_slots.py
+
+Results are grouped per scenario.  Every benchmark also asserts that its
+implementation returns exactly the slots of the original scan.
+"""
+from __future__ import annotations
+
+import random
+from datetime import date, datetime, time, timedelta, timezone
+
+import pytest
+
+from app.services import calendar
+from app.services.calendar import compute_available_slots, compute_available_slots_bulk
+
+
+def reference_compute_available_slots(
+    busy_blocks: list[dict],
+    target_date: date,
+    business_start: time,
+    business_end: time,
+    slot_duration_minutes: int,
+) -> list[dict]:
+    """The original O(slots x busy) implementation, kept for comparison."""
+    day_start = datetime.combine(target_date, business_start, tzinfo=timezone.utc)
+    day_end = datetime.combine(target_date, business_end, tzinfo=timezone.utc)
+    slot_delta = timedelta(minutes=slot_duration_minutes)
+
+    busy_intervals: list[tuple[datetime, datetime]] = []
+    for block in busy_blocks:
+        b_start = datetime.fromtimestamp(block["start_time"], tz=timezone.utc)
+        b_end = datetime.fromtimestamp(block["end_time"], tz=timezone.utc)
+        busy_intervals.append((b_start, b_end))
+
+    busy_intervals.sort(key=lambda iv: iv[0])
+
+    slots: list[dict] = []
+    cursor = day_start
+    while cursor + slot_delta <= day_end:
+        slot_end = cursor + slot_delta
+        conflict = any(b_start < slot_end and b_end > cursor for b_start, b_end in busy_intervals)
+        if not conflict:
+            slots.append({
+                "start_time": int(cursor.timestamp()),
+                "end_time": int(slot_end.timestamp()),
+            })
+        cursor += slot_delta
+
+    return slots
+
+
+def _random_busy(rng: random.Random, day: date, events: int) -> list[dict]:
+    base = int(datetime.combine(day, time(0, 0), tzinfo=timezone.utc).timestamp())
+    blocks = []
+    for _ in range(events):
+        start = base + rng.randrange(0, 86400 - 600, 60)
+        blocks.append({"start_time": start, "end_time": start + rng.choice((300, 900, 1800, 3600))})
+    return blocks
+
+
+@pytest.mark.parametrize("impl", ["reference", "engine"])
+@pytest.mark.parametrize("slot_minutes", [5, 30])
+@pytest.mark.parametrize("events", [10, 100, 300, 600])
+def test_single_day(benchmark, impl: str, events: int, slot_minutes: int) -> None:
+    rng = random.Random(events * 1000 + slot_minutes)
+    day = date(2025, 3, 10)
+    args = (_random_busy(rng, day, events), day, time(0, 0), time(23, 59), slot_minutes)
+    fn = reference_compute_available_slots if impl == "reference" else compute_available_slots
+
+    benchmark.group = f"1 day, {events} events, {slot_minutes}-min grid"
+    assert benchmark(fn, *args) == reference_compute_available_slots(*args)
+
+
+@pytest.mark.parametrize("impl", ["per_day", "bulk", "bulk_numpy"])
+@pytest.mark.parametrize(
+    "days, events_per_day, slot_minutes", [(31, 200, 5), (62, 50, 15)],
+)
+def test_range(benchmark, impl: str, days: int, events_per_day: int, slot_minutes: int) -> None:
+    if impl == "bulk_numpy" and calendar._numpy() is None:
+        pytest.skip("NumPy is not installed")
+    rng = random.Random(days)
+    dates = [date(2025, 3, 1) + timedelta(days=i) for i in range(days)]
+    busy = [b for d in dates for b in _random_busy(rng, d, events_per_day)]
+    windows = [
+        (
+            int(datetime.combine(d, time(8, 0), tzinfo=timezone.utc).timestamp()),
+            int(datetime.combine(d, time(20, 0), tzinfo=timezone.utc).timestamp()),
+        )
+        for d in dates
+    ]
+
+    def per_day():
+        return [
+            compute_available_slots(busy, d, time(8, 0), time(20, 0), slot_minutes)
+            for d in dates
+        ]
+
+    fns = {
+        "per_day": per_day,
+        "bulk": lambda: compute_available_slots_bulk(busy, windows, slot_minutes, use_numpy=False),
+        "bulk_numpy": lambda: compute_available_slots_bulk(busy, windows, slot_minutes, use_numpy=True),
+    }
+    benchmark.group = f"{days} days, {events_per_day} events/day, {slot_minutes}-min grid"
+    assert benchmark(fns[impl]) == [
+        reference_compute_available_slots(busy, d, time(8, 0), time(20, 0), slot_minutes)
+        for d in dates
+    ]
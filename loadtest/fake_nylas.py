@@ -0,0 +1,143 @@
+"""Stand-in for the parts of the Nylas v3 API this app calls.
+
+Run it and point ``NYLAS_API_URI`` at it::
+
+    python -m loadtest.fake_nylas --port 9000 --latency-ms 80 --failure-rate 0.01
+
+Events created through ``/events`` are remembered per grant and reported
+back as busy time by ``/calendars/free-busy``, so bookings made during a
+load test affect later availability just like the real service.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import uuid
+from collections import defaultdict
+
+from fastapi import FastAPI, HTTPException, Request
+
+latency_ms = float(os.environ.get("FAKE_NYLAS_LATENCY_MS", "50"))
+jitter_ms = float(os.environ.get("FAKE_NYLAS_JITTER_MS", "20"))
+failure_rate = float(os.environ.get("FAKE_NYLAS_FAILURE_RATE", "0"))
+
+app = FastAPI(title="Fake Nylas")
+
+_events: dict[str, list[dict]] = defaultdict(list)
+_calls: dict[str, int] = defaultdict(int)
+
+
+async def _simulate(endpoint: str) -> None:
+    _calls[endpoint] += 1
+    delay = max(latency_ms + random.uniform(-jitter_ms, jitter_ms), 0) / 1000
+    await asyncio.sleep(delay)
+    if failure_rate and random.random() < failure_rate:
+        raise HTTPException(status_code=503, detail="Injected failure")
+
+
+@app.post("/v3/connect/token")
+async def connect_token(request: Request):
+    body = await request.json()
+    await _simulate("token")
+    code = body.get("code", "")
+    return {
+        "grant_id": f"grant-{code or uuid.uuid4().hex[:8]}",
+        "email": f"{code or 'owner'}@example.com",
+    }
+
+
+@app.post("/v3/grants/{grant_id}/calendars/free-busy")
+async def free_busy(grant_id: str, request: Request):
+    body = await request.json()
+    await _simulate("free_busy")
+    start, end = body["start_time"], body["end_time"]
+    time_slots = [
+        {"start_time": e["start_time"], "end_time": e["end_time"], "status": "busy"}
+        for e in _events[grant_id]
+        if e["start_time"] < end and e["end_time"] > start
+    ]
+    return {
+        "data": [
+            {"email": email, "time_slots": time_slots, "object": "free_busy"}
+            for email in body.get("emails", [])
+        ]
+    }
+
+
+@app.post("/v3/grants/{grant_id}/events")
+async def create_event(grant_id: str, request: Request):
+    body = await request.json()
+    await _simulate("events")
+    event = {
+        "id": uuid.uuid4().hex,
+        "title": body.get("title", ""),
+        "start_time": body["when"]["start_time"],
+        "end_time": body["when"]["end_time"],
+    }
+    _events[grant_id].append(event)
+    return {"data": event}
+
+
+@app.get("/v3/grants/{grant_id}/events")
+async def list_events(grant_id: str, start: int = 0, end: int = 2**31):
+    await _simulate("list_events")
+    return {
+        "data": [
+            {
+                "id": e["id"],
+                "grant_id": grant_id,
+                "busy": True,
+                "status": "confirmed",
+                "when": {"start_time": e["start_time"], "end_time": e["end_time"]},
+            }
+            for e in _events[grant_id]
+            if e["start_time"] < end and e["end_time"] > start
+        ]
+    }
+
+
+@app.get("/_stats")
+async def stats():
+    """Call counts plus the number of overlapping events per grant."""
+    overlaps = 0
+    for events in _events.values():
+        ordered = sorted(events, key=lambda e: e["start_time"])
+        for prev, cur in zip(ordered, ordered[1:]):
+            if cur["start_time"] < prev["end_time"]:
+                overlaps += 1
+    return {
+        "calls": dict(_calls),
+        "events": sum(len(v) for v in _events.values()),
+        "overlapping_events": overlaps,
+    }
+
+
+@app.post("/_reset")
+async def reset():
+    _events.clear()
+    _calls.clear()
+    return {"status": "reset"}
+
+
+def main() -> None:
+    global latency_ms, jitter_ms, failure_rate
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-ms", type=float, default=latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=jitter_ms)
+    parser.add_argument("--failure-rate", type=float, default=failure_rate)
+    args = parser.parse_args()
+
+    latency_ms, jitter_ms, failure_rate = args.latency_ms, args.jitter_ms, args.failure_rate
+
+    import uvicorn
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
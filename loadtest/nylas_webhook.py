@@ -0,0 +1,85 @@
+"""Build signed Nylas ``event.*`` notifications and post them to the app.
+
+    python -m loadtest.nylas_webhook created --grant grant-load-0000 \\
+        --start 2025-03-10T10:00 --minutes 30
+
+    python -m loadtest.nylas_webhook deleted --grant grant-load-0000 --event-id evt-1
+
+The payload is signed with ``NYLAS_WEBHOOK_SECRET`` exactly as Nylas does
+(hex HMAC-SHA256 of the raw body in ``X-Nylas-Signature``).  ``--print``
+shows the body and signature instead of sending them.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+
+import httpx
+
+
+def build_payload(kind: str, grant_id: str, event_id: str, start: int, end: int) -> dict:
+    event: dict = {"id": event_id, "grant_id": grant_id, "object": "event"}
+    if kind != "deleted":
+        event.update({
+            "busy": True,
+            "status": "confirmed",
+            "title": "Webhook test",
+            "when": {"start_time": start, "end_time": end, "object": "timespan"},
+        })
+    return {
+        "specversion": "1.0",
+        "type": f"event.{kind}",
+        "source": "/google/events/realtime",
+        "id": uuid.uuid4().hex,
+        "time": int(time.time()),
+        "data": {"application_id": "local", "object": event},
+    }
+
+
+def sign(body: bytes, secret: str) -> str:
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Send a signed Nylas event webhook")
+    parser.add_argument("kind", choices=("created", "updated", "deleted"))
+    parser.add_argument("--grant", required=True, help="plain Nylas grant ID")
+    parser.add_argument("--event-id", default=None)
+    parser.add_argument("--start", default=None, help="UTC ISO time, default now")
+    parser.add_argument("--minutes", type=int, default=30)
+    parser.add_argument("--url", default="http://127.0.0.1:8000/api/webhooks/nylas")
+    parser.add_argument("--secret", default=os.environ.get("NYLAS_WEBHOOK_SECRET", ""))
+    parser.add_argument("--print", action="store_true", dest="print_only")
+    args = parser.parse_args()
+
+    if args.start:
+        start = int(datetime.fromisoformat(args.start).replace(tzinfo=timezone.utc).timestamp())
+    else:
+        start = int(time.time())
+    payload = build_payload(
+        args.kind, args.grant, args.event_id or uuid.uuid4().hex, start, start + args.minutes * 60,
+    )
+    body = json.dumps(payload).encode()
+    signature = sign(body, args.secret)
+
+    if args.print_only:
+        print(body.decode())
+        print(f"X-Nylas-Signature: {signature}")
+        return
+
+    resp = httpx.post(
+        args.url,
+        content=body,
+        headers={"Content-Type": "application/json", "X-Nylas-Signature": signature},
+    )
+    print(resp.status_code, resp.text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Open-loop load generator for ``/api/availability`` and ``/api/book``.
+
+    python -m loadtest.run --base-url http://127.0.0.1:8000 --rps 50 --duration 60
+
+Requests are started on a fixed schedule regardless of how long earlier
+ones take, so a slow server shows up as latency rather than as a lower
+request rate.  Booking requests pick a slot from a recent availability
+response for the same owner, which makes concurrent bookings of the same
+slot likely; any slot confirmed more than once is reported as a double
+booking.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+
+import httpx
+
+from loadtest.seed import slug_for
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, Counter] = defaultdict(Counter)
+        self.confirmed: Counter = Counter()
+        self.elapsed = 0.0
+
+    def record(self, endpoint: str, started: float, status: int | str) -> None:
+        self.latencies[endpoint].append(time.perf_counter() - started)
+        self.statuses[endpoint][status] += 1
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[k]
+
+
+async def _availability(
+    client: httpx.AsyncClient, rec: Recorder, slots: dict[str, list[dict]], slug: str, day: str
+) -> None:
+    started = time.perf_counter()
+    try:
+        resp = await client.get("/api/availability", params={"slug": slug, "date": day})
+    except httpx.HTTPError as exc:
+        rec.record("availability", started, type(exc).__name__)
+        return
+    rec.record("availability", started, resp.status_code)
+    if resp.status_code == 200:
+        slots[slug] = resp.json().get("slots", [])
+
+
+async def _book(
+    client: httpx.AsyncClient, rec: Recorder, slots: dict[str, list[dict]], slug: str
+) -> None:
+    candidates = slots.get(slug)
+    if not candidates:
+        return
+    slot = random.choice(candidates[:4])
+    n = random.randrange(1_000_000)
+    started = time.perf_counter()
+    try:
+        resp = await client.post("/api/book", json={
+            "slug": slug,
+            "start_time": slot["start_time"],
+            "end_time": slot["end_time"],
+            "customer_name": f"Load {n}",
+            "customer_email": f"load{n}@example.com",
+        })
+    except httpx.HTTPError as exc:
+        rec.record("book", started, type(exc).__name__)
+        return
+    rec.record("book", started, resp.status_code)
+    if resp.status_code in (200, 202):
+        rec.confirmed[(slug, slot["start_time"])] += 1
+
+
+async def run(args: argparse.Namespace) -> Recorder:
+    rec = Recorder()
+    slots: dict[str, list[dict]] = {}
+    days = [(date.today() + timedelta(days=i)).isoformat() for i in range(args.days)]
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=30) as client:
+        tasks: set[asyncio.Task] = set()
+        interval = 1 / args.rps
+        total = int(args.rps * args.duration)
+        t0 = time.perf_counter()
+        for i in range(total):
+            delay = t0 + i * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            slug = slug_for(random.randrange(args.owners))
+            if random.random() < args.book_ratio and slots.get(slug):
+                coro = _book(client, rec, slots, slug)
+            else:
+                coro = _availability(client, rec, slots, slug, random.choice(days))
+            task = asyncio.create_task(coro)
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+        rec.elapsed = time.perf_counter() - t0
+    return rec
+
+
+def report(rec: Recorder) -> None:
+    total = sum(len(v) for v in rec.latencies.values())
+    print(f"\n{total} requests in {rec.elapsed:.1f}s ({total / rec.elapsed:.1f} req/s)\n")
+    print(f"{'endpoint':<14}{'count':>7}{'errors':>8}{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for endpoint, values in sorted(rec.latencies.items()):
+        statuses = rec.statuses[endpoint]
+        ok = statuses[200] + statuses[202] + statuses[304]
+        expected = statuses[409] if endpoint == "book" else 0
+        errors = len(values) - ok - expected
+        cols = [_percentile(values, p) * 1000 for p in (50, 90, 95, 99, 100)]
+        print(
+            f"{endpoint:<14}{len(values):>7}{errors:>8}"
+            + "".join(f"{c:>7.1f}ms" for c in cols)
+        )
+    print()
+    for endpoint, statuses in sorted(rec.statuses.items()):
+        print(f"{endpoint} statuses: {dict(statuses)}")
+    doubles = sum(n - 1 for n in rec.confirmed.values() if n > 1)
+    print(f"\nconfirmed bookings: {sum(rec.confirmed.values())}, double bookings: {doubles}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test the booking API")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--rps", type=float, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--owners", type=int, default=100, help="as passed to loadtest.seed")
+    parser.add_argument("--days", type=int, default=7, help="spread lookups over N days")
+    parser.add_argument("--book-ratio", type=float, default=0.1)
+    parser.add_argument("--concurrency", type=int, default=200, help="max open connections")
+    args = parser.parse_args()
+    report(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Create load-test owners in a local ``calendar_connections`` table.
+
+    python -m loadtest.seed --owners 200
+
+Owners get slugs ``load-0000``, ``load-0001``, ... and grant IDs
+``grant-load-0000``, ... that the fake Nylas server accepts.  Re-running
+the script updates the same rows instead of adding new ones.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import uuid
+
+import asyncpg
+
+from app.config import settings
+from app.encryption import encrypt
+from app.migrations import migrate
+
+_NAMESPACE = uuid.UUID("6f1c1d3e-7a0a-4d1b-9a59-2b7f2b0c9e11")
+
+
+def slug_for(index: int) -> str:
+    return f"load-{index:04d}"
+
+
+async def seed(dsn: str, owners: int, start: str, end: str, slot_minutes: int) -> None:
+    conn = await asyncpg.connect(dsn)
+    try:
+        await migrate(conn)
+        records = []
+        for i in range(owners):
+            slug = slug_for(i)
+            records.append((
+                str(uuid.uuid5(_NAMESPACE, slug)),
+                slug,
+                encrypt(f"grant-{slug}"),
+                f"{slug}@example.com",
+                start,
+                end,
+                slot_minutes,
+            ))
+        await conn.executemany(
+            """
+            INSERT INTO calendar_connections
+                (owner_id, slug, nylas_grant_id, google_email,
+                 business_hours_start, business_hours_end, slot_duration_minutes)
+            VALUES ($1::uuid, $2, $3, $4, $5, $6, $7)
+            ON CONFLICT (owner_id) DO UPDATE
+               SET nylas_grant_id        = EXCLUDED.nylas_grant_id,
+                   google_email          = EXCLUDED.google_email,
+                   business_hours_start  = EXCLUDED.business_hours_start,
+                   business_hours_end    = EXCLUDED.business_hours_end,
+                   slot_duration_minutes = EXCLUDED.slot_duration_minutes,
+                   is_valid              = true
+            """,
+            records,
+        )
+    finally:
+        await conn.close()
+    print(f"Seeded {owners} owners ({slug_for(0)} .. {slug_for(owners - 1)})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Seed load-test owners")
+    parser.add_argument("--dsn", default=None, help="defaults to DATABASE_URL")
+    parser.add_argument("--owners", type=int, default=100)
+    parser.add_argument("--hours-start", default="09:00")
+    parser.add_argument("--hours-end", default="17:00")
+    parser.add_argument("--slot-minutes", type=int, default=30)
+    args = parser.parse_args()
+    asyncio.run(seed(
+        args.dsn or settings.database_url,
+        args.owners,
+        args.hours_start,
+        args.hours_end,
+        args.slot_minutes,
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -18,8 +18,16 @@
   var confirmDetails = document.getElementById("confirmDetails");
   var errorMsg = document.getElementById("errorMsg");
   var ownerInfo = document.getElementById("ownerInfo");
+  var dayStrip = document.getElementById("dayStrip");
 
+  var RANGE_DAYS = 31;
   var selectedSlot = null;
+  var daySlots = {};
+  // Owner's availability version; keys availability URLs so the CDN can
+  // cache them without ever hiding a new booking.
+  var version = null;
+  // Owner and today's slots rendered into the page by /book/{slug}.
+  var initial = readInitial();
 
   if (!SLUG) {
     showError("Invalid booking link.");
@@ -27,7 +35,8 @@
     return;
   }
 
-  var today = new Date();
+  // The server knows today's date in the owner's timezone; fall back to UTC.
+  var today = initial.date ? new Date(initial.date + "T00:00:00Z") : new Date();
   datePicker.min = formatDate(today);
   datePicker.value = formatDate(today);
 
@@ -35,6 +44,12 @@
     return d.toISOString().split("T")[0];
   }
 
+  function addDays(d, n) {
+    var copy = new Date(d.getTime());
+    copy.setUTCDate(copy.getUTCDate() + n);
+    return copy;
+  }
+
   function unixToLocal(unix) {
     return new Date(unix * 1000).toLocaleTimeString([], {
       hour: "2-digit",
@@ -51,8 +66,166 @@
     errorMsg.classList.add("hidden");
   }
 
+  function readInitial() {
+    var el = document.getElementById("initialData");
+    if (!el) return {};
+    try {
+      return JSON.parse(el.textContent) || {};
+    } catch (err) {
+      return {};
+    }
+  }
+
+  // Compact availability days carry one hex bitmap per bookable window,
+  // over the slot grid that starts at window.start: bit k (most significant
+  // first) set means slot k is free.
+  function decodeDay(day, step) {
+    var slots = [];
+    (day.windows || []).forEach(function (w) {
+      var pad = w.free.length * 4 - w.n;
+      for (var k = 0; k < w.n; k++) {
+        var bit = pad + k;
+        var nibble = parseInt(w.free.charAt(bit >> 2), 16);
+        if (nibble & (8 >> (bit & 3))) {
+          var start = w.start + k * step;
+          slots.push({ start_time: start, end_time: start + step });
+        }
+      }
+    });
+    return slots;
+  }
+
+  function versionParam() {
+    return version === null ? "" : "&v=" + version;
+  }
+
+  async function fetchVersion() {
+    try {
+      var res = await fetch("/api/owner/" + encodeURIComponent(SLUG));
+      if (!res.ok) return;
+      var data = await res.json();
+      version = data.availability_version;
+    } catch (err) {
+      // Unversioned requests still work; they just skip the CDN.
+    }
+  }
+
+  async function fetchRange() {
+    var start = formatDate(today);
+    var end = formatDate(addDays(today, RANGE_DAYS - 1));
+    try {
+      var res = await fetch(
+        "/api/availability/range?slug=" + encodeURIComponent(SLUG) +
+        "&start=" + start + "&end=" + end + "&format=compact" + versionParam()
+      );
+      if (!res.ok) return;
+      var data = await res.json();
+      if (data.owner_email && ownerInfo) {
+        ownerInfo.textContent = "Booking with " + data.owner_email;
+      }
+      var step = data.slot_duration_minutes * 60;
+      var days = (data.days || []).map(function (day) {
+        var slots = decodeDay(day, step);
+        daySlots[day.date] = slots;
+        return { date: day.date, slots: slots, fully_booked: slots.length === 0 };
+      });
+      renderDayStrip(days);
+    } catch (err) {
+      // The single-day lookup below still works without the range.
+    }
+  }
+
+  // Live updates for the day on screen: slots booked elsewhere disappear
+  // and freed ones appear without the customer re-picking the date.
+  var stream = null;
+
+  function watchDay(date) {
+    if (!window.EventSource) return;
+    if (stream && stream.date === date) return;
+    if (stream) stream.close();
+    stream = new EventSource(
+      "/api/availability/stream?slug=" + encodeURIComponent(SLUG) + "&date=" + date
+    );
+    stream.date = date;
+    stream.addEventListener("slots", function (e) {
+      var data = JSON.parse(e.data);
+      applySlots(data.date, data.availability_version, data.slots);
+    });
+    stream.addEventListener("change", function (e) {
+      var data = JSON.parse(e.data);
+      if (!daySlots[data.date]) {
+        // Nothing to apply the delta to (the cache was cleared after a
+        // booking): reopen the stream, which starts with the full list.
+        stream.close();
+        stream = null;
+        watchDay(data.date);
+        return;
+      }
+      var removed = {};
+      data.removed.forEach(function (slot) { removed[slot.start_time] = true; });
+      var slots = daySlots[data.date]
+        .filter(function (slot) { return !removed[slot.start_time]; })
+        .concat(data.added)
+        .sort(function (a, b) { return a.start_time - b.start_time; });
+      applySlots(data.date, data.availability_version, slots);
+    });
+  }
+
+  function applySlots(date, newVersion, slots) {
+    if (newVersion !== version) {
+      // Other days were cached under the old version.
+      version = newVersion;
+      daySlots = {};
+    }
+    daySlots[date] = slots;
+    if (date !== datePicker.value || !stepConfirm.classList.contains("hidden")) return;
+    var kept = selectedSlot && slots.some(function (slot) {
+      return slot.start_time === selectedSlot.start_time;
+    });
+    if (selectedSlot && !kept) {
+      selectedSlot = null;
+      stepForm.classList.add("hidden");
+      bookBtn.disabled = true;
+      showError("The time you picked was just booked. Please choose another.");
+    }
+    renderSlots(slots);
+    if (kept) {
+      slotsGrid.querySelectorAll(".slot-btn").forEach(function (el, i) {
+        el.classList.toggle("selected", slots[i].start_time === selectedSlot.start_time);
+      });
+    }
+  }
+
+  function renderDayStrip(days) {
+    dayStrip.innerHTML = "";
+    days.forEach(function (day) {
+      var d = new Date(day.date + "T00:00:00Z");
+      var btn = document.createElement("button");
+      btn.className = "day-btn" + (day.fully_booked ? " full" : "");
+      btn.dataset.date = day.date;
+      btn.disabled = day.fully_booked;
+      btn.title = day.fully_booked ? "Fully booked" : day.slots.length + " slots";
+      btn.innerHTML =
+        d.toLocaleDateString([], { weekday: "short", timeZone: "UTC" }) + "<br>" +
+        d.getUTCDate();
+      btn.addEventListener("click", function () {
+        datePicker.value = day.date;
+        fetchSlots(day.date);
+      });
+      dayStrip.appendChild(btn);
+    });
+    markSelectedDay(datePicker.value);
+  }
+
+  function markSelectedDay(date) {
+    dayStrip.querySelectorAll(".day-btn").forEach(function (el) {
+      el.classList.toggle("selected", el.dataset.date === date);
+    });
+  }
+
   async function fetchSlots(date) {
     hideError();
+    markSelectedDay(date);
     stepSlots.classList.remove("hidden");
     stepForm.classList.add("hidden");
     stepConfirm.classList.add("hidden");
@@ -61,10 +234,18 @@
     slotsLoading.classList.remove("hidden");
     selectedSlot = null;
     bookBtn.disabled = true;
+    watchDay(date);
+
+    if (daySlots[date]) {
+      slotsLoading.classList.add("hidden");
+      renderSlots(daySlots[date]);
+      return;
+    }
 
     try {
       var res = await fetch(
-        "/api/availability?slug=" + encodeURIComponent(SLUG) + "&date=" + date
+        "/api/availability?slug=" + encodeURIComponent(SLUG) + "&date=" + date +
+        "&format=compact" + versionParam()
       );
       if (!res.ok) {
         var body = await res.json().catch(function () { return {}; });
@@ -75,7 +256,8 @@
       if (data.owner_email && ownerInfo) {
         ownerInfo.textContent = "Booking with " + data.owner_email;
       }
-      renderSlots(data.slots || []);
+      daySlots[date] = decodeDay(data, data.slot_duration_minutes * 60);
+      renderSlots(daySlots[date]);
     } catch (err) {
       slotsLoading.classList.add("hidden");
       showError(err.message);
@@ -132,6 +314,14 @@
         throw new Error(body.detail || "Booking failed");
       }
       var data = await res.json();
+      if (data.availability_version != null) {
+        version = data.availability_version;
+        daySlots = {};
+      }
+      if (res.status === 202) {
+        bookBtn.innerHTML = '<span class="spinner"></span> Confirming&hellip;';
+        data = await waitForConfirmation(data);
+      }
       showConfirmation(data);
     } catch (err) {
       showError(err.message);
@@ -140,7 +330,29 @@
     }
   }
 
+  // Bookings accepted with 202 are confirmed by the outbox worker.
+  async function waitForConfirmation(booking) {
+    var delay = 500;
+    for (var i = 0; i < 40; i++) {
+      await new Promise(function (resolve) { setTimeout(resolve, delay); });
+      delay = Math.min(delay * 1.5, 3000);
+      var res = await fetch("/api/book/" + encodeURIComponent(booking.booking_id));
+      if (!res.ok) continue;
+      var status = await res.json();
+      if (status.status === "confirmed") return status;
+      if (status.status === "failed") {
+        throw new Error("Sorry, that slot could not be booked. Please pick another time.");
+      }
+    }
+    // Still queued: the slot is held and the invite will follow.
+    return booking;
+  }
+
   function showConfirmation(event) {
+    if (stream) {
+      stream.close();
+      stream = null;
+    }
     document.getElementById("stepDate").classList.add("hidden");
     stepSlots.classList.add("hidden");
     stepForm.classList.add("hidden");
@@ -171,6 +383,16 @@
   bookBtn.addEventListener("click", bookSlot);
 
   if (SLUG && datePicker.value) {
-    fetchSlots(datePicker.value);
+    if (initial.slots && initial.date === datePicker.value) {
+      // Show the server-rendered day at once; the day strip loads behind it.
+      version = initial.availability_version;
+      daySlots[initial.date] = initial.slots;
+      fetchSlots(initial.date);
+      fetchRange();
+    } else {
+      fetchVersion().then(fetchRange).then(function () {
+        fetchSlots(datePicker.value);
+      });
+    }
   }
 })();